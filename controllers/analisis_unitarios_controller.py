@@ -2,18 +2,35 @@
 from PyQt6.QtCore import QObject
 from PyQt6.QtWidgets import QMessageBox, QDialog, QVBoxLayout
 from models.analisis_unitario import AnalisisUnitario
-from models.database import SessionLocal
+from models.busqueda_sql import buscar_analisis, cargar_vocabulario
+from models.unidad_trabajo import UnidadDeTrabajo
 from views.analisis_unitarios_view import AnalisisUnitariosView
 from controllers.recursos_por_analisis_controller import RecursosPorAnalisisController
 
+# Máximo de resultados que muestra una búsqueda en el servidor
+LIMITE_BUSQUEDA = 200
+
 class AnalisisUnitariosController(QObject):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, busqueda_remota=False):
+        """
+        Con busqueda_remota=True no se carga el catálogo completo: la tabla
+        muestra solo los resultados de cada búsqueda, resuelta en la base
+        (models/busqueda_sql.py) y ordenada por relevancia.
+        """
         super().__init__(parent)
         self.view = AnalisisUnitariosView()
-        self.load_analisis_unitarios()
+        # Una sesión para toda la vida de la vista (ver models/unidad_trabajo.py)
+        self.uow = UnidadDeTrabajo()
+        self.view.destroyed.connect(lambda *_: self.uow.cerrar())
+        self.view.busqueda_remota = busqueda_remota
+        # Vocabulario para tolerar errores de digitación; se carga con la primera búsqueda
+        self.vocabulario = None
+        self.view.search_requested.connect(self.buscar)
+        if not busqueda_remota:
+            self.load_analisis_unitarios()
 
-        # Conectar edición de celdas
-        self.view.table.itemChanged.connect(self.on_data_changed)
+        # Conectar edición de celdas (solo la fila editada, sin recargar la tabla)
+        self.view.model.fila_editada.connect(self.on_data_changed)
         # Conectar botón de agregar análisis
         self.view.add_analysis.connect(self.agregar_analisis)
         # Conectar selección de análisis
@@ -25,28 +42,73 @@ class AnalisisUnitariosController(QObject):
         self.view.analysis_edit_requested.connect(self.on_edit_analysis_resources)
 
     def load_analisis_unitarios(self):
-        session = SessionLocal()
+        session = self.uow.session
         try:
-            analisis_list = session.query(AnalisisUnitario).all()
-            data = []
-            for a in analisis_list:
-                data.append({
-                    "codigo": a.codigo,
-                    "descripcion": a.descripcion,
-                    "unidad": a.unidad,
-                    "total": a.total_calculado
-                })
-            self.view.load_data(data)
+            # La columna total se mantiene al día en cada flush (models/totales.py),
+            # así que basta con leerla: sin JOIN ni agregación por análisis
+            rows = (
+                session.query(
+                    AnalisisUnitario.codigo,
+                    AnalisisUnitario.descripcion,
+                    AnalisisUnitario.unidad,
+                    AnalisisUnitario.total
+                )
+                .order_by(AnalisisUnitario.codigo)
+                .all()
+            )
+            # Las filas se entregan a la vista como columnas (ver AnalisisUnitariosModel)
+            columnas = list(zip(*rows)) or [(), (), (), ()]
+            self.view.load_columns(*columnas)
         except Exception as e:
+            self.uow.descartar()
             print("Error al cargar análisis unitarios:", e)
         finally:
-            session.close()
+            self.uow.liberar_conexion()
+
+    def buscar(self, codigo, descripcion):
+        """
+        Muestra en la tabla solo las coincidencias de la búsqueda en el servidor,
+        por puntaje. Las palabras mal escritas o sin tildes se comparan con el
+        vocabulario del catálogo; si un código no coincide con ninguno, se busca
+        como texto (p. ej. "EXCAVACION" escrito en el campo de código).
+        """
+        session = self.uow.session
+        try:
+            if self.vocabulario is None and (codigo or descripcion):
+                self.vocabulario = cargar_vocabulario(session, "analisis_unitarios")
+            if descripcion:
+                filas = buscar_analisis(
+                    session, descripcion, codigo=codigo, limite=LIMITE_BUSQUEDA, vocabulario=self.vocabulario
+                )
+            elif codigo:
+                filas = (
+                    session.query(
+                        AnalisisUnitario.codigo,
+                        AnalisisUnitario.descripcion,
+                        AnalisisUnitario.unidad,
+                        AnalisisUnitario.total
+                    )
+                    .filter(AnalisisUnitario.codigo.icontains(codigo, autoescape=True))
+                    .order_by(AnalisisUnitario.codigo)
+                    .limit(LIMITE_BUSQUEDA)
+                    .all()
+                )
+                if not filas:
+                    filas = buscar_analisis(session, codigo, limite=LIMITE_BUSQUEDA, vocabulario=self.vocabulario)
+            else:
+                filas = []
+            columnas = list(zip(*(fila[:4] for fila in filas))) or [(), (), (), ()]
+            self.view.load_columns(*columnas)
+        except Exception as e:
+            self.uow.descartar()
+            print("Error al buscar análisis unitarios:", e)
+        finally:
+            self.uow.liberar_conexion()
 
     def agregar_analisis(self, data):
-        session = SessionLocal()
         try:
             # Verificar si ya existe
-            if session.query(AnalisisUnitario).filter(AnalisisUnitario.codigo == data["codigo"]).first():
+            if self.uow.obtener(AnalisisUnitario, data["codigo"]):
                 QMessageBox.warning(self.view, "Error", f"Ya existe un análisis con el código {data['codigo']}.")
                 return
 
@@ -54,70 +116,86 @@ class AnalisisUnitariosController(QObject):
                 codigo=data["codigo"],
                 descripcion=data["descripcion"],
                 unidad=data["unidad"],
-                total=data["total"]
+                # Un análisis nuevo no tiene recursos; el total se recalcula
+                # automáticamente cuando se le agreguen
+                total=0.0
             )
-            session.add(nuevo_analisis)
-            session.commit()
+            self.uow.agregar(nuevo_analisis)
+            self.uow.guardar()
+            if self.vocabulario is not None:
+                self.vocabulario.agregar_texto(f"{data['codigo']} {data['descripcion']}")
             print(f"Análisis {data['codigo']} agregado correctamente.")
-            self.load_analisis_unitarios()
+            self.view.model.agregar({
+                "codigo": nuevo_analisis.codigo,
+                "descripcion": nuevo_analisis.descripcion,
+                "unidad": nuevo_analisis.unidad,
+                "total": nuevo_analisis.total
+            })
         except Exception as e:
-            session.rollback()
+            self.uow.descartar()
             print(f"Error al agregar análisis {data['codigo']}: {e}")
-        finally:
-            session.close()
 
     def delete_analysis(self, codigo):
         """
         Elimina el análisis con el código proporcionado de la base de datos y refresca la vista.
         """
-        session = SessionLocal()
         try:
-            analisis = session.query(AnalisisUnitario).filter(AnalisisUnitario.codigo == codigo).first()
+            analisis = self.uow.obtener(AnalisisUnitario, codigo)
             if analisis:
-                session.delete(analisis)
-                session.commit()
+                self.uow.eliminar(analisis)
+                self.uow.guardar()
+                self.view.model.eliminar(codigo)
                 QMessageBox.information(self.view, "Eliminado", f"El análisis '{codigo}' ha sido eliminado.")
-                self.load_analisis_unitarios()
             else:
                 QMessageBox.warning(self.view, "Error", f"No se encontró un análisis con el código {codigo}.")
         except Exception as e:
-            session.rollback()
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al eliminar el análisis {codigo}: {e}")
-        finally:
-            session.close()
 
-    def on_data_changed(self, item):
-        row = item.row()
-        codigo_item = self.view.table.item(row, 0)
-        if not codigo_item:
-            return
+    def on_data_changed(self, row):
+        """Guarda la descripción y la unidad de la fila editada en la tabla."""
+        datos = self.view.model.fila(row)
+        codigo = datos["codigo"]
+        # El total no se toma de la tabla: es la suma de los recursos del análisis
 
-        codigo = codigo_item.text()
-        descripcion = self.view.table.item(row, 1).text() if self.view.table.item(row, 1) else ""
-        unidad = self.view.table.item(row, 2).text() if self.view.table.item(row, 2) else ""
         try:
-            total = float(self.view.table.item(row, 3).text()) if self.view.table.item(row, 3) else 0.0
-        except ValueError:
-            total = 0.0
-
-        session = SessionLocal()
-        try:
-            analisis = session.query(AnalisisUnitario).filter(AnalisisUnitario.codigo == codigo).first()
+            analisis = self.uow.obtener(AnalisisUnitario, codigo)
             if analisis:
-                analisis.descripcion = descripcion
-                analisis.unidad = unidad
-                analisis.total = total
-                session.commit()
+                analisis.descripcion = datos["descripcion"]
+                analisis.unidad = datos["unidad"]
+                self.uow.guardar()
+                if self.vocabulario is not None:
+                    self.vocabulario.agregar_texto(datos["descripcion"])
                 print(f"Análisis unitario {codigo} actualizado correctamente.")
             else:
                 print(f"No se encontró análisis unitario con código {codigo}.")
         except Exception as e:
-            session.rollback()
+            self.uow.descartar()
             print(f"Error al actualizar análisis unitario {codigo}: {e}")
-        finally:
-            session.close()
+            # Volver a mostrar lo que quedó en la base
+            self.refresh_analysis(codigo)
 
-        self.load_analisis_unitarios()
+    def refresh_analysis(self, codigo):
+        """Relee un análisis de la base y actualiza solo su fila en la tabla."""
+        try:
+            fila = (
+                self.uow.session.query(
+                    AnalisisUnitario.descripcion,
+                    AnalisisUnitario.unidad,
+                    AnalisisUnitario.total
+                )
+                .filter(AnalisisUnitario.codigo == codigo)
+                .first()
+            )
+            if fila:
+                self.view.model.actualizar(
+                    codigo, descripcion=fila.descripcion, unidad=fila.unidad, total=fila.total
+                )
+        except Exception as e:
+            self.uow.descartar()
+            print(f"Error al releer el análisis {codigo}: {e}")
+        finally:
+            self.uow.liberar_conexion()
 
     def on_analysis_selected(self, codigo):
         print(f"Análisis seleccionado: {codigo}")
@@ -143,3 +221,6 @@ class AnalisisUnitariosController(QObject):
         
         # Mostrar el diálogo modal
         dialog.exec()
+
+        # Al cerrar, el total del análisis pudo cambiar: se actualiza solo su fila
+        self.refresh_analysis(codigo)
@@ -3,13 +3,12 @@ import traceback
 from PyQt6.QtCore import QObject
 from PyQt6.QtWidgets import QMessageBox, QDialog, QVBoxLayout, QPushButton
 from PyQt6.QtGui import QStandardItem
-from models.presupuesto_analisis_unitario import PresupuestoAnalisisUnitario
 from models.analisis_unitario import AnalisisUnitario
-from models.database import SessionLocal
-from models.recurso import Recurso
+from models.unidad_trabajo import UnidadDeTrabajo
+from models.servicio_presupuestos import cargar_items, guardar_items
 from controllers.analisis_unitarios_controller import AnalisisUnitariosController
 
-from views.analisis_por_presupuesto_view import AnalisisPorPresupuestoView
+from views.analisis_por_presupuesto_view import AnalisisPorPresupuestoView, ROW_ID_ROLE
 
 class PresupuestoAnalisisUnitarioController(QObject):
     def __init__(self, codigo_presupuesto, parent=None):
@@ -17,8 +16,13 @@ class PresupuestoAnalisisUnitarioController(QObject):
         self.codigo_presupuesto = codigo_presupuesto
         print(f"[DEBUG] Iniciando PresupuestoAnalisisUnitario para presupuesto: {codigo_presupuesto}")
         self.view = AnalisisPorPresupuestoView(codigo_presupuesto)
+        # Una sesión para toda la vida del diálogo (ver models/unidad_trabajo.py)
+        self.uow = UnidadDeTrabajo()
+        self.view.destroyed.connect(lambda *_: self.uow.cerrar())
         # Diccionario para acumular cambios pendientes (clave: código del recurso)
         self.changes_pending = {}
+        # Valores guardados de cada ítem (id -> campos), para guardar solo las diferencias
+        self.snapshot = {}
 
         # Conectar botones definidos en la vista
         self.view.add_button.clicked.connect(self.open_analisis_selector)
@@ -37,26 +41,23 @@ class PresupuestoAnalisisUnitarioController(QObject):
 
     def load_analisis_por_presupuesto(self):
         """Carga desde la BD los analisis asociados al presupuesto y actualiza la vista."""
-        session = SessionLocal()
         try:
-            query = session.query(PresupuestoAnalisisUnitario).filter_by(
-                codigo_presupuesto=self.codigo_presupuesto
-            ).all()
+            query, self.snapshot = cargar_items(self.uow, self.codigo_presupuesto)
             data = []
             for r in query:
                 data.append({
+                    "id": r.id,
                     "codigo_analisis": r.codigo_analisis,
                     "descripcion_analisis": r.descripcion_analisis,
                     "unidad_analisis": r.unidad_analisis,
                     "cantidad_analisis": r.cantidad_analisis,
-                    "valor_unitario": r.vr_unitario,
+                    "vr_unitario": r.vr_unitario,
                     "vr_total": r.vr_total
                 })
             self.view.load_data(data)
         except Exception as e:
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al cargar analisis: {e}")
-        finally:
-            session.close()
 
     def open_analisis_selector(self):
         """Abre un diálogo modal con la vista del selector de analisis."""
@@ -73,9 +74,9 @@ class PresupuestoAnalisisUnitarioController(QObject):
     def on_analisis_unitarios(self, analisis_code, dialog):
         """Se dispara al seleccionar un analisis en el selector.
         Consulta la BD para obtener los datos completos y agrega una fila en la tabla."""
-        session = SessionLocal()
         try:
-            r = session.query(AnalisisUnitario).filter(AnalisisUnitario.codigo == analisis_code).first()
+            # Se relee el total: pudo cambiar en otra pantalla desde que se cargó
+            r = self.uow.obtener(AnalisisUnitario, analisis_code, refrescar=True)
             if r:
                 analisis = {
                     "codigo_analisis": r.codigo,
@@ -89,11 +90,10 @@ class PresupuestoAnalisisUnitarioController(QObject):
                 dialog.reject()
                 return
         except Exception as e:
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al consultar analisis: {e}")
             dialog.reject()
             return
-        finally:
-            session.close()
 
         # Agregar el recurso a la tabla con valores predeterminados
         row_position = self.view.model.rowCount()
@@ -111,66 +111,56 @@ class PresupuestoAnalisisUnitarioController(QObject):
         print("[DEBUG] Botón 'Agregar a Tabla' presionado (desde el formulario).")
         # Aquí podrías agregar lógica adicional si es necesario.
 
+    def read_rows(self):
+        """Lee los ítems del modelo como diccionarios con 'id' y los campos de la tabla."""
+        filas = []
+        for row in range(self.view.model.rowCount()):
+            codigo_item = self.view.model.item(row, 0)
+            valores = {
+                "id": codigo_item.data(ROW_ID_ROLE),
+                "codigo_analisis": codigo_item.text().strip(),
+                "descripcion_analisis": self.view.model.item(row, 1).text().strip(),
+                "unidad_analisis": self.view.model.item(row, 2).text().strip(),
+            }
+            for col, campo in ((3, "cantidad_analisis"), (4, "vr_unitario"), (5, "vr_total")):
+                try:
+                    valores[campo] = float(self.view.model.item(row, col).text())
+                except Exception:
+                    valores[campo] = 0.0
+            filas.append(valores)
+        return filas
+
     def update_presupuesto(self):
         """
-        Recorre el modelo, elimina los registros actuales de este presupuesto en la BD,
-        inserta los datos actuales del modelo y recalcula el total del presupuesto.
+        Guarda solo los ítems agregados, modificados o eliminados respecto a lo
+        cargado de la BD y actualiza el total del presupuesto en la misma
+        transacción. La tabla se actualiza en el lugar, sin recargarla.
         """
-        session = SessionLocal()
+        filas = self.read_rows()
         try:
-            # Borrar registros actuales para este presupuesto
-            session.query(PresupuestoAnalisisUnitario).filter_by(
-                codigo_presupuesto=self.codigo_presupuesto
-            ).delete()
-
-            total_actualizado = 0.0
-            row_count = self.view.model.rowCount()
-            for row in range(row_count):
-                codigo_analisis = self.view.model.item(row, 0).text().strip()
-                descripcion_analisis = self.view.model.item(row, 1).text().strip()
-                unidad_analisis = self.view.model.item(row, 2).text().strip()
-                try:
-                    cantidad_analisis = float(self.view.model.item(row, 3).text())
-                except Exception:
-                    cantidad_analisis = 0.0
-                try:
-                    vr_unitario = float(self.view.model.item(row, 4).text())
-                except Exception:
-                    vr_unitario = 0.0
-                try:
-                    vr_total = float(self.view.model.item(row, 5).text())
-                except Exception:
-                    vr_total = 0.0
-
-                total_actualizado += vr_total
-
-                nuevo = PresupuestoAnalisisUnitario(
-                    codigo_presupuesto=self.codigo_presupuesto,
-                    codigo_analisis=codigo_analisis,
-                    descripcion_analisis=descripcion_analisis,
-                    unidad_analisis=unidad_analisis,
-                    cantidad_analisis=cantidad_analisis,
-                    vr_unitario=vr_unitario,
-                    vr_total=vr_total
-                )
-                session.add(nuevo)
-
-            # Actualizar el total del presupuesto unitario
-            analisis = session.query(AnalisisUnitario).filter_by(codigo=self.codigo_presupuesto).first()
-            if analisis:
-                analisis.total = total_actualizado
-                print(f"[DEBUG] Nuevo total del presupuesto {self.codigo_presupuesto}: {total_actualizado}")
-
-            session.commit()
-            QMessageBox.information(self.view, "Actualización Exitosa",
-                                    f"Análisis {self.codigo_presupuesto} actualizado.\nNuevo Total: {total_actualizado:.2f}")
+            resumen = guardar_items(self.uow, self.codigo_presupuesto, filas, self.snapshot)
         except Exception as e:
-            session.rollback()
             QMessageBox.critical(self.view, "Error", f"Error al actualizar presupuesto: {e}")
             traceback.print_exc()
+            return
+
+        nuevas = resumen["nuevas"]
+        if not (nuevas or resumen["modificadas"] or resumen["eliminadas"]):
+            QMessageBox.information(self.view, "Sin cambios", f"El presupuesto {self.codigo_presupuesto} no tiene cambios.")
+            return
+
+        # Las filas nuevas reciben su id sin disparar on_item_changed
+        self.snapshot = resumen["snapshot"]
+        self.view.model.blockSignals(True)
+        try:
+            for i, fila_id in zip(nuevas, resumen["ids"]):
+                self.view.model.item(i, 0).setData(fila_id, ROW_ID_ROLE)
         finally:
-            session.close()
-            self.load_analisis_por_presupuesto()
+            self.view.model.blockSignals(False)
+
+        total_actualizado = resumen["total"]
+        QMessageBox.information(self.view, "Actualización Exitosa",
+                                f"Presupuesto {self.codigo_presupuesto} actualizado.\nNuevo Total: {total_actualizado:.2f}")
 
     def on_item_changed(self, topLeft, bottomRight, roles):
         """
@@ -1,13 +1,16 @@
 from PyQt6.QtCore import QObject
 from PyQt6.QtWidgets import QMessageBox
 from models.analisis_unitario import AnalisisUnitario
-from models.database import SessionLocal
+from models.unidad_trabajo import UnidadDeTrabajo
 from views.presupuesto_view import PresupuestoView
 
 class PresupuestoController(QObject):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.view = PresupuestoView()
+        # Una sesión para toda la vida de la vista (ver models/unidad_trabajo.py)
+        self.uow = UnidadDeTrabajo()
+        self.view.destroyed.connect(lambda *_: self.uow.cerrar())
         # Conectar la señal de selección de análisis unitario
         self.view.analisis_selected.connect(self.on_analisis_selected)
         print("PresupuestoController initialized")
@@ -28,24 +31,23 @@ class PresupuestoController(QObject):
         Cuando se selecciona un análisis unitario, obtiene sus datos
         de la base de datos y lo agrega a la tabla.
         """
-        session = SessionLocal()
         try:
-            analisis = session.query(AnalisisUnitario).filter(AnalisisUnitario.codigo == codigo).first()
+            # Se relee el total: pudo cambiar en otra pantalla desde que se cargó
+            analisis = self.uow.obtener(AnalisisUnitario, codigo, refrescar=True)
             if analisis:
                 analisis_data = {
                     'codigo': analisis.codigo,
                     'descripcion': analisis.descripcion,
                     'unidad': analisis.unidad,
-                    'costo_unitario': analisis.total_calculado,
+                    'costo_unitario': analisis.total,
                     'cantidad': 1  # Valor por defecto
                 }
                 self.agregar_analisis(analisis_data)
             else:
                 QMessageBox.warning(self.view, "Error", f"No se encontró el análisis unitario con código {codigo}")
         except Exception as e:
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al obtener el análisis: {str(e)}")
-        finally:
-            session.close()
 
     def load_analisis(self, analisis_list):
         """
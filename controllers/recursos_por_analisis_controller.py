@@ -5,9 +5,17 @@ from PyQt6.QtWidgets import QMessageBox, QDialog, QVBoxLayout, QPushButton
 from PyQt6.QtGui import QStandardItem
 from models.analisis_unitario_recurso import AnalisisUnitarioRecurso
 from models.analisis_unitario import AnalisisUnitario
-from models.database import SessionLocal
+from models.unidad_trabajo import UnidadDeTrabajo
 from models.recurso import Recurso
-from views.recursos_por_analisis_view import RecursosPorAnalisisView
+from models.totales import recalcular_totales
+from models.diferencias import instantanea, diferenciar, aplicar_diferencias, nueva_instantanea
+from views.recursos_por_analisis_view import RecursosPorAnalisisView, ROW_ID_ROLE
+
+# Columnas de analisis_unitarios_recursos que se editan en la tabla, en orden de columna
+CAMPOS_RECURSO = (
+    "codigo_recurso", "descripcion_recurso", "unidad_recurso",
+    "cantidad_recurso", "desper", "vr_unitario", "vr_parcial"
+)
 
 class RecursosPorAnalisisController(QObject):
     def __init__(self, codigo_analisis, parent=None):
@@ -15,8 +23,13 @@ class RecursosPorAnalisisController(QObject):
         self.codigo_analisis = codigo_analisis
         print(f"[DEBUG] Iniciando RecursosPorAnalisisController para análisis: {codigo_analisis}")
         self.view = RecursosPorAnalisisView(codigo_analisis)
+        # Una sesión para toda la vida del diálogo (ver models/unidad_trabajo.py)
+        self.uow = UnidadDeTrabajo()
+        self.view.destroyed.connect(lambda *_: self.uow.cerrar())
         # Diccionario para acumular cambios pendientes (clave: código del recurso)
         self.changes_pending = {}
+        # Valores guardados de cada fila (id -> campos), para guardar solo las diferencias
+        self.snapshot = {}
 
         # Conectar botones definidos en la vista
         self.view.add_button.clicked.connect(self.open_resource_selector)
@@ -35,14 +48,17 @@ class RecursosPorAnalisisController(QObject):
 
     def load_recurso_por_analisis(self):
         """Carga desde la BD los recursos asociados al análisis y actualiza la vista."""
-        session = SessionLocal()
         try:
-            query = session.query(AnalisisUnitarioRecurso).filter_by(
-                codigo_analisis=self.codigo_analisis
-            ).all()
+            query = self.uow.listar(
+                AnalisisUnitarioRecurso,
+                AnalisisUnitarioRecurso.codigo_analisis == self.codigo_analisis,
+                refrescar=True
+            )
+            self.snapshot = instantanea(query, CAMPOS_RECURSO)
             data = []
             for r in query:
                 data.append({
+                    "id": r.id,
                     "codigo_recurso": r.codigo_recurso,
                     "descripcion": r.descripcion_recurso,
                     "unidad": r.unidad_recurso,
@@ -53,9 +69,8 @@ class RecursosPorAnalisisController(QObject):
                 })
             self.view.load_data(data)
         except Exception as e:
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al cargar recursos: {e}")
-        finally:
-            session.close()
 
     def open_resource_selector(self):
         """Abre un diálogo modal con la vista del selector de recursos."""
@@ -73,9 +88,9 @@ class RecursosPorAnalisisController(QObject):
     def on_resource_selected(self, resource_code, dialog):
         """Se dispara al seleccionar un recurso en el selector.
         Consulta la BD para obtener los datos completos y agrega una fila en la tabla."""
-        session = SessionLocal()
         try:
-            r = session.query(Recurso).filter(Recurso.codigo == resource_code).first()
+            # Se relee el precio: pudo cambiar en otra pantalla desde que se cargó
+            r = self.uow.obtener(Recurso, resource_code, refrescar=True)
             if r:
                 resource = {
                     "codigo_recurso": r.codigo,
@@ -88,11 +103,10 @@ class RecursosPorAnalisisController(QObject):
                 dialog.reject()
                 return
         except Exception as e:
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al consultar recurso: {e}")
             dialog.reject()
             return
-        finally:
-            session.close()
 
         # Agregar el recurso a la tabla con valores predeterminados
         row_position = self.view.model.rowCount()
@@ -111,77 +125,78 @@ class RecursosPorAnalisisController(QObject):
         print("[DEBUG] Botón 'Agregar a Tabla' presionado (desde el formulario).")
         # Aquí podrías agregar lógica adicional si es necesario.
 
-    def update_analysis(self):
-        session = SessionLocal()
-        try:
-            # Borrar registros actuales para este análisis
-            session.query(AnalisisUnitarioRecurso).filter_by(
-                codigo_analisis=self.codigo_analisis
-            ).delete()
-
-            total_actualizado = 0.0
-            row_count = self.view.model.rowCount()
-            for row in range(row_count):
-                # Lee el texto de la primera columna (código recurso)
-                codigo_recurso = self.view.model.item(row, 0).text().strip()
-                
-                # SALTAR filas que son solo encabezados (las que empiezan con ===)
-                if codigo_recurso.startswith("==="):
-                    continue
-
-                descripcion = self.view.model.item(row, 1).text().strip()
-                unidad = self.view.model.item(row, 2).text().strip()
-                try:
-                    cantidad = float(self.view.model.item(row, 3).text())
-                except Exception:
-                    cantidad = 0.0
-                try:
-                    desperdicio = float(self.view.model.item(row, 4).text())
-                except Exception:
-                    desperdicio = 0.0
-                try:
-                    vr_unitario = float(self.view.model.item(row, 5).text())
-                except Exception:
-                    vr_unitario = 0.0
+    def read_rows(self):
+        """
+        Lee las filas de recursos del modelo (sin los encabezados de sección).
+        Retorna una lista de (fila del modelo, diccionario con 'id' y CAMPOS_RECURSO).
+        """
+        filas = []
+        for row in range(self.view.model.rowCount()):
+            # Lee el texto de la primera columna (código recurso)
+            codigo_item = self.view.model.item(row, 0)
+            codigo_recurso = codigo_item.text().strip()
+
+            # SALTAR filas que son solo encabezados (las que empiezan con ===)
+            if codigo_recurso.startswith("==="):
+                continue
+
+            valores = {"id": codigo_item.data(ROW_ID_ROLE), "codigo_recurso": codigo_recurso}
+            valores["descripcion_recurso"] = self.view.model.item(row, 1).text().strip()
+            valores["unidad_recurso"] = self.view.model.item(row, 2).text().strip()
+            for col, campo in ((3, "cantidad_recurso"), (4, "desper"), (5, "vr_unitario"), (6, "vr_parcial")):
                 try:
-                    vr_parcial = float(self.view.model.item(row, 6).text())
+                    valores[campo] = float(self.view.model.item(row, col).text())
                 except Exception:
-                    vr_parcial = 0.0
-
-                total_actualizado += vr_parcial
-
-                nuevo = AnalisisUnitarioRecurso(
-                    codigo_analisis=self.codigo_analisis,
-                    codigo_recurso=codigo_recurso,
-                    descripcion_recurso=descripcion,
-                    unidad_recurso=unidad,
-                    cantidad_recurso=cantidad,
-                    desper=desperdicio,
-                    vr_unitario=vr_unitario,
-                    vr_parcial=vr_parcial
+                    valores[campo] = 0.0
+            filas.append((row, valores))
+        return filas
+
+    def update_analysis(self):
+        """
+        Guarda solo las diferencias entre la tabla y lo cargado de la BD:
+        elimina las filas quitadas, actualiza por lotes las modificadas e inserta
+        las nuevas, en una transacción. La tabla se actualiza en el lugar.
+        """
+        filas = self.read_rows()
+        valores = [f for _, f in filas]
+        diferencias = diferenciar(self.snapshot, valores, CAMPOS_RECURSO)
+        nuevas, modificadas, eliminadas = diferencias
+        total_actualizado = sum(f["vr_parcial"] for f in valores)
+
+        if not (nuevas or modificadas or eliminadas):
+            QMessageBox.information(self.view, "Sin cambios", f"El análisis {self.codigo_analisis} no tiene cambios.")
+            return
+
+        try:
+            with self.uow.transaccion() as session:
+                ids = aplicar_diferencias(
+                    session, AnalisisUnitarioRecurso, valores, CAMPOS_RECURSO,
+                    {"codigo_analisis": self.codigo_analisis}, diferencias
                 )
-                session.add(nuevo)
-
-            # Actualizar el total del análisis unitario
-            analisis = session.query(AnalisisUnitario).filter_by(codigo=self.codigo_analisis).first()
-            if analisis:
-                analisis.total = total_actualizado
-                print(f"[DEBUG] Nuevo total del análisis {self.codigo_analisis}: {total_actualizado}")
-
-            session.commit()
-            QMessageBox.information(
-                self.view, 
-                "Actualización Exitosa",
-                f"Análisis {self.codigo_analisis} actualizado.\nNuevo Total: {total_actualizado:.2f}"
-            )
+                # Las escrituras por lotes no pasan por los eventos de flush,
+                # así que el total del análisis se recalcula explícitamente
+                recalcular_totales(session, [self.codigo_analisis])
         except Exception as e:
-            session.rollback()
             QMessageBox.critical(self.view, "Error", f"Error al actualizar análisis: {e}")
             traceback.print_exc()
-        finally:
-            session.close()
-            self.load_recurso_por_analisis()
+            return
 
+        # Actualizar la tabla en el lugar: las filas nuevas reciben su id
+        self.snapshot = nueva_instantanea(valores, CAMPOS_RECURSO, ids, nuevas)
+        self.view.model.blockSignals(True)
+        try:
+            for i, fila_id in zip(nuevas, ids):
+                self.view.model.item(filas[i][0], 0).setData(fila_id, ROW_ID_ROLE)
+        finally:
+            self.view.model.blockSignals(False)
+        print(f"[DEBUG] Análisis {self.codigo_analisis}: {len(nuevas)} nuevas, "
+              f"{len(modificadas)} modificadas, {len(eliminadas)} eliminadas. Nuevo total: {total_actualizado}")
+
+        QMessageBox.information(
+            self.view, 
+            "Actualización Exitosa",
+            f"Análisis {self.codigo_analisis} actualizado.\nNuevo Total: {total_actualizado:.2f}"
+        )
 
     def on_item_changed(self, topLeft, bottomRight, roles):
         """
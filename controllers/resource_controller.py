@@ -1,18 +1,42 @@
 # En el controlador (ResourceController, por ejemplo)
-from PyQt6.QtCore import QObject
+from PyQt6.QtCore import QObject, QTimer, Qt
+from sqlalchemy import select
 from models.recurso import Recurso
-from models.database import SessionLocal
+from models.unidad_trabajo import UnidadDeTrabajo
 from models.analisis_unitario_recurso import AnalisisUnitarioRecurso  # Import the missing model
+from models.buffer_ediciones import BufferEdiciones, guardar_recursos
+from models.busqueda_sql import buscar_recursos, cargar_vocabulario
+from models.catalogo_recursos import pagina_recursos
 from views.resource_list_view import ResourceListView
 from PyQt6.QtWidgets import QMessageBox
 
+# Milisegundos sin nuevas ediciones antes de guardar el buffer automáticamente
+FLUSH_DELAY_MS = 2000
+
 class ResourceController(QObject):
     def __init__(self):
         super().__init__()
         self.view = ResourceListView()
+        # Una sesión para toda la vida de la vista (ver models/unidad_trabajo.py)
+        self.uow = UnidadDeTrabajo()
+        self.view.destroyed.connect(lambda *_: self.uow.cerrar())
+        # Ediciones de celdas pendientes de guardar
+        self.buffer = BufferEdiciones()
+        # True mientras flush_edits() guarda; evita que un guardado se dispare dentro de otro
+        self._guardando = False
+        # Vocabulario para tolerar errores de digitación; se carga con la primera búsqueda
+        self.vocabulario = None
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_DELAY_MS)
+        self.flush_timer.timeout.connect(self.flush_edits)
         self.load_resources()
         # Conectar la señal dataChanged para la edición de celdas
         self.view.model.dataChanged.connect(self.on_data_changed)
+        # Guardar las ediciones pendientes al pedirlo o al salir de la vista, y deshacerlas
+        self.view.save_requested.connect(self.flush_edits)
+        self.view.focus_left.connect(self.flush_edits)
+        self.view.undo_requested.connect(self.undo_last_edit)
         # Conectar la señal para eliminar recurso
         self.view.resource_delete_requested.connect(self.delete_resource)
         # Conectar la señal para agregar recurso
@@ -20,61 +44,173 @@ class ResourceController(QObject):
 
 
     def load_resources(self):
-        session = SessionLocal()
+        """Vuelve a la primera página del catálogo; el resto se lee al desplazarse."""
+        if self.view.model.fuente is None:
+            self.view.model.set_fuente(self.cargar_pagina)
+        else:
+            self.view.model.recargar()
+
+    def cargar_pagina(self, codigo="", descripcion="", despues_de=None, antes_de=None, **kwargs):
+        """
+        Fuente de páginas del modelo de la vista: el catálogo en orden de código
+        (models/catalogo_recursos.py) o, si se busca por descripción, las
+        coincidencias por puntaje (models/busqueda_sql.py), tolerando tildes y
+        errores de digitación con el vocabulario del catálogo. Si el filtro de
+        código no coincide con ningún código se busca como texto (p. ej.
+        "tuberia" escrito en el campo de código), como en el selector de análisis.
+        """
+        limites = {"despues_de": despues_de, "antes_de": antes_de, **kwargs}
         try:
-            recursos = session.query(Recurso).all()
-            data = []
-            for r in recursos:
-                data.append({
-                    "codigo": r.codigo,
-                    "descripcion": r.descripcion,
-                    "unidad": r.unidad,
-                    "valor_unitario": r.valor_unitario
-                })
-            self.view.load_data(data)
+            if descripcion:
+                return self.buscar_texto(descripcion, codigo=codigo, **limites)
+            # Las claves (rango, codigo) son de una página de búsqueda por texto
+            clave = despues_de if despues_de is not None else antes_de
+            if codigo and isinstance(clave, tuple):
+                return self.buscar_texto(codigo, **limites)
+            filas = pagina_recursos(self.uow.session, codigo=codigo, **limites)
+            if not filas and codigo and clave is None:
+                filas = self.buscar_texto(codigo, **kwargs)
+            return filas
+        except Exception as e:
+            self.uow.descartar()
+            print("Error al cargar recursos:", e)
+            return []
         finally:
-            session.close()
+            self.uow.liberar_conexion()
+
+    def valores_originales(self, codigos):
+        """
+        {codigo: valores de la base} de los recursos editados: los que ya están
+        en el buffer, luego los que el modelo capturó antes de editar y, para
+        el resto, una sola consulta por lote.
+        """
+        originales = {}
+        faltan = []
+        for codigo in codigos:
+            if codigo in self.buffer:
+                originales[codigo] = self.buffer.original(codigo)
+            elif self.view.model.original(codigo) is not None:
+                originales[codigo] = self.view.model.original(codigo)
+            else:
+                faltan.append(codigo)
+        if faltan:
+            try:
+                filas = self.uow.session.execute(
+                    select(Recurso.codigo, Recurso.descripcion, Recurso.unidad, Recurso.valor_unitario)
+                    .where(Recurso.codigo.in_(faltan))
+                ).all()
+            finally:
+                self.uow.liberar_conexion()
+            for codigo, descripcion, unidad, valor_unitario in filas:
+                originales[codigo] = {"descripcion": descripcion, "unidad": unidad, "valor_unitario": valor_unitario}
+        return originales
+
+    def buscar_texto(self, texto, **kwargs):
+        """Coincidencias de 'texto' por puntaje; el vocabulario se carga con la primera búsqueda."""
+        if self.vocabulario is None:
+            self.vocabulario = cargar_vocabulario(self.uow.session, "recursos")
+        return buscar_recursos(self.uow.session, texto, vocabulario=self.vocabulario, **kwargs)
 
     def on_data_changed(self, topLeft, bottomRight, roles):
         """
-        Se llama cuando el usuario edita una celda en la tabla.
-        topLeft y bottomRight son índices que indican el rango de celdas modificadas.
-        Usamos el índice de la primera celda modificada para identificar la fila.
+        Se llama cuando el usuario edita (o pega) celdas en la tabla.
+        topLeft y bottomRight indican el rango de filas modificadas. Los cambios
+        no se escriben aquí: se acumulan en el buffer y se guardan juntos al
+        vencer el temporizador, al salir de la vista o con 'Guardar Cambios'.
         """
-        print("Se ha modificado una celda en la tabla.")
-        # Obtenemos el modelo
+        # Los cambios de solo formato (p. ej. el color de filas pendientes) no son ediciones
+        if roles and Qt.ItemDataRole.EditRole not in roles and Qt.ItemDataRole.DisplayRole not in roles:
+            return
         model = self.view.model
+        filas = {model.fila(row)["codigo"]: row for row in range(topLeft.row(), bottomRight.row() + 1)}
+        originales = self.valores_originales(list(filas))
+        faltantes = []
 
-        # Por simplicidad, asumimos que solo se edita una celda a la vez
-        row = topLeft.row()
-        codigo_item = model.item(row, 0)  # Asumimos que la primera columna es el código único
-        if not codigo_item:
-            return
+        for codigo, row in filas.items():
+            fila = model.fila(row)
+            original = originales.get(codigo)
+            if original is None:
+                faltantes.append(codigo)
+                continue
+
+            # Leer los valores actuales de la fila
+            try:
+                valor_unitario = float(fila["valor_unitario"])
+            except ValueError:
+                QMessageBox.warning(self.view, "Error", f"Valor unitario inválido para el recurso {codigo}.")
+                self.write_row(row, {"valor_unitario": original["valor_unitario"]})
+                continue
+            actual = {
+                "descripcion": fila["descripcion"],
+                "unidad": fila["unidad"],
+                "valor_unitario": valor_unitario
+            }
+            pendiente = self.buffer.registrar(codigo, original, actual)
+            model.marcar_pendiente(codigo, actual if pendiente else None)
 
-        codigo = codigo_item.text()
+        if faltantes:
+            QMessageBox.warning(
+                self.view, "Error",
+                "No se encontraron en la base los recursos: " + ", ".join(faltantes)
+            )
 
-        # Leer los valores actuales de la fila
-        descripcion = model.item(row, 1).text()
-        unidad = model.item(row, 2).text()
-        valor_unitario = float(model.item(row, 3).text())
+        self.view.set_pending_count(len(self.buffer))
+        if len(self.buffer):
+            # Cada edición reinicia la espera, así una ráfaga de cambios se guarda una sola vez
+            self.flush_timer.start()
 
-        # Actualizar el recurso en la base de datos
-        session = SessionLocal()
+    def flush_edits(self):
+        """Guarda en una sola transacción todas las ediciones pendientes del buffer."""
+        self.flush_timer.stop()
+        if self._guardando or not len(self.buffer):
+            return
+        pendientes = [codigo for codigo, _ in self.buffer.pendientes()]
+        descripciones = [valores["descripcion"] for _, valores in self.buffer.pendientes()]
+        self._guardando = True
         try:
-            recurso = session.query(Recurso).filter(Recurso.codigo == codigo).first()
-            if recurso:
-                recurso.descripcion = descripcion
-                recurso.unidad = unidad
-                recurso.valor_unitario = valor_unitario
-                session.commit()
-                print(f"Recurso {codigo} actualizado correctamente en la BD.")
-            else:
-                print(f"No se encontró recurso con código {codigo}.")
+            resumen = guardar_recursos(self.uow.session, self.buffer)
+            self.uow.guardar()
+            print(f"{len(pendientes)} recurso(s) actualizados en la BD.")
+            if resumen and resumen["relaciones"]:
+                print(f"Precios propagados: {resumen['relaciones']} relaciones, "
+                      f"{resumen['analisis']} análisis, {resumen['presupuestos']} presupuestos.")
         except Exception as e:
-            session.rollback()
-            print(f"Error al actualizar recurso {codigo}: {e}")
+            # Las ediciones siguen en el buffer para reintentar o deshacer
+            self.uow.descartar()
+            # El mensaje se muestra fuera de este guardado: su bucle de eventos
+            # puede disparar el temporizador o focus_left mientras está abierto
+            mensaje = f"Error al guardar los recursos: {e}"
+            QTimer.singleShot(0, lambda: QMessageBox.critical(self.view, "Error", mensaje))
+            return
         finally:
-            session.close()
+            self._guardando = False
+        self.buffer.limpiar()
+        if self.vocabulario is not None:
+            for descripcion in descripciones:
+                self.vocabulario.agregar_texto(descripcion)
+        for codigo in pendientes:
+            self.view.model.marcar_pendiente(codigo, None)
+        self.view.set_pending_count(0)
+
+    def undo_last_edit(self):
+        """Restaura en la tabla los valores originales de la última fila editada sin guardar."""
+        deshecho = self.buffer.deshacer_ultimo()
+        if deshecho is None:
+            return
+        codigo, original = deshecho
+        self.view.model.marcar_pendiente(codigo, None)
+        row = self.view.model.fila_de(codigo)
+        if row is not None:
+            self.write_row(row, original)
+        self.view.set_pending_count(len(self.buffer))
+        if not len(self.buffer):
+            self.flush_timer.stop()
+
+    def write_row(self, row, valores):
+        """Escribe valores en las celdas de una fila sin disparar on_data_changed."""
+        self.view.model.escribir(row, valores)
+        # Refrescar la vista, ya que el modelo no emitió dataChanged
+        self.view.table_view.viewport().update()
 
     def add_resource(self, codigo):
         """
@@ -97,43 +233,43 @@ class ResourceController(QObject):
         # Crear un nuevo recurso
         nuevo_recurso = Recurso(codigo=codigo, descripcion=descripcion, unidad=unidad, valor_unitario=valor_unitario)
 
-        session = SessionLocal()
+        # load_resources() vuelve a la primera página: primero se guardan las ediciones pendientes
+        self.flush_edits()
         try:
-            session.add(nuevo_recurso)
-            session.commit()
+            self.uow.agregar(nuevo_recurso)
+            self.uow.guardar()
+            if self.vocabulario is not None:
+                self.vocabulario.agregar_texto(f"{codigo} {descripcion}")
             QMessageBox.information(self.view, "Agregado", f"El recurso '{codigo}' ha sido agregado.")
             self.load_resources()
         except Exception as e:
-            session.rollback()
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al agregar el recurso {codigo}: {e}")
-        finally:
-            session.close()
    
     def delete_resource(self, codigo):
-        session = SessionLocal()
+        self.flush_edits()
         try:
             # Buscar el recurso
-            recurso = session.query(Recurso).filter(Recurso.codigo == codigo).first()
+            recurso = self.uow.obtener(Recurso, codigo)
             if not recurso:
                 QMessageBox.warning(self.view, "Error", f"No se encontró recurso con código {codigo}.")
                 return
 
             # Verificar si existen registros que usen este recurso en AnalisisUnitarioRecurso
-            count_uso = session.query(AnalisisUnitarioRecurso).filter(
+            count_uso = self.uow.session.query(AnalisisUnitarioRecurso).filter(
                 AnalisisUnitarioRecurso.codigo_recurso == codigo
             ).count()
+            self.uow.liberar_conexion()
             if count_uso > 0:
                 QMessageBox.warning(self.view, "Error", f"No se puede eliminar el recurso '{codigo}' porque está siendo usado por por un análisis unitario.")
                 return
 
             # Si no está en uso, se puede eliminar
-            session.delete(recurso)
-            session.commit()
+            self.uow.eliminar(recurso)
+            self.uow.guardar()
+            self.view.model.quitar(codigo)
             QMessageBox.information(self.view, "Eliminado", f"El recurso '{codigo}' ha sido eliminado.")
-            self.load_resources()
 
         except Exception as e:
-            session.rollback()
+            self.uow.descartar()
             QMessageBox.critical(self.view, "Error", f"Error al eliminar el recurso {codigo}: {e}")
-        finally:
-            session.close()
@@ -1,12 +1,28 @@
+import argparse
 from models.database import engine, Base
 from models.analisis_unitario import AnalisisUnitario
 from models.recurso import Recurso
 from models.analisis_unitario_recurso import AnalisisUnitarioRecurso
 from models.presupuesto_analisis_unitario import PresupuestoAnalisisUnitario
 from models.presupuesto import Presupuesto
+from models.migraciones import migrar
 
-print("📢 Eliminando y recreando las tablas en PostgreSQL...")
-Base.metadata.drop_all(bind=engine)  # Elimina todas las tablas
-Base.metadata.create_all(bind=engine)  # Crea todas las tablasprint("📢 Tablas registradas en SQLAlchemy:")
+parser = argparse.ArgumentParser(description="Crea o actualiza las tablas en PostgreSQL.")
+parser.add_argument("--recrear", action="store_true",
+                    help="Elimina y recrea todas las tablas (BORRA TODOS LOS DATOS).")
+args = parser.parse_args()
+
+if args.recrear:
+    print("📢 Eliminando y recreando las tablas en PostgreSQL...")
+    Base.metadata.drop_all(bind=engine)  # Elimina todas las tablas
+    # La tabla schema_version también se reinicia, así que las migraciones
+    # se vuelven a registrar sobre el esquema recién creado
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS schema_version")
+
+# Aplica en el lugar las migraciones pendientes (sin borrar datos)
+print("📢 Aplicando migraciones pendientes...")
+migrar()
+print("📢 Tablas registradas en SQLAlchemy:")
 print(Base.metadata.tables.keys())  # Debería mostrar los nombres de las tablas
-print("✅ Tablas recreadas exitosamente.")
+print("✅ Esquema actualizado exitosamente.")
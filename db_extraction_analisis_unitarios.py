@@ -1,7 +1,15 @@
 import os
 import re
+import json
+import hashlib
+import inspect
+import time
+import shutil
+import csv
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import tabula
 
 # Lista de unidades analisis unitarios
 UNITS = [
@@ -12,50 +20,331 @@ UNITS = [
     'PTO','CM2','C/K','KLK','M/K'
 ]
 
-unit_list = [
-    'HC','GLB','VJE','M3','M2','UND','HRS','KG','KLS','LBS','ML','DIA','CM3','CJO','JGO','SC','M3K','GLL','ROL','VJE','CC','HR','PHC','G','K','DIA','KG','KG.','GL','LTS','U/D','CUN','GLN','HH','LAM','PLI','BTO','GLS','CAN','RLL','PAR','ARR','VAR','PG2','CAR','ATD','KLL','T/K','MES','CAJ'
-]
+# Búsqueda de unidades en O(1), compartida por análisis y recursos
+UNIT_SET = frozenset(UNITS)
+
+# Regex para detectar el encabezado del análisis unitario
+REGEX_ANALISIS = re.compile(r'^(\d{2}-\d{2}-\d{2})-(.+)$')
+# Regex para detectar "XX-XX-XX-" (cambio de análisis)
+REGEX_CAMBIO_ANALISIS = re.compile(r'^(\d{2}-\d{2}-\d{2})-')
+# Regex para detectar el valor total (con $)
+REGEX_TOTAL = re.compile(r'\$([\d,\.]+)')
+
+# Opciones con las que se leen las tablas del PDF (forman parte de la clave de la caché)
+TABULA_OPTIONS = {'multiple_tables': True, 'stream': True}
+
+# Versión de las líneas cacheadas. La huella ya incluye el código de
+# normalize_table y tables_from_json; súbela a mano solo para invalidar la
+# caché por otra razón (p. ej. un cambio en una función que ellas llaman).
+# Los cambios en el parseo de registros (regex, UNITS, ResourceLineParser)
+# no invalidan la caché.
+LINES_VERSION = 2
+
+# Páginas por llamada a tabula en la lectura serial: cada llamada arranca la
+# JVM, así que se leen varias páginas juntas y luego se separan por página.
+PAGES_PER_READ = 50
+
+# Carpeta de la caché de líneas por página
+CACHE_DIR = os.path.join("data_gobernacion", ".cache_extraccion")
 
 # ---------------------------
-# Extracción de análisis unitarios
+# Lectura del PDF (tablas -> filas -> líneas)
 # ---------------------------
-def extract_analysis_units(pdf_path):
+def normalize_table(tbl):
     """
-    Extrae los análisis unitarios del PDF.
-    Se asume que cada línea de análisis tiene el formato:
-        CODE-DESCRIPCIÓN [Unidad]
-    Si la última palabra de la descripción está en la lista UNITS se extrae como unidad.
-    Luego, en líneas posteriores se busca el valor total (precedido por '$').
+    Normaliza un DataFrame de tabula con operaciones vectorizadas de pandas:
+    cada celda se convierte a texto y se recorta, las celdas de una fila se
+    unen con un espacio, se colapsan los espacios y se descartan las filas
+    vacías. Produce exactamente las mismas líneas que el recorrido anterior
+    con iterrows() + ' '.join(str(val).strip() ...) fila por fila.
+    Retorna una Series con una línea por fila no vacía.
     """
-    # Extraer todas las tablas del PDF
-    tables = tabula.read_pdf(pdf_path, pages='all', multiple_tables=True, stream=True)
-    analysis_units = []
-    current_analysis = None
+    if tbl.shape[0] == 0 or tbl.shape[1] == 0:
+        return pd.Series([], dtype=object)
 
-    # Concatenar todas las tablas en una lista de líneas
+    # iterrows() entrega cada fila con el tipo común de todas las columnas
+    # (to_numpy): si todas son numéricas los enteros pasan a float ('1' -> '1.0').
+    # Se parte de esa misma matriz para que el texto de cada celda coincida.
+    cells = pd.DataFrame(tbl.fillna('').to_numpy()).astype(str)
+    cells = cells.apply(lambda col: col.str.strip())
+    # Las celdas vacías dejan espacios dobles que luego se colapsan
+    joined = cells.iloc[:, 0]
+    for col in range(1, cells.shape[1]):
+        joined = joined.str.cat(cells.iloc[:, col], sep=' ')
+    joined = joined.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return joined[joined != '']
+
+def iter_table_lines(tbl):
+    """
+    Genera las líneas de texto normalizadas de un DataFrame de tabula
+    (una por fila, con los espacios colapsados y sin filas vacías).
+    """
+    yield from normalize_table(tbl).tolist()
+
+def read_pdf_lines(pdf_path, pages='all'):
+    """
+    Lee el PDF (o las páginas indicadas) con tabula y devuelve la lista de
+    líneas normalizadas. Para recorrer libros grandes sin materializar todas
+    las líneas se usa iter_pdf_lines().
+    """
+    import tabula
+    tables = tabula.read_pdf(pdf_path, pages=pages, **TABULA_OPTIONS)
     lines = []
     for tbl in tables:
-        tbl = tbl.fillna('')
-        for _, row in tbl.iterrows():
-            row_text = ' '.join(str(val).strip() for val in row if val != '')
-            row_text = re.sub(r'\s+', ' ', row_text).strip()
-            if row_text:
-                lines.append(row_text)
-
-    # Regex para detectar el encabezado del análisis unitario
-    regex_analisis = re.compile(r'^(\d{2}-\d{2}-\d{2})-(.+)$')
-    # Regex para detectar el valor total (con $)
-    regex_total = re.compile(r'\$([\d,\.]+)')
+        lines.extend(iter_table_lines(tbl))
+    return lines
+
+def _to_numeric(col):
+    try:
+        return pd.to_numeric(col)
+    except (ValueError, TypeError):
+        return col
+
+def tables_from_json(raw_tables):
+    """
+    Convierte las tablas en JSON de tabula (output_format='json') en
+    DataFrames igual que tabula-py con multiple_tables=True: la primera fila
+    es el encabezado, las celdas vacías quedan como NaN y las columnas cuyas
+    celdas son todas números se convierten a número.
+    Retorna una lista de (página, DataFrame).
+    """
+    tables = []
+    for table in raw_tables:
+        rows = [[cell['text'] if cell['text'] else None for cell in row] for row in table['data']]
+        columns = [c or '' for c in rows.pop(0)] if rows else None
+        tbl = pd.DataFrame(data=rows, columns=columns).apply(_to_numeric)
+        tables.append((table['page_number'], tbl))
+    return tables
+
+def read_pages_lines(pdf_path, pages):
+    """
+    Lee las páginas indicadas con una sola llamada a tabula y las separa por
+    página con el número que tabula anota en cada tabla. Retorna la lista de
+    (página, líneas) en el orden de 'pages' (lista vacía si la página no
+    tiene tablas).
+    """
+    pages = list(pages)
+    if not pages:
+        return []
+    import tabula
+    raw_tables = tabula.read_pdf(pdf_path, pages=pages, output_format='json', **TABULA_OPTIONS)
+    lines_by_page = {page: [] for page in pages}
+    try:
+        tables = tables_from_json(raw_tables)
+    except KeyError:
+        # tabula-java sin 'page_number' en el JSON: se lee página por página
+        return [(page, read_pdf_lines(pdf_path, pages=page)) for page in pages]
+    for page, tbl in tables:
+        lines_by_page[page].extend(iter_table_lines(tbl))
+    return [(page, lines_by_page[page]) for page in pages]
+
+def iter_pages_lines(pdf_path, pages, pages_per_read=PAGES_PER_READ):
+    """
+    Genera (página, líneas) de las páginas indicadas, leyéndolas en bloques de
+    'pages_per_read' páginas con una llamada a tabula por bloque. Solo se
+    mantiene en memoria el bloque en curso.
+    """
+    pages = list(pages)
+    for start in range(0, len(pages), pages_per_read):
+        yield from read_pages_lines(pdf_path, pages[start:start + pages_per_read])
+
+def count_pdf_pages(pdf_path):
+    """Devuelve el número de páginas del PDF (sin arrancar tabula)."""
+    from PyPDF2 import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+def split_pages(pages, num_chunks):
+    """
+    Divide la lista ordenada de páginas en 'num_chunks' bloques contiguos
+    conservando el orden.
+    """
+    num_chunks = max(1, min(num_chunks, len(pages)))
+    size, extra = divmod(len(pages), num_chunks)
+    chunks = []
+    start = 0
+    for i in range(num_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(pages[start:end])
+        start = end
+    return chunks
+
+# Bloques por proceso en el modo paralelo: bloques más pequeños acotan la
+# memoria retenida mientras se espera a que termine el bloque anterior.
+CHUNKS_PER_WORKER = 4
+# Bloques enviados y aún no consumidos, por proceso. Limita cuántos bloques
+# leídos pueden quedar en memoria esperando a uno anterior más lento.
+PENDING_PER_WORKER = 2
+
+def _read_chunk_pages(args):
+    # Función de nivel de módulo para que pueda serializarse hacia el proceso hijo;
+    # cada bloque se lee con una sola llamada a tabula
+    pdf_path, pages = args
+    return read_pages_lines(pdf_path, pages)
+
+def iter_pages_lines_parallel(pdf_path, pages, workers):
+    """
+    Igual que iter_pages_lines, pero repartiendo bloques contiguos de páginas
+    entre 'workers' procesos. Los bloques se entregan en orden de página, de
+    modo que un encabezado XX-XX-XX- al final de un bloque sigue siendo dueño
+    de las líneas de recursos que aparecen al inicio del siguiente.
+
+    Como mucho workers * PENDING_PER_WORKER bloques están enviados o
+    esperando a ser consumidos, y cada uno tiene a lo sumo PAGES_PER_READ
+    páginas; el siguiente se envía cuando se entrega el más antiguo, así que
+    la memoria no crece con el tamaño del libro.
+    """
+    pages = list(pages)
+    if workers <= 1 or len(pages) <= 1:
+        yield from iter_pages_lines(pdf_path, pages)
+        return
+
+    # Bloques de a lo sumo PAGES_PER_READ páginas, y al menos CHUNKS_PER_WORKER por proceso
+    num_chunks = max(workers * CHUNKS_PER_WORKER, -(-len(pages) // PAGES_PER_READ))
+    chunks = split_pages(pages, num_chunks)
+    max_pending = workers * PENDING_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_read_chunk_pages, (pdf_path, chunk)))
+            if len(pending) >= max_pending:
+                # Se entregan en orden de envío aunque terminen en otro orden
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# ---------------------------
+# Caché de líneas por página
+# ---------------------------
+def pdf_sha256(pdf_path):
+    """SHA-256 del contenido del PDF."""
+    h = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def extraction_fingerprint():
+    """
+    Huella de la extracción de líneas: cambia si cambian LINES_VERSION, las
+    opciones de tabula o el código de normalize_table y tables_from_json. La
+    caché guarda líneas, no registros, así que el parseo posterior no forma
+    parte de la clave.
+    """
+    h = hashlib.sha256()
+    h.update(str(LINES_VERSION).encode())
+    h.update(json.dumps(TABULA_OPTIONS, sort_keys=True).encode())
+    for funcion in (normalize_table, tables_from_json):
+        try:
+            h.update(inspect.getsource(funcion).encode())
+        except (OSError, TypeError):
+            # Sin el fuente (p. ej. solo .pyc), se usa el bytecode
+            h.update(funcion.__code__.co_code)
+    return h.hexdigest()[:16]
+
+def cache_path_for(pdf_path, cache_dir=CACHE_DIR):
+    """Carpeta de caché de este PDF y estas opciones de extracción."""
+    return os.path.join(cache_dir, f"{pdf_sha256(pdf_path)}-{extraction_fingerprint()}")
+
+def load_cached_page(cache_path, page):
+    """Devuelve las líneas de la página desde la caché, o None si no está o está dañada."""
+    try:
+        with open(os.path.join(cache_path, f"{page}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_cached_page(cache_path, page, lines):
+    """Guarda las líneas de una página en la caché de forma atómica."""
+    path = os.path.join(cache_path, f"{page}.json")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(lines, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def prepare_cache_dir(cache_path):
+    """Crea la carpeta de caché y elimina las de versiones anteriores del mismo PDF."""
+    os.makedirs(cache_path, exist_ok=True)
+    cache_dir, name = os.path.split(cache_path)
+    sha = name.split('-')[0]
+    for other in os.listdir(cache_dir):
+        if other.startswith(sha + '-') and other != name:
+            shutil.rmtree(os.path.join(cache_dir, other), ignore_errors=True)
+
+def iter_pdf_lines(pdf_path, workers=1, use_cache=True, cache_dir=CACHE_DIR):
+    """
+    Genera las líneas normalizadas del PDF página por página, en orden.
+
+    Con use_cache, cada página se guarda en una caché en disco indexada por
+    el SHA-256 del PDF y las opciones de extracción; las páginas ya cacheadas
+    se sirven desde disco y solo las que faltan se leen con tabula, varias por
+    llamada (en paralelo si workers > 1). La memoria queda acotada por un
+    bloque de páginas, no por el libro completo.
+    """
+    if not use_cache:
+        # También sin caché se lee por bloques de páginas, nunca el libro completo
+        pages = range(1, count_pdf_pages(pdf_path) + 1)
+        for _, lines in iter_pages_lines_parallel(pdf_path, pages, workers):
+            yield from lines
+        return
+
+    cache_path = cache_path_for(pdf_path, cache_dir)
+    prepare_cache_dir(cache_path)
+
+    num_pages = count_pdf_pages(pdf_path)
+    missing = [page for page in range(1, num_pages + 1)
+               if not os.path.exists(os.path.join(cache_path, f"{page}.json"))]
+    if missing:
+        print(f"Leyendo {len(missing)} de {num_pages} páginas (el resto viene de la caché)...")
+    # Las páginas que faltan se leen en orden, así que se consumen a medida que aparecen
+    pending = iter_pages_lines_parallel(pdf_path, missing, workers)
+    missing = set(missing)
+
+    for page in range(1, num_pages + 1):
+        lines = None if page in missing else load_cached_page(cache_path, page)
+        if lines is None:
+            if page in missing:
+                _, lines = next(pending)
+            else:
+                # Archivo de caché dañado: se vuelve a leer solo esta página
+                lines = read_pdf_lines(pdf_path, pages=page)
+            save_cached_page(cache_path, page, lines)
+        yield from lines
+
+# ---------------------------
+# Parseo en una sola pasada (líneas -> registros)
+# ---------------------------
+def iter_records(lines):
+    """
+    Recorre una sola vez las líneas del PDF y genera, a medida que se
+    completan, tuplas (tipo, registro):
+      - ('analisis', {...}) por cada análisis unitario (CODE-DESCRIPCIÓN [Unidad]
+        y su total con '$'); se emite cuando aparece su total o el siguiente
+        encabezado.
+      - ('recurso', {...}) por cada recurso, con su 'codigo_analisis'.
+    """
+    current_analysis = None
+    current_analisis_code = None
     looking_for_total = False
 
     for line in lines:
-        match_analisis = regex_analisis.match(line)
-        if match_analisis:
+        # 1) Ver si la línea indica un cambio de análisis
+        match_cambio = REGEX_CAMBIO_ANALISIS.match(line)
+        if match_cambio:
+            match_analisis = REGEX_ANALISIS.match(line)
+            if not match_analisis:
+                # Encabezado sin descripción: no es un análisis válido
+                current_analisis_code = None
+                continue
+
+            if looking_for_total and current_analysis:
+                # El análisis anterior se cierra sin total
+                yield 'analisis', current_analysis
+
             code = match_analisis.group(1)
             desc_line = match_analisis.group(2).strip()
             tokens = desc_line.split()
             # Si el último token está en UNITS, se asume que es la unidad
-            if tokens and tokens[-1].upper() in UNITS:
+            if tokens and tokens[-1].upper() in UNIT_SET:
                 unit = tokens[-1].upper()
                 description = " ".join(tokens[:-1])
             else:
@@ -68,45 +357,98 @@ def extract_analysis_units(pdf_path):
                 'unidad': unit,
                 'total': 0.0
             }
-            analysis_units.append(current_analysis)
+            current_analisis_code = code
             looking_for_total = True
+            # no parseamos esta línea como recurso, saltamos
             continue
 
+        # 2) Buscar el valor total del análisis actual
         if looking_for_total and current_analysis:
-            match_total = regex_total.search(line)
+            match_total = REGEX_TOTAL.search(line)
             if match_total:
                 total_str = match_total.group(1).replace(',', '').replace('.', '')  # Limpiar comas y puntos
                 try:
-                    total_val = float(total_str)
+                    current_analysis['total'] = float(total_str)
                 except ValueError:
-                    total_val = 0.0
+                    current_analysis['total'] = 0.0
+                looking_for_total = False
+                yield 'analisis', current_analysis
 
-                # Si ya teníamos un análisis previo, lo asignamos
-                if current_analysis is not None:
-                    current_analysis['total'] = total_val
-                else:
-                    # Crear un nuevo análisis si el total está separado
-                    current_analysis = {'total': total_val}
+        # 3) Intentar parsear la línea como recurso
+        if not current_analisis_code:
+            # si no estamos dentro de un análisis conocido, no parseamos
+            continue
 
-                looking_for_total = False
-                continue
+        parsed = parse_resource_line(line)
+        if parsed:
+            # Agregamos el campo 'codigo_analisis'
+            parsed['codigo_analisis'] = current_analisis_code
+            yield 'recurso', parsed
+
+    if looking_for_total and current_analysis:
+        yield 'analisis', current_analysis
 
+def parse_lines(lines):
+    """
+    Versión materializada de iter_records.
+    Retorna la tupla (analysis_units, resources_mapping).
+    """
+    analysis_units = []
+    resources_mapping = []
+    for kind, record in iter_records(lines):
+        if kind == 'analisis':
+            analysis_units.append(record)
+        else:
+            resources_mapping.append(record)
+    return analysis_units, resources_mapping
 
-    return analysis_units
+def iter_extract(pdf_path, workers=1, use_cache=True):
+    """
+    Pipeline en streaming: tablas -> filas -> líneas -> registros.
+    Genera las mismas tuplas (tipo, registro) que iter_records.
+    """
+    return iter_records(iter_pdf_lines(pdf_path, workers=workers, use_cache=use_cache))
+
+def extract_all(pdf_path, workers=1, use_cache=True):
+    """
+    Etapa única de extracción: lee el PDF una vez y devuelve
+    (analysis_units, resources_mapping) ya materializados.
+    Con workers > 1 las páginas se leen en paralelo y con use_cache las páginas
+    ya leídas de este mismo PDF se toman de la caché.
+    """
+    return parse_lines(iter_pdf_lines(pdf_path, workers=workers, use_cache=use_cache))
+
+# ---------------------------
+# Extracción de análisis unitarios
+# ---------------------------
+def extract_analysis_units(pdf_path, lines=None):
+    """
+    Extrae los análisis unitarios del PDF.
+    Se asume que cada línea de análisis tiene el formato:
+        CODE-DESCRIPCIÓN [Unidad]
+    Si la última palabra de la descripción está en la lista UNITS se extrae como unidad.
+    Luego, en líneas posteriores se busca el valor total (precedido por '$').
+    Si ya se tienen las líneas del PDF (iter_pdf_lines) se pueden pasar en 'lines'
+    para no volver a leerlo.
+    """
+    if lines is None:
+        lines = iter_pdf_lines(pdf_path)
+    return [record for kind, record in iter_records(lines) if kind == 'analisis']
 
 # ---------------------------
 # Extracción de recursos (Relaciones)
-# Se deja la lógica original de relaciones, sin cambios
 # ---------------------------
-def parse_resource_line(line):
+class ResourceLineParser:
     """
-    Intenta parsear un 'recurso' en la forma:
-    
+    Parser reutilizable de líneas de 'recurso' en la forma:
+
     CODIGO-DESCRIPCION ... UNIDAD CANT DESPER VRUNIT VRPARCIAL
-    
-    Retorna un diccionario con esos campos o None si no se pudo parsear.
+
+    Los patrones se compilan una sola vez y la unidad se busca en un
+    frozenset (el mismo UNIT_SET derivado de UNITS que usan los análisis).
     """
-    # 1) Buscamos un código que cumpla:
+
+    # Buscamos un código que cumpla:
     #    - Empieza con:
     #      * M[OQ] (ej: MOAG01-)
     #      * SC (ej: SC0201-)
@@ -117,182 +459,140 @@ def parse_resource_line(line):
     #
     #    Usamos un regex con grupos alternativos, y exigimos que termine en '-'
     #    para separar luego la descripción.
-    
-    import re
-    
-    # Patrón para "código-" (quitamos el guion al final):
-    code_pattern = re.compile(
+    CODE_PATTERN = re.compile(
         r'^(?:'                # comienzo del string
         r'(?:M[OQ]\w+)|'       # MO..., MQ...
         r'(?:SC\d+)|'          # SC...
         r'(?:\d{3,6})'         # 3,4 o 6 dígitos
         r')-'                  # guion
     )
-    
-    splitted = line.split()
-    if not splitted:
-        return None
-    
-    # splitted[0] podría ser "MOAG01-HERRAMIENTA" o "003282-GASOLINA"
-    # o "SC0201-ELABORACION" etc.
-    first_token = splitted[0]
-    
-    # Verificamos si coincide con code_pattern
-    m = code_pattern.match(first_token)
-    if not m:
-        return None  # no es un recurso con ese formato
-    
-    # Extraemos el "codigo" sin el guion final
-    # p.ej. si first_token="MOAG01-HERRAMIENTA" => codeCandidate="MOAG01-"
-    # luego leftover="HERRAMIENTA"
-    codeCandidate = m.group(0)  # "MOAG01-"
-    code_clean = codeCandidate[:-1]  # quitamos el '-' => "MOAG01"
-    
-    leftover = first_token[len(codeCandidate):]  # lo que quede en first_token tras "MOAG01-"
-    
-    # Reconstruimos la línea, pero reemplazamos splitted[0] por leftover + splitted[1...]
-    # para analizar "descripción + (unidad cant desper vrunit vrparcial)"
-    new_tokens = []
-    if leftover:
-        new_tokens.append(leftover)
-    # Agregamos el resto
-    new_tokens.extend(splitted[1:])
-    
-    # new_tokens = ej: ["HERRAMIENTA","MENOR","GLB","4,000","0,00","1.600","6.400"]
-    if len(new_tokens) < 5:
-        return None  # no hay columnas suficientes
-    
-    # Lista de unidades posibles
-    unit_list = [
-        'HC','GLB','VJE','M3','M2','UND','HRS','KG','KLS','LBS','ML','DIA','CM3','CJO','JGO','SC','M3K','GLL','ROL','VJE','CC','HR','PHC','G','K','DIA','KG','KG.','GL','LTS','U/D','CUN','GLN','HH','LAM','PLI','BTO','GLS','CAN','RLL','PAR','ARR','VAR','PG2','CAR','ATD','KLL','T/K','MES','CAJ'
-    ]
-    
-    # CAMBIO: Buscar la unidad desde el final hacia el principio
-    # Asumimos que los 4 últimos tokens son CANT, DESPER, VRUNIT, VRPARCIAL
-    # La unidad debería estar justo antes de estos 4 valores numéricos
-    
-    # Verificamos que haya al menos 5 tokens (unidad + 4 valores numéricos)
-    if len(new_tokens) < 5:
-        return None
-    
-    # Buscar hacia atrás hasta encontrar una unidad reconocida
-    # Empezamos desde el quinto elemento desde el final hacia adelante
-    unit_index = -1
-    for i in range(len(new_tokens) - 4, -1, -1):
-        if new_tokens[i].upper() in unit_list:
-            unit_index = i
-            break
-    
-    if unit_index < 0:
-        # No se encontró una unidad reconocida
-        print(f"No se encontró unidad en la línea de recurso:\n{line}")
-        return None
-    
-    # La descripción es todo lo anterior a la unidad
-    desc_part = new_tokens[:unit_index]  # puede tener varias palabras
-    description_recurso = " ".join(desc_part).strip()
-    
-    # Lo que sigue a la unidad son los datos numéricos
-    # Esperamos 4 tokens: Cant, Desper, VrUnit, VrParcial
-    # Para asegurar que tomamos los 4 valores correctos, tomamos desde el final
-    rest = new_tokens[unit_index+1:]
-    
-    # Necesitamos exactamente 4 valores numéricos al final
-    if len(rest) < 4:
-        print(f"No hay suficientes valores numéricos después de la unidad en la línea:\n{line}")
-        return None
-    
-    # Tomamos los últimos 4 valores como cant, desper, vrunit, vrparcial
-    cant_str, desper_str, vrunit_str, vrparcial_str = rest[-4:]
-    
-    # Convertir a float
+
+    def __init__(self, units=None, verbose=True):
+        self.units = UNIT_SET if units is None else frozenset(u.upper() for u in units)
+        # Si es True se informa por consola de las líneas con código pero sin unidad
+        self.verbose = verbose
+
+    @staticmethod
     def to_float(s):
-        return float(s.replace('.', '').replace(',', '.'))
-    
-    try:
-        cantidad = to_float(cant_str)
-    except:
-        cantidad = 0.0
-    
-    try:
-        desper = to_float(desper_str)
-    except:
-        desper = 0.0
-    
-    try:
-        vrunit = to_float(vrunit_str)
-    except:
-        vrunit = 0.0
+        """Convierte '1.234,56' en 1234.56; devuelve 0.0 si no es un número."""
+        try:
+            return float(s.replace('.', '').replace(',', '.'))
+        except ValueError:
+            return 0.0
+
+    def parse(self, line):
+        """
+        Intenta parsear una línea de recurso.
+        Retorna un diccionario con sus campos o None si no se pudo parsear.
+        """
+        splitted = line.split()
+        if not splitted:
+            return None
+
+        # splitted[0] podría ser "MOAG01-HERRAMIENTA" o "003282-GASOLINA"
+        # o "SC0201-ELABORACION" etc.
+        first_token = splitted[0]
+        m = self.CODE_PATTERN.match(first_token)
+        if not m:
+            return None  # no es un recurso con ese formato
+
+        # p.ej. si first_token="MOAG01-HERRAMIENTA" => codeCandidate="MOAG01-"
+        # y leftover="HERRAMIENTA"
+        codeCandidate = m.group(0)
+        code_clean = codeCandidate[:-1]  # quitamos el '-' => "MOAG01"
+        leftover = first_token[len(codeCandidate):]
+
+        # Reconstruimos "descripción + (unidad cant desper vrunit vrparcial)"
+        # new_tokens = ej: ["HERRAMIENTA","MENOR","GLB","4,000","0,00","1.600","6.400"]
+        new_tokens = [leftover] + splitted[1:] if leftover else splitted[1:]
+
+        # Al menos 5 tokens: unidad + 4 valores numéricos
+        if len(new_tokens) < 5:
+            return None
+
+        # Asumimos que los 4 últimos tokens son CANT, DESPER, VRUNIT, VRPARCIAL;
+        # buscamos la unidad hacia atrás empezando justo antes de ellos
+        units = self.units
+        unit_index = -1
+        for i in range(len(new_tokens) - 4, -1, -1):
+            if new_tokens[i].upper() in units:
+                unit_index = i
+                break
+
+        if unit_index < 0:
+            if self.verbose:
+                print(f"No se encontró unidad en la línea de recurso:\n{line}")
+            return None
+
+        # La descripción es todo lo anterior a la unidad; lo que sigue son los datos numéricos
+        rest = new_tokens[unit_index + 1:]
+        if len(rest) < 4:
+            if self.verbose:
+                print(f"No hay suficientes valores numéricos después de la unidad en la línea:\n{line}")
+            return None
+
+        # Tomamos los últimos 4 valores como cant, desper, vrunit, vrparcial
+        cant_str, desper_str, vrunit_str, vrparcial_str = rest[-4:]
+        to_float = self.to_float
+
+        return {
+            'codigo_recurso': code_clean,
+            'descripcion_recurso': " ".join(new_tokens[:unit_index]).strip(),
+            'unidad_recurso': new_tokens[unit_index],  # la unidad detectada
+            'cantidad_recurso': to_float(cant_str),
+            'desper': to_float(desper_str),
+            'vr_unitario': to_float(vrunit_str),
+            'vr_parcial': to_float(vrparcial_str)
+        }
+
+    def parse_many(self, lines):
+        """Parsea un lote de líneas y retorna la lista de recursos reconocidos."""
+        parse = self.parse
+        return [parsed for parsed in map(parse, lines) if parsed is not None]
+
+# Parser compartido por el pipeline de extracción
+RESOURCE_PARSER = ResourceLineParser()
+
+def parse_resource_line(line):
+    """
+    Intenta parsear un 'recurso' en la forma:
     
-    try:
-        vrparcial = to_float(vrparcial_str)
-    except:
-        vrparcial = 0.0
+    CODIGO-DESCRIPCION ... UNIDAD CANT DESPER VRUNIT VRPARCIAL
     
-    return {
-        'codigo_recurso': code_clean,
-        'descripcion_recurso': description_recurso,
-        'unidad_recurso': new_tokens[unit_index],  # la unidad detectada
-        'cantidad_recurso': cantidad,
-        'desper': desper,
-        'vr_unitario': vrunit,
-        'vr_parcial': vrparcial
-    }
-
-
-def extract_resources(pdf_path, analysis_units):
-    """
-    Lee el PDF nuevamente o (reusa) y parsea línea por línea en busca de recursos.
-    Para cada recurso, asocia con el 'codigo_analisis' actual si estamos
-    dentro de uno.
-    """
-    # Generamos un set de codigos de analisis para saber en cuál estamos
-    # (en tu caso, podrías usar la misma lógica de "cuando encuentro XX-XX-XX- me cambio de análisis")
-    # pero aquí asumo que "analysis_units" ya lo tienes.
+    Retorna un diccionario con esos campos o None si no se pudo parsear.
+    """
+    return RESOURCE_PARSER.parse(line)
+
+def benchmark_parser(lines, repeat=3, parser=None):
+    """
+    Mide el rendimiento del parser de recursos en líneas por segundo
+    (mejor de 'repeat' pasadas sobre 'lines' con parse_many).
+    """
+    parser = parser or ResourceLineParser(verbose=False)
+    lines = list(lines)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse_many(lines)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best if best else float('inf')
+
+
+def extract_resources(pdf_path, analysis_units, lines=None):
+    """
+    Parsea línea por línea en busca de recursos y asocia cada uno con el
+    'codigo_analisis' actual si estamos dentro de uno de 'analysis_units'.
+    Si ya se tienen las líneas del PDF se pueden pasar en 'lines' para no
+    volver a leerlo; lo recomendable es usar extract_all().
+    """
+    if lines is None:
+        lines = iter_pdf_lines(pdf_path)
     codigos_analisis = {a['codigo'] for a in analysis_units}
-    
-    # Te conviene re-leer el PDF en modo "lineas"
-    tables = tabula.read_pdf(pdf_path, pages='all', multiple_tables=True, stream=True)
-    lines = []
-    for tbl in tables:
-        tbl = tbl.fillna('')
-        for _, row in tbl.iterrows():
-            row_text = ' '.join(str(val).strip() for val in row if val != '')
-            row_text = re.sub(r'\s+', ' ', row_text).strip()
-            if row_text:
-                lines.append(row_text)
-    
-    resources_mapping = []
-    current_analisis_code = None
-    
-    # Regex para detectar "XX-XX-XX-" (analisis)
-    regex_analisis = re.compile(r'^(\d{2}-\d{2}-\d{2})-')
-    
-    for line in lines:
-        # 1) Ver si la línea indica un cambio de análisis
-        match_ana = regex_analisis.match(line)
-        if match_ana:
-            # Cambiamos de análisis
-            possible_code = match_ana.group(1)
-            if possible_code in codigos_analisis:
-                current_analisis_code = possible_code
-            else:
-                current_analisis_code = None
-            # no parseamos esta línea como recurso, saltamos
-            continue
-        
-        # 2) Intentar parsear la línea como recurso
-        if not current_analisis_code:
-            # si no estamos dentro de un análisis conocido, no parseamos
-            continue
-        
-        parsed = parse_resource_line(line)
-        if parsed:
-            # Agregamos el campo 'codigo_analisis'
-            parsed['codigo_analisis'] = current_analisis_code
-            resources_mapping.append(parsed)
-    
-    return resources_mapping
+    return [
+        record for kind, record in iter_records(lines)
+        if kind == 'recurso' and record['codigo_analisis'] in codigos_analisis
+    ]
 
 
 # ---------------------------
@@ -309,32 +609,104 @@ def save_to_csv(df_analysis, df_resources, analysis_path, resources_path):
     print(f"Análisis unitarios guardados en: {analysis_path}")
     print(f"Recursos guardados en: {resources_path}")
 
+# Columnas de los CSV (mismo orden que generaban los DataFrames)
+ANALYSIS_COLUMNS = ['codigo', 'descripcion', 'unidad', 'total']
+RESOURCE_COLUMNS = [
+    'codigo_recurso', 'descripcion_recurso', 'unidad_recurso', 'cantidad_recurso',
+    'desper', 'vr_unitario', 'vr_parcial', 'codigo_analisis'
+]
+UNIQUE_RESOURCE_COLUMNS = ['Codigo', 'Descripcion', 'Unidad', 'Valor Unitario']
+
+def write_records_csv(records, analysis_path, resources_path):
+    """
+    Escribe en streaming los registros (tipo, registro) de iter_extract en los
+    CSV de análisis y de recursos, fila por fila, sin materializar DataFrames.
+    Retorna (n_analisis, n_recursos).
+    """
+    n_analysis = n_resources = 0
+    with open(analysis_path, 'w', newline='', encoding='utf-8') as fa, \
+         open(resources_path, 'w', newline='', encoding='utf-8') as fr:
+        analysis_writer = csv.DictWriter(fa, fieldnames=ANALYSIS_COLUMNS, lineterminator=os.linesep)
+        resources_writer = csv.DictWriter(fr, fieldnames=RESOURCE_COLUMNS, lineterminator=os.linesep)
+        analysis_writer.writeheader()
+        resources_writer.writeheader()
+        for kind, record in records:
+            if kind == 'analisis':
+                analysis_writer.writerow(record)
+                n_analysis += 1
+            else:
+                resources_writer.writerow(record)
+                n_resources += 1
+    print(f"Análisis unitarios guardados en: {analysis_path}")
+    print(f"Recursos guardados en: {resources_path}")
+    return n_analysis, n_resources
+
+def write_unique_resources_csv(records, output_csv):
+    """
+    Escribe en streaming el CSV de recursos únicos (primera aparición de cada
+    código) con las columnas Codigo, Descripcion, Unidad, Valor Unitario.
+    Retorna el número de recursos escritos.
+    """
+    seen = set()
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(UNIQUE_RESOURCE_COLUMNS)
+        for kind, record in records:
+            if kind != 'recurso' or record['codigo_recurso'] in seen:
+                continue
+            seen.add(record['codigo_recurso'])
+            writer.writerow([
+                record['codigo_recurso'],
+                record['descripcion_recurso'],
+                record['unidad_recurso'],
+                record['vr_unitario']
+            ])
+    return len(seen)
+
 
 # --- MAIN ---
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extrae análisis unitarios y recursos del PDF del decreto.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Número de procesos para leer el PDF por bloques de páginas (1 = lectura serial)."
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Ignora la caché de líneas por página y vuelve a leer todo el PDF."
+    )
+    parser.add_argument(
+        "--benchmark-parser", action="store_true",
+        help="Solo mide el rendimiento del parser de recursos (líneas/segundo) sobre las líneas del PDF."
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     pdf_path = os.path.join("data_gobernacion", "-ANALISIS UNITARIOS DECRET 1276 -2021.pdf")
     output_dir = "data_gobernacion"
     
-    # 1) Extraemos análisis unitarios
-    analysis_units = extract_analysis_units(pdf_path)
-    
-    # 2) Extraemos recursos
-    resources_mapping = extract_resources(pdf_path, analysis_units)
-    
-    # 3) DataFrames y guardado
-    df_analysis, df_resources = create_dataframes(analysis_units, resources_mapping)
+    if args.benchmark_parser:
+        lines = list(iter_pdf_lines(pdf_path, workers=args.workers, use_cache=not args.no_cache))
+        print(f"Parser de recursos: {benchmark_parser(lines):,.0f} líneas/segundo ({len(lines)} líneas)")
+        return
+
+    # 1) y 2) Extraemos análisis unitarios y recursos en una sola lectura del PDF
+    records = iter_extract(pdf_path, workers=args.workers, use_cache=not args.no_cache)
     
+    # 3) Guardado en streaming (los registros llegan a los CSV a medida que se parsean)
     os.makedirs(output_dir, exist_ok=True)
     analysis_csv = os.path.join(output_dir, "analisis_unitarios.csv")
     resources_csv = os.path.join(output_dir, "recursos_analisis.csv")
     
-    save_to_csv(df_analysis, df_resources, analysis_csv, resources_csv)
+    n_analysis, n_resources = write_records_csv(records, analysis_csv, resources_csv)
+    print(f"{n_analysis} análisis unitarios y {n_resources} recursos extraídos.")
     
     print("\n--- MUESTRA DE ANÁLISIS UNITARIOS ---")
-    print(df_analysis.head(10))
+    print(pd.read_csv(analysis_csv, nrows=10))
     print("\n--- MUESTRA DE RECURSOS ---")
-    print(df_resources.head(10))
+    print(pd.read_csv(resources_csv, nrows=10))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
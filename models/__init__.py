@@ -3,4 +3,6 @@ from .analisis_unitario import AnalisisUnitario
 from .recurso import Recurso
 from .analisis_unitario_recurso import AnalisisUnitarioRecurso
 from .presupuesto_analisis_unitario import PresupuestoAnalisisUnitario
-from .presupuesto import Presupuesto
\ No newline at end of file
+from .presupuesto import Presupuesto
+# Registra el mantenimiento automático de analisis_unitarios.total
+from . import totales
@@ -11,7 +11,8 @@ class AnalisisUnitario(Base):
     codigo = Column(String, unique=True, nullable=False)
     descripcion = Column(String, nullable=False)
     unidad = Column(String, nullable=False)
-    total = Column(Float, nullable=False)  # Esta columna podría ser eliminada si usas solo el híbrido
+    # Total materializado (suma de vr_parcial de sus recursos), mantenido por models/totales.py
+    total = Column(Float, nullable=False, default=0.0, index=True)
 
     recursos_asociados = relationship("AnalisisUnitarioRecurso", back_populates="analisis", passive_deletes=True)
     presupuestos_asociados = relationship("PresupuestoAnalisisUnitario", back_populates="analisis")
@@ -1,10 +1,17 @@
 from sqlalchemy.ext.hybrid import hybrid_property
 from .database import Base
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class AnalisisUnitarioRecurso(Base):
     __tablename__ = "analisis_unitarios_recursos"
+    __table_args__ = (
+        # Composición de un análisis (filter_by(codigo_analisis=...)) y búsqueda
+        # de una relación por (análisis, recurso) en la sincronización incremental
+        Index("ix_aur_analisis_recurso", "codigo_analisis", "codigo_recurso"),
+        # Índice inverso recurso -> análisis (eliminar recurso, propagar precios)
+        Index("ix_aur_codigo_recurso", "codigo_recurso"),
+    )
 
     id = Column(Integer, primary_key=True)
     codigo_analisis = Column(
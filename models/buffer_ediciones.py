@@ -0,0 +1,102 @@
+# models/buffer_ediciones.py
+"""
+Buffer de ediciones del catálogo de recursos.
+
+Las ediciones de celdas no se escriben una por una: se acumulan por código de
+recurso (varias ediciones de la misma fila se fusionan) y se guardan juntas
+con guardar_recursos(), que emite un único UPDATE por lotes (executemany) y
+propaga los cambios de precio en la misma transacción. Mientras no se
+guarden, las ediciones se pueden deshacer y recuperar el valor original.
+"""
+from collections import OrderedDict
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm.attributes import set_committed_value
+from .propagacion import propagar_precios
+from .recurso import Recurso
+
+# Campos editables del recurso
+CAMPOS = ("descripcion", "unidad", "valor_unitario")
+
+class BufferEdiciones:
+    def __init__(self):
+        # codigo -> {"original": {...}, "actual": {...}}, en orden de última edición
+        self._cambios = OrderedDict()
+
+    def __len__(self):
+        return len(self._cambios)
+
+    def __contains__(self, codigo):
+        return codigo in self._cambios
+
+    def registrar(self, codigo, original, actual):
+        """
+        Registra los valores actuales de una fila. 'original' solo se guarda la
+        primera vez; si la fila vuelve a sus valores originales deja de estar
+        pendiente. Retorna True si la fila queda con cambios pendientes.
+        """
+        cambio = self._cambios.pop(codigo, None)
+        original = cambio["original"] if cambio else dict(original)
+        if dict(actual) == original:
+            return False
+        self._cambios[codigo] = {"original": original, "actual": dict(actual)}
+        return True
+
+    def original(self, codigo):
+        return self._cambios[codigo]["original"]
+
+    def deshacer_ultimo(self):
+        """Descarta la fila editada más recientemente. Retorna (codigo, valores originales) o None."""
+        if not self._cambios:
+            return None
+        codigo, cambio = self._cambios.popitem(last=True)
+        return codigo, cambio["original"]
+
+    def deshacer_todo(self):
+        """Descarta todas las ediciones. Retorna la lista de (codigo, valores originales)."""
+        deshechos = [(codigo, c["original"]) for codigo, c in self._cambios.items()]
+        self._cambios.clear()
+        return deshechos
+
+    def pendientes(self):
+        """Lista de (codigo, valores actuales) de las filas con cambios."""
+        return [(codigo, c["actual"]) for codigo, c in self._cambios.items()]
+
+    def precios_modificados(self):
+        return [
+            codigo for codigo, c in self._cambios.items()
+            if c["actual"].get("valor_unitario") != c["original"].get("valor_unitario")
+        ]
+
+    def limpiar(self):
+        self._cambios.clear()
+
+def guardar_recursos(session, buffer):
+    """
+    Escribe todas las ediciones pendientes del buffer con un UPDATE por lotes
+    y propaga los precios modificados a análisis y presupuestos. No hace
+    commit. Retorna el resumen de propagar_precios().
+    """
+    pendientes = buffer.pendientes()
+    if not pendientes:
+        return None
+
+    tabla = Recurso.__table__
+    stmt = (
+        update(tabla)
+        .where(tabla.c.codigo == bindparam("b_codigo"))
+        .values({campo: bindparam(f"b_{campo}") for campo in CAMPOS})
+    )
+    session.connection().execute(stmt, [
+        {"b_codigo": codigo, **{f"b_{campo}": valores[campo] for campo in CAMPOS}}
+        for codigo, valores in pendientes
+    ])
+
+    # Los objetos Recurso cargados en la sesión quedan con los valores nuevos
+    # sin volver a consultarlos
+    por_codigo = {codigo: valores for codigo, valores in pendientes}
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Recurso) and obj.codigo in por_codigo:
+            for campo in CAMPOS:
+                set_committed_value(obj, campo, por_codigo[obj.codigo][campo])
+
+    return propagar_precios(session, buffer.precios_modificados())
@@ -0,0 +1,263 @@
+# models/busqueda.py
+"""
+Índice de búsqueda en memoria para catálogos por código y descripción.
+
+El texto se normaliza una sola vez al construir el índice (minúsculas con
+casefold, sin tildes y sin separadores de miles entre dígitos:
+"CONCRETO 3.000 PSI Tubería" -> concreto, 3000, psi, tuberia) y se guarda:
+    - un mapa token -> códigos que lo contienen;
+    - el vocabulario ordenado, para encontrar por bisección los tokens que
+      empiezan por un prefijo, con un mapa prefijo -> códigos que se llena
+      a medida que se consulta.
+
+Una búsqueda como "concreto 3000" exige que cada palabra sea prefijo de algún
+token del código o la descripción, e intersecta los conjuntos empezando por
+el más pequeño; no recorre las filas del catálogo. Si una palabra no es
+prefijo de ningún token se busca como subcadena en el vocabulario ("creto"
+encuentra "concreto"), como hacía el filtro anterior por subcadena.
+
+VocabularioDifuso tolera errores de digitación ("escavacion", "mescladora"):
+guarda las palabras distintas del catálogo con un mapa trigrama -> palabras y
+propone, para cada palabra buscada, las del vocabulario con mayor similitud de
+trigramas (como pg_trgm). Los candidatos salen de los trigramas de la palabra
+buscada, así que el costo depende del vocabulario que comparte esos trigramas
+y no del número de filas del catálogo.
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.busqueda "concreto 3000"
+"""
+import argparse
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+_PALABRA = re.compile(r"\w+")
+# Punto o coma de miles entre dígitos: "3.000" -> "3000", "1,500" -> "1500"
+_SEPARADOR_MILES = re.compile(r"(?<=\d)[.,](?=\d{3})")
+
+# Similitud mínima de trigramas para proponer una palabra del vocabulario
+UMBRAL_SIMILITUD = 0.4
+# Máximo de palabras propuestas por cada palabra buscada
+MAX_CANDIDATOS = 5
+
+def normalizar(texto):
+    """Texto en minúsculas (casefold) y sin tildes ni diéresis."""
+    texto = (texto or "").casefold()
+    if texto.isascii():
+        return texto
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def plegar(texto):
+    """Texto como lo comparan las búsquedas: normalizar() y sin separadores de miles."""
+    return _SEPARADOR_MILES.sub("", normalizar(texto))
+
+def tokens(texto):
+    return _PALABRA.findall(plegar(texto))
+
+def trigramas(palabra):
+    """Trigramas de la palabra con dos espacios al inicio y uno al final, como pg_trgm."""
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+class IndiceBusqueda:
+    def __init__(self, codigos=(), descripciones=()):
+        self.cargar(codigos, descripciones)
+
+    def cargar(self, codigos, descripciones):
+        """Reconstruye el índice completo."""
+        # codigo -> código normalizado (para buscar subcadenas en el código)
+        self._codigos = {}
+        # codigo -> tokens del código y la descripción
+        self._tokens_de = {}
+        # token -> códigos que lo contienen
+        self._postings = defaultdict(set)
+        for codigo, descripcion in zip(codigos, descripciones):
+            self._indexar(codigo, descripcion)
+        self._invalidar()
+
+    def __len__(self):
+        return len(self._codigos)
+
+    def _indexar(self, codigo, descripcion):
+        self._codigos[codigo] = normalizar(codigo)
+        propios = set(tokens(codigo)) | set(tokens(descripcion))
+        self._tokens_de[codigo] = propios
+        for token in propios:
+            self._postings[token].add(codigo)
+
+    def _invalidar(self):
+        self._vocabulario = None
+        self._prefijos = {}
+        self._subcadenas = {}
+
+    def agregar(self, codigo, descripcion):
+        """Agrega o reemplaza un código en el índice."""
+        self.quitar(codigo)
+        self._indexar(codigo, descripcion)
+        self._invalidar()
+
+    def quitar(self, codigo):
+        for token in self._tokens_de.pop(codigo, ()):
+            postings = self._postings[token]
+            postings.discard(codigo)
+            if not postings:
+                del self._postings[token]
+        if self._codigos.pop(codigo, None) is not None:
+            self._invalidar()
+
+    def _con_prefijo(self, prefijo):
+        """Códigos con algún token que empieza por 'prefijo'."""
+        encontrados = self._prefijos.get(prefijo)
+        if encontrados is not None:
+            return encontrados
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self._postings)
+        vocabulario = self._vocabulario
+        encontrados = set()
+        i = bisect_left(vocabulario, prefijo)
+        while i < len(vocabulario) and vocabulario[i].startswith(prefijo):
+            encontrados |= self._postings[vocabulario[i]]
+            i += 1
+        self._prefijos[prefijo] = encontrados
+        return encontrados
+
+    def _con_subcadena(self, palabra):
+        """Códigos con algún token que contiene 'palabra' (recorre el vocabulario, no las filas)."""
+        encontrados = self._subcadenas.get(palabra)
+        if encontrados is not None:
+            return encontrados
+        encontrados = set()
+        for token, codigos in self._postings.items():
+            if palabra in token:
+                encontrados |= codigos
+        self._subcadenas[palabra] = encontrados
+        return encontrados
+
+    def _coincidencias(self, palabra):
+        # Prefijo por bisección; si no hay ninguno, subcadena de algún token
+        return self._con_prefijo(palabra) or self._con_subcadena(palabra)
+
+    def buscar(self, texto):
+        """
+        Códigos en los que cada palabra de 'texto' es prefijo de algún token
+        (o, si no es prefijo de ninguno, subcadena de alguno).
+        Retorna None si el texto no tiene palabras (sin filtro).
+        """
+        palabras = tokens(texto)
+        if not palabras:
+            return None
+        conjuntos = sorted((self._coincidencias(p) for p in set(palabras)), key=len)
+        resultado = set(conjuntos[0])
+        for conjunto in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado &= conjunto
+        return resultado
+
+    def filtrar(self, codigo="", descripcion=""):
+        """
+        Códigos que cumplen ambos filtros: 'codigo' como subcadena del código y
+        'descripcion' como búsqueda por palabras. None si no hay filtros.
+        """
+        resultado = self.buscar(descripcion)
+        codigo = normalizar(codigo).strip()
+        if codigo:
+            candidatos = self._codigos if resultado is None else resultado
+            resultado = {c for c in candidatos if codigo in self._codigos[c]}
+        return resultado
+
+class VocabularioDifuso:
+    """
+    Palabras distintas de un catálogo con su índice de trigramas. 'tokenizador'
+    separa cada texto en palabras; debe ser el mismo que se usa con el texto
+    buscado (por defecto, tokens(): minúsculas y sin tildes).
+    """
+    def __init__(self, textos=(), tokenizador=tokens):
+        self.tokenizador = tokenizador
+        self.palabras = set()
+        # trigrama -> palabras del vocabulario que lo contienen
+        self._trigramas = defaultdict(set)
+        self._ordenadas = None
+        for texto in textos:
+            self.agregar_texto(texto)
+
+    def __len__(self):
+        return len(self.palabras)
+
+    def agregar_texto(self, texto):
+        for palabra in self.tokenizador(texto):
+            if palabra not in self.palabras:
+                self.palabras.add(palabra)
+                for trigrama in trigramas(palabra):
+                    self._trigramas[trigrama].add(palabra)
+                self._ordenadas = None
+
+    def _tiene_prefijo(self, prefijo):
+        if self._ordenadas is None:
+            self._ordenadas = sorted(self.palabras)
+        i = bisect_left(self._ordenadas, prefijo)
+        return i < len(self._ordenadas) and self._ordenadas[i].startswith(prefijo)
+
+    def candidatos(self, palabra, maximo=MAX_CANDIDATOS, umbral=UMBRAL_SIMILITUD):
+        """
+        Lista de (palabra, puntaje) para buscar en lugar de 'palabra', de mayor
+        a menor puntaje. Si 'palabra' es prefijo de alguna del vocabulario va
+        primero con puntaje 1; le siguen las palabras con similitud de
+        trigramas >= umbral. Las palabras de menos de 3 letras no se corrigen.
+        """
+        exacta = self._tiene_prefijo(palabra)
+        resultado = [(palabra, 1.0)] if exacta else []
+        if len(palabra) < 3:
+            return resultado or [(palabra, 1.0)]
+
+        propios = trigramas(palabra)
+        compartidos = Counter()
+        for trigrama in propios:
+            compartidos.update(self._trigramas.get(trigrama, ()))
+        parecidas = []
+        for candidata, comunes in compartidos.items():
+            if exacta and candidata.startswith(palabra):
+                # Ya la encuentra la búsqueda por prefijo
+                continue
+            similitud = comunes / (len(propios) + len(trigramas(candidata)) - comunes)
+            if similitud >= umbral:
+                parecidas.append((candidata, similitud))
+        parecidas.sort(key=lambda par: (-par[1], par[0]))
+        resultado.extend(parecidas[:maximo - len(resultado)])
+        return resultado or [(palabra, 1.0)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca análisis unitarios por descripción con el índice en memoria.")
+    parser.add_argument("texto", help="Palabras a buscar, por ejemplo \"concreto 3000\"")
+    parser.add_argument("--codigo", default="", help="Subcadena del código")
+    args = parser.parse_args(argv)
+
+    from .analisis_unitario import AnalisisUnitario
+    from .database import SessionLocal
+    session = SessionLocal()
+    try:
+        filas = session.query(AnalisisUnitario.codigo, AnalisisUnitario.descripcion).all()
+        inicio = time.perf_counter()
+        indice = IndiceBusqueda([f.codigo for f in filas], [f.descripcion for f in filas])
+        construccion = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        encontrados = indice.filtrar(args.codigo, args.texto) or set()
+        consulta = time.perf_counter() - inicio
+
+        descripciones = dict(filas)
+        for codigo in sorted(encontrados)[:50]:
+            print(f"{codigo}\t{descripciones[codigo]}")
+        print(f"{len(encontrados)} de {len(indice)} análisis - "
+              f"Índice: {construccion * 1000:.1f} ms - Búsqueda: {consulta * 1000:.2f} ms")
+        return encontrados
+    except Exception as e:
+        print("Error al buscar análisis:", e)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
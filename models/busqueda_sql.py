@@ -0,0 +1,294 @@
+# models/busqueda_sql.py
+"""
+Búsqueda en el servidor sobre recursos y análisis unitarios.
+
+En PostgreSQL se usa búsqueda de texto completo con la configuración en
+español sobre la descripción (índice GIN sobre to_tsvector) y trigramas
+(pg_trgm) para las subcadenas del código. Si la extensión unaccent está
+disponible se crea la configuración 'espanol_sin_tildes' (spanish + unaccent),
+de modo que "excavacion" encuentra "EXCAVACIÓN". Cada palabra se busca como
+prefijo ("concreto 3000" -> concret:* & 3000:*), así sirve mientras se escribe.
+Como en el índice en memoria (models/busqueda.py), los separadores de miles
+entre dígitos se quitan de ambos lados: la descripción se indexa con
+regexp_replace (MILES_SQL), así "3000" encuentra "CONCRETO 3.000 PSI".
+Con un vocabulario difuso (cargar_vocabulario) las palabras mal escritas se
+amplían a las del catálogo que se les parecen ("mescladora" -> mezcladora) y
+el rango suma el puntaje de similitud de cada palabra.
+
+Los resultados salen ordenados por relevancia (ts_rank_cd, con prioridad a los
+códigos que empiezan por el texto) y se paginan por conjunto de claves: la
+clave de cada fila es (rango, codigo) y la página siguiente se pide con
+despues_de=<clave de la última fila>. Así los paneles consultan solo las
+coincidencias, sin tener el catálogo completo en memoria.
+
+En otras bases se usa un filtro por subcadena de cada palabra, con el mismo
+puntaje por palabra. En SQLite (desarrollo y pruebas) ambos lados se
+comparan sin tildes con la función sin_tildes, que se registra en la
+conexión (lower() de SQLite solo pasa a minúsculas el ASCII, así que
+"excavación" no encontraría "EXCAVACIÓN"). En otros motores la tolerancia a
+tildes depende de la intercalación (collation) de la columna.
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.busqueda_sql "concreto 3000"
+    python -m models.busqueda_sql "tuberia pvc" --recursos
+    python -m models.busqueda_sql "mescladora" --recursos --difuso
+    python -m models.busqueda_sql --preparar     # extensiones, configuración e índices
+"""
+import argparse
+import re
+import time
+from sqlalchemy import and_, case, func, literal_column, or_, select, text
+from .analisis_unitario import AnalisisUnitario
+from .busqueda import VocabularioDifuso, plegar, tokens
+from .recurso import Recurso
+
+# Filas por página
+PAGINA = 50
+
+# Configuración de texto completo con tildes ignoradas y la de respaldo
+CONFIGURACION = "espanol_sin_tildes"
+CONFIGURACION_BASE = "spanish"
+
+# Quita los separadores de miles entre dígitos, como busqueda._SEPARADOR_MILES.
+# Va como literal (no como parámetro) para que la expresión coincida con la del índice.
+MILES_SQL = r"regexp_replace(descripcion, '(?<=\d)[.,](?=\d{3})', '', 'g')"
+
+# (tabla, columna de valor) de cada catálogo
+_TABLAS = {
+    "recursos": (Recurso.__table__, Recurso.__table__.c.valor_unitario),
+    "analisis_unitarios": (AnalisisUnitario.__table__, AnalisisUnitario.__table__.c.total),
+}
+
+# Configuración disponible por URL de la base (se consulta una vez)
+_configuraciones = {}
+
+# ---------------------------
+# Preparación de la base
+# ---------------------------
+def _intentar(conn, sql):
+    """Ejecuta 'sql' en un punto de guardado; si falla (p. ej. sin permisos) la transacción sigue. Retorna True si se aplicó."""
+    try:
+        with conn.begin_nested():
+            conn.execute(text(sql))
+        return True
+    except Exception as e:
+        print(f"Aviso: no se pudo ejecutar '{sql}': {e}")
+        return False
+
+def preparar_busqueda(conn):
+    """
+    Crea en PostgreSQL las extensiones, la configuración sin tildes y los
+    índices de búsqueda que falten. 'conn' es una conexión con una transacción
+    en curso (por ejemplo, dentro de una migración). Retorna la configuración
+    de texto completo con la que quedaron creados los índices.
+    """
+    if conn.dialect.name != "postgresql":
+        return None
+    trigramas = _intentar(conn, "CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    if _intentar(conn, "CREATE EXTENSION IF NOT EXISTS unaccent") and not _existe_configuracion(conn, CONFIGURACION):
+        _intentar(conn, f"""
+            CREATE TEXT SEARCH CONFIGURATION {CONFIGURACION} (COPY = {CONFIGURACION_BASE});
+            ALTER TEXT SEARCH CONFIGURATION {CONFIGURACION}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        """)
+    configuracion = CONFIGURACION if _existe_configuracion(conn, CONFIGURACION) else CONFIGURACION_BASE
+    _configuraciones.pop(str(conn.engine.url), None)
+
+    for nombre in _TABLAS:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{nombre}_descripcion_fts ON {nombre} "
+            f"USING gin (to_tsvector('{configuracion}'::regconfig, {MILES_SQL}))"
+        ))
+        if trigramas:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{nombre}_codigo_trgm ON {nombre} "
+                f"USING gin (codigo gin_trgm_ops)"
+            ))
+        conn.execute(text(f"ANALYZE {nombre}"))
+    return configuracion
+
+def _existe_configuracion(conn, nombre):
+    return conn.execute(
+        text("SELECT 1 FROM pg_ts_config WHERE cfgname = :nombre"), {"nombre": nombre}
+    ).first() is not None
+
+def configuracion_de(conn):
+    """Configuración de texto completo que usan los índices de esta base."""
+    clave = str(conn.engine.url)
+    if clave not in _configuraciones:
+        _configuraciones[clave] = (
+            CONFIGURACION if _existe_configuracion(conn, CONFIGURACION) else CONFIGURACION_BASE
+        )
+    return _configuraciones[clave]
+
+# ---------------------------
+# Consultas
+# ---------------------------
+def _palabras_simples(texto):
+    return re.findall(r"\w+", (texto or "").casefold())
+
+def _registrar_sin_tildes(conn):
+    """Registra en la conexión SQLite la función sin_tildes(texto) (models/busqueda.plegar)."""
+    conn.connection.driver_connection.create_function("sin_tildes", 1, plegar, deterministic=True)
+
+def tokenizador_de(conn):
+    """
+    Separa el texto en palabras como las compara esta base: sin tildes en
+    SQLite y si la configuración de texto completo usa unaccent; si no, tal
+    como están guardadas (con tildes).
+    """
+    if conn.dialect.name == "sqlite":
+        return tokens
+    if conn.dialect.name == "postgresql" and configuracion_de(conn) == CONFIGURACION:
+        return tokens
+    return _palabras_simples
+
+def _alternativas(conn, texto, vocabulario):
+    """Por cada palabra buscada, lista de (palabra a buscar, puntaje), la mejor primero."""
+    palabras = tokenizador_de(conn)(texto)
+    if vocabulario is None:
+        return [[(p, 1.0)] for p in palabras]
+    return [vocabulario.candidatos(p) for p in palabras]
+
+def _condiciones(conn, tabla, texto, vocabulario=None):
+    """
+    (condición de coincidencia, expresión de rango) para 'texto' según el motor.
+    Cada palabra debe coincidir con alguna de sus alternativas; el rango suma,
+    por palabra, el puntaje de la mejor alternativa encontrada.
+    """
+    alternativas = _alternativas(conn, texto, vocabulario)
+    texto_codigo = texto.strip()
+    bono_codigo = case((tabla.c.codigo.istartswith(texto_codigo, autoescape=True), 1.0), else_=0.0)
+
+    if conn.dialect.name != "postgresql":
+        if conn.dialect.name == "sqlite":
+            # Las palabras ya vienen plegadas por tokens(); se pliegan también las columnas
+            _registrar_sin_tildes(conn)
+            columnas = (func.sin_tildes(tabla.c.descripcion), func.sin_tildes(tabla.c.codigo))
+        else:
+            columnas = (tabla.c.descripcion, tabla.c.codigo)
+
+        def coincide(palabra):
+            return or_(*(columna.icontains(palabra, autoescape=True) for columna in columnas))
+        condicion = and_(*(or_(*(coincide(p) for p, _ in opciones)) for opciones in alternativas))
+        puntajes = [case(*((coincide(p), puntaje) for p, puntaje in opciones), else_=0.0) for opciones in alternativas]
+        return condicion, sum(puntajes, bono_codigo)
+
+    regconfig = literal_column(f"'{configuracion_de(conn)}'::regconfig")
+    descripcion = literal_column(MILES_SQL.replace("descripcion", f"{tabla.name}.descripcion", 1))
+    vector = func.to_tsvector(regconfig, descripcion)
+    consulta = func.to_tsquery(regconfig, " & ".join(
+        "(" + " | ".join(f"{p}:*" for p, _ in opciones) + ")" for opciones in alternativas
+    ))
+    condicion = or_(
+        vector.op("@@")(consulta),
+        tabla.c.codigo.icontains(texto_codigo, autoescape=True),
+    )
+    # Las alternativas vienen de mayor a menor puntaje: el primer WHEN que coincide es el mejor
+    puntajes = [
+        case(*((vector.op("@@")(func.to_tsquery(regconfig, f"{p}:*")), puntaje) for p, puntaje in opciones), else_=0.0)
+        for opciones in alternativas
+    ]
+    return condicion, sum(puntajes, func.ts_rank_cd(vector, consulta) + bono_codigo)
+
+def cargar_vocabulario(session, catalogo):
+    """
+    Vocabulario difuso (models/busqueda.py) con las palabras de los códigos y
+    descripciones del catálogo. Las filas se leen por lotes y solo se conservan
+    las palabras distintas, no el catálogo.
+    """
+    tabla, _ = _TABLAS[catalogo]
+    vocabulario = VocabularioDifuso(tokenizador=tokenizador_de(session.connection()))
+    filas = session.execute(
+        select(tabla.c.codigo, tabla.c.descripcion).execution_options(yield_per=2000)
+    )
+    for codigo, descripcion in filas:
+        vocabulario.agregar_texto(f"{codigo} {descripcion}")
+    return vocabulario
+
+def buscar(session, catalogo, texto, codigo="", despues_de=None, antes_de=None, limite=PAGINA, vocabulario=None):
+    """
+    Coincidencias de 'texto' en el catálogo ("recursos" o "analisis_unitarios")
+    ordenadas por relevancia. Cada fila es (codigo, descripcion, unidad, valor,
+    rango); 'codigo' filtra además por subcadena del código. 'despues_de' y
+    'antes_de' son claves (rango, codigo) de la última o la primera fila de la
+    página actual; las páginas anteriores también se retornan en orden de
+    relevancia. Con un 'vocabulario' (cargar_vocabulario) cada palabra admite
+    también las del catálogo que se le parecen, para tolerar errores de
+    digitación. Sin palabras en 'texto' retorna una lista vacía.
+    """
+    if not re.search(r"\w", texto or ""):
+        return []
+    tabla, valor = _TABLAS[catalogo]
+    conn = session.connection()
+    condicion, rango = _condiciones(conn, tabla, texto, vocabulario)
+    rango = rango.label("rango")
+
+    interna = select(tabla.c.codigo, tabla.c.descripcion, tabla.c.unidad, valor, rango).where(condicion)
+    if codigo:
+        interna = interna.where(tabla.c.codigo.icontains(codigo, autoescape=True))
+    resultados = interna.subquery()
+    consulta = select(resultados)
+
+    if antes_de is not None:
+        r, c = antes_de
+        consulta = consulta.where(or_(
+            resultados.c.rango > r, and_(resultados.c.rango == r, resultados.c.codigo < c)
+        )).order_by(resultados.c.rango, resultados.c.codigo.desc())
+        filas = session.execute(consulta.limit(limite)).all()
+        filas.reverse()
+        return filas
+
+    if despues_de is not None:
+        r, c = despues_de
+        consulta = consulta.where(or_(
+            resultados.c.rango < r, and_(resultados.c.rango == r, resultados.c.codigo > c)
+        ))
+    consulta = consulta.order_by(resultados.c.rango.desc(), resultados.c.codigo)
+    return session.execute(consulta.limit(limite)).all()
+
+def buscar_recursos(session, texto, **kwargs):
+    return buscar(session, "recursos", texto, **kwargs)
+
+def buscar_analisis(session, texto, **kwargs):
+    return buscar(session, "analisis_unitarios", texto, **kwargs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca en el servidor recursos o análisis unitarios por relevancia.")
+    parser.add_argument("texto", nargs="?", default="", help="Palabras a buscar, por ejemplo \"concreto 3000\"")
+    parser.add_argument("--recursos", action="store_true", help="Buscar recursos en lugar de análisis.")
+    parser.add_argument("--limite", type=int, default=PAGINA)
+    parser.add_argument("--difuso", action="store_true",
+                        help="Tolera errores de digitación con el vocabulario del catálogo.")
+    parser.add_argument("--preparar", action="store_true",
+                        help="Crea las extensiones, la configuración y los índices de búsqueda.")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal, engine
+    try:
+        if args.preparar:
+            with engine.begin() as conn:
+                print(f"Índices de búsqueda listos (configuración: {preparar_busqueda(conn)}).")
+            if not args.texto:
+                return
+        session = SessionLocal()
+        try:
+            catalogo = "recursos" if args.recursos else "analisis_unitarios"
+            vocabulario = None
+            if args.difuso:
+                inicio = time.perf_counter()
+                vocabulario = cargar_vocabulario(session, catalogo)
+                print(f"Vocabulario: {len(vocabulario)} palabras en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+            inicio = time.perf_counter()
+            filas = buscar(session, catalogo, args.texto, limite=args.limite, vocabulario=vocabulario)
+            for fila in filas:
+                print(f"{fila.rango:.3f}\t{fila.codigo}\t{fila.descripcion}")
+            print(f"{len(filas)} resultado(s) en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+            return filas
+        finally:
+            session.close()
+    except Exception as e:
+        print("Error en la búsqueda:", e)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# models/catalogo_recursos.py
+"""
+Lectura paginada del catálogo de recursos.
+
+pagina_recursos() lee una página de recursos en orden de código con
+paginación por conjunto de claves (keyset): en lugar de OFFSET, cada página
+empieza donde terminó la anterior (WHERE codigo > :ultimo ORDER BY codigo
+LIMIT :n). Con el índice único de recursos.codigo, leer una página cuesta lo
+mismo al principio que al final del catálogo, sin importar cuántos recursos
+tenga la tabla.
+"""
+from sqlalchemy import select
+from .recurso import Recurso
+
+# Filas por página
+PAGINA = 200
+
+_recursos = Recurso.__table__
+
+def pagina_recursos(session, despues_de=None, antes_de=None, limite=PAGINA, codigo="", descripcion=""):
+    """
+    Hasta 'limite' filas (codigo, descripcion, unidad, valor_unitario) en orden
+    ascendente de código. Con 'despues_de' se leen las que siguen a ese código;
+    con 'antes_de', las que lo preceden inmediatamente. 'codigo' y 'descripcion'
+    filtran por subcadena sin distinguir mayúsculas.
+    """
+    columnas = (_recursos.c.codigo, _recursos.c.descripcion, _recursos.c.unidad, _recursos.c.valor_unitario)
+    consulta = select(*columnas)
+    if codigo:
+        consulta = consulta.where(_recursos.c.codigo.icontains(codigo, autoescape=True))
+    if descripcion:
+        consulta = consulta.where(_recursos.c.descripcion.icontains(descripcion, autoescape=True))
+
+    if antes_de is not None:
+        # Página anterior: se lee en orden descendente desde el límite y se invierte
+        consulta = consulta.where(_recursos.c.codigo < antes_de).order_by(_recursos.c.codigo.desc())
+        filas = session.execute(consulta.limit(limite)).all()
+        filas.reverse()
+        return filas
+
+    if despues_de is not None:
+        consulta = consulta.where(_recursos.c.codigo > despues_de)
+    return session.execute(consulta.order_by(_recursos.c.codigo).limit(limite)).all()
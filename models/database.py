@@ -1,18 +1,119 @@
 import os
-from sqlalchemy import create_engine
+import configparser
+from sqlalchemy import URL, create_engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+# Configuración de la conexión. Cada valor se toma, en este orden, de:
+#   1. la variable de entorno con el mismo nombre (DB_HOST, DB_POOL_SIZE, ...)
+#   2. la sección [database] del archivo de configuración, en minúsculas
+#      (config.ini en la raíz del proyecto, o la ruta de PRESUPUESTOS_CONFIG)
+#   3. los valores por defecto de abajo
+CONFIG_FILE = os.environ.get(
+    "PRESUPUESTOS_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.ini")
+)
+
+DEFAULTS = {
+    "DB_URL": "",                      # Si se define, reemplaza a DB_NAME/DB_USER/...
+    "DB_NAME": "app_presupuestos",
+    "DB_USER": "postgres",
+    "DB_PASSWORD": "",                 # Se define en config.ini o en DB_PASSWORD
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_POOL_SIZE": "5",
+    "DB_MAX_OVERFLOW": "10",
+    "DB_POOL_PRE_PING": "true",
+    "DB_POOL_RECYCLE": "1800",         # segundos; -1 para no reciclar
+    "DB_STATEMENT_TIMEOUT_MS": "0",    # 0 = sin límite
+    "DB_EXECUTEMANY_MODE": "values_plus_batch",
+}
+
+# Modos de executemany que acepta el dialecto psycopg2 de SQLAlchemy 2.0
+EXECUTEMANY_MODES = ("values_only", "values_plus_batch")
+
+# Valores enteros de la configuración y el mínimo que admite cada uno
+ENTEROS = {
+    "DB_PORT": 1,
+    "DB_POOL_SIZE": 0,
+    "DB_MAX_OVERFLOW": -1,
+    "DB_POOL_RECYCLE": -1,
+    "DB_STATEMENT_TIMEOUT_MS": 0,
+}
+
+def cargar_configuracion(config_file=CONFIG_FILE):
+    """
+    Retorna el diccionario de configuración combinando entorno, archivo y valores por defecto.
+    Lanza ValueError si algún valor entero o el modo de executemany no es válido.
+    """
+    archivo = {}
+    if config_file and os.path.exists(config_file):
+        parser = configparser.ConfigParser()
+        parser.read(config_file, encoding="utf-8")
+        if parser.has_section("database"):
+            archivo = {k.upper(): v for k, v in parser.items("database")}
+    config = {clave: os.environ.get(clave, archivo.get(clave, defecto)) for clave, defecto in DEFAULTS.items()}
+    validar_configuracion(config)
+    return config
+
+def validar_configuracion(config):
+    """Comprueba los valores enteros y el modo de executemany; lanza ValueError con el valor inválido."""
+    for clave, minimo in ENTEROS.items():
+        try:
+            valor = int(str(config[clave]).strip())
+        except ValueError:
+            raise ValueError(f"{clave} debe ser un número entero (se recibió {config[clave]!r})") from None
+        if valor < minimo:
+            raise ValueError(f"{clave} debe ser mayor o igual que {minimo} (se recibió {valor})")
+    modo = str(config["DB_EXECUTEMANY_MODE"]).strip()
+    if modo not in EXECUTEMANY_MODES:
+        raise ValueError(
+            f"DB_EXECUTEMANY_MODE debe ser uno de {', '.join(EXECUTEMANY_MODES)} (se recibió {modo!r})"
+        )
+
+def _es_verdadero(valor):
+    return str(valor).strip().lower() in ("1", "true", "yes", "si", "sí", "on")
+
+CONFIG = cargar_configuracion()
+
 # Datos de conexión
-DB_NAME = "app_presupuestos"
-DB_USER = "postgres"
-DB_PASSWORD = "123Randy"
-DB_HOST = "localhost"
-DB_PORT = "5432"
+DB_NAME = CONFIG["DB_NAME"]
+DB_USER = CONFIG["DB_USER"]
+DB_PASSWORD = CONFIG["DB_PASSWORD"]
+DB_HOST = CONFIG["DB_HOST"]
+DB_PORT = CONFIG["DB_PORT"]
+
+# URL.create escapa los caracteres especiales de la contraseña (@, /, :, ...)
+DATABASE_URL = CONFIG["DB_URL"] or URL.create(
+    drivername="postgresql",
+    username=DB_USER,
+    password=DB_PASSWORD or None,
+    host=DB_HOST,
+    port=int(DB_PORT),
+    database=DB_NAME,
+)
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+def crear_engine(config=CONFIG, url=DATABASE_URL):
+    """Crea el engine con el pool y las opciones de psycopg2 de la configuración."""
+    connect_args = {}
+    timeout = int(config["DB_STATEMENT_TIMEOUT_MS"])
+    if timeout > 0:
+        connect_args["options"] = f"-c statement_timeout={timeout}"
+    opciones = {}
+    # executemany_mode es propio del dialecto psycopg2
+    if make_url(url).drivername in ("postgresql", "postgresql+psycopg2"):
+        opciones["executemany_mode"] = config["DB_EXECUTEMANY_MODE"].strip()
+    return create_engine(
+        url,
+        pool_size=int(config["DB_POOL_SIZE"]),
+        max_overflow=int(config["DB_MAX_OVERFLOW"]),
+        pool_pre_ping=_es_verdadero(config["DB_POOL_PRE_PING"]),
+        pool_recycle=int(config["DB_POOL_RECYCLE"]),
+        connect_args=connect_args,
+        **opciones
+    )
 
-# Crear el motor de conexión (engine)
-engine = create_engine(DATABASE_URL)
+# Crear el motor de conexión (engine); sesiones y cargas masivas comparten su pool
+engine = crear_engine()
 
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,18 +123,12 @@ Base = declarative_base()
 
 def get_db_connection():
     """
-    Conecta a la base de datos usando psycopg2 (útil para operaciones directas)
+    Conexión psycopg2 (útil para operaciones directas como COPY) tomada del
+    pool del engine. Se usa igual que una conexión de psycopg2; al llamar a
+    close() vuelve al pool en lugar de cerrarse.
     """
-    import psycopg2
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        return conn
+        return engine.raw_connection()
     except Exception as e:
         print("Error al conectar con la base de datos:", e)
         return None
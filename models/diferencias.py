@@ -0,0 +1,88 @@
+# models/diferencias.py
+"""
+Guardado por diferencias de las tablas de detalle (recursos de un análisis,
+ítems de un presupuesto).
+
+En lugar de borrar todas las filas del padre y volver a insertarlas, se
+compara lo que hay en la vista con la instantánea cargada de la base y solo
+se escriben los cambios: un DELETE para las filas quitadas, un UPDATE por
+lotes (por clave primaria) para las modificadas y un INSERT por lotes para
+las nuevas.
+"""
+from sqlalchemy import delete, insert, update
+
+def _normalizar(valor):
+    # Las vistas leen los textos con strip(); la instantánea debe compararse igual
+    return valor.strip() if isinstance(valor, str) else valor
+
+def instantanea(objetos, campos):
+    """
+    {id: {campo: valor}} de los objetos cargados, para comparar al guardar.
+    Los textos se guardan sin espacios al inicio ni al final, como los leen
+    las vistas, para que una fila sin tocar no cuente como modificada.
+    """
+    return {obj.id: {campo: _normalizar(getattr(obj, campo)) for campo in campos} for obj in objetos}
+
+def diferenciar(snapshot, filas, campos):
+    """
+    Compara las filas de la vista con la instantánea.
+    'filas' es una lista de diccionarios con los 'campos' y la clave 'id'
+    (None para las filas que aún no existen en la base).
+    Retorna (nuevas, modificadas, eliminadas):
+      nuevas       lista de índices en 'filas' sin id
+      modificadas  lista de diccionarios {'id', campos...} que cambiaron
+      eliminadas   lista de ids de la instantánea que ya no están en la vista
+    """
+    nuevas = []
+    modificadas = []
+    vistos = set()
+    for i, fila in enumerate(filas):
+        fila_id = fila.get("id")
+        if fila_id is None or fila_id not in snapshot:
+            nuevas.append(i)
+            continue
+        vistos.add(fila_id)
+        valores = {campo: fila[campo] for campo in campos}
+        if valores != snapshot[fila_id]:
+            modificadas.append({"id": fila_id, **valores})
+    eliminadas = [fila_id for fila_id in snapshot if fila_id not in vistos]
+    return nuevas, modificadas, eliminadas
+
+def aplicar_diferencias(session, modelo, filas, campos, fijos, diferencias):
+    """
+    Escribe las diferencias calculadas por diferenciar() sin hacer commit.
+    'fijos' son los valores comunes de las filas nuevas (por ejemplo, el código
+    del padre). Retorna la lista de ids asignados a las filas nuevas, en el
+    mismo orden que 'nuevas'.
+    """
+    nuevas, modificadas, eliminadas = diferencias
+    if eliminadas:
+        session.execute(
+            delete(modelo).where(modelo.id.in_(eliminadas)),
+            execution_options={"synchronize_session": False}
+        )
+    if modificadas:
+        # UPDATE por lotes por clave primaria (executemany)
+        session.execute(update(modelo), modificadas)
+    ids = []
+    if nuevas:
+        ids = list(session.scalars(
+            insert(modelo).returning(modelo.id, sort_by_parameter_order=True),
+            [{**fijos, **{campo: filas[i][campo] for campo in campos}} for i in nuevas]
+        ))
+
+    # Los objetos del modelo que la sesión tenga en memoria se releen la próxima vez
+    tocados = set(eliminadas) | {m["id"] for m in modificadas}
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, modelo) and obj.id in tocados:
+            if obj.id in eliminadas:
+                session.expunge(obj)
+            else:
+                session.expire(obj)
+    return ids
+
+def nueva_instantanea(filas, campos, ids_nuevas, nuevas):
+    """Instantánea equivalente a lo que quedó guardado, sin volver a consultar la base."""
+    for i, fila_id in zip(nuevas, ids_nuevas):
+        filas[i]["id"] = fila_id
+    return {fila["id"]: {campo: fila[campo] for campo in campos} for fila in filas}
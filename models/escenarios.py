@@ -0,0 +1,154 @@
+# models/escenarios.py
+"""
+Simulación de escenarios de precios ("¿qué pasa si el acero sube 12% y la
+mano de obra 8%?").
+
+Un Escenario es una lista de reglas que multiplican el precio de los recursos
+seleccionados por prefijo de código, por unidad o por lista explícita de
+códigos; si un recurso cumple varias reglas, los factores se acumulan.
+El SimuladorEscenarios carga una sola vez el grafo de costos
+(models/grafo_costos.py) y evalúa cualquier número de escenarios sobre esa
+instantánea, sin escribir en la base de datos.
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.escenarios --prefijo MO 1.08 --codigos 0101,0102 1.12
+"""
+import argparse
+import numpy as np
+from .grafo_costos import GrafoCostos
+
+# Diferencias menores a esto se consideran sin cambio
+EPSILON = 1e-9
+
+class Escenario:
+    """Conjunto de multiplicadores de precio con un nombre."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.reglas = []
+
+    def por_prefijo(self, prefijo, factor):
+        """Multiplica los recursos cuyo código empieza por 'prefijo'."""
+        self.reglas.append(("prefijo", prefijo.strip().upper(), float(factor)))
+        return self
+
+    def por_unidad(self, unidad, factor):
+        """Multiplica los recursos con la unidad indicada (sin distinguir mayúsculas)."""
+        self.reglas.append(("unidad", unidad.strip().upper(), float(factor)))
+        return self
+
+    def por_codigos(self, codigos, factor):
+        """Multiplica los recursos de la lista de códigos."""
+        self.reglas.append(("codigos", [c.strip() for c in codigos], float(factor)))
+        return self
+
+    def multiplicadores(self, codigos, unidades):
+        """
+        Vector de factores alineado con 'codigos'/'unidades' (arreglos NumPy de
+        texto), con 1.0 para los recursos que no cumplen ninguna regla.
+        """
+        factores = np.ones(len(codigos), dtype=np.float64)
+        for tipo, valor, factor in self.reglas:
+            if tipo == "prefijo":
+                seleccion = np.char.startswith(np.char.upper(codigos), valor)
+            elif tipo == "unidad":
+                seleccion = np.char.upper(unidades) == valor
+            else:
+                seleccion = np.isin(codigos, valor)
+            factores[seleccion] *= factor
+        return factores
+
+class SimuladorEscenarios:
+    """Evalúa escenarios sobre una instantánea del grafo de costos."""
+
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.base = grafo.calcular()
+        self._codigos = np.array(grafo.codigos_recurso, dtype=str)
+        self._unidades = np.array([u or "" for u in grafo.unidades_recurso], dtype=str)
+
+    @classmethod
+    def cargar(cls, session):
+        return cls(GrafoCostos.cargar(session))
+
+    def calcular(self, escenario):
+        """Resultado completo (arreglos de grafo.calcular) con los precios del escenario."""
+        factores = escenario.multiplicadores(self._codigos, self._unidades)
+        return self.grafo.calcular(self.grafo.precios * factores)
+
+    def simular(self, escenario):
+        """
+        Evalúa un escenario y retorna un reporte con los análisis y presupuestos
+        cuyo total cambia: codigo, total_actual, total_escenario, diferencia y
+        variacion (porcentaje; None si el total actual es 0).
+        """
+        factores = escenario.multiplicadores(self._codigos, self._unidades)
+        resultado = self.grafo.calcular(self.grafo.precios * factores)
+        return {
+            "escenario": escenario.nombre,
+            "recursos_afectados": int(np.count_nonzero(factores != 1.0)),
+            "analisis": _diferencias(
+                self.grafo.codigos_analisis, self.base["total_analisis"], resultado["total_analisis"]
+            ),
+            "presupuestos": _diferencias(
+                self.grafo.codigos_presupuesto, self.base["total_presupuesto"], resultado["total_presupuesto"]
+            ),
+        }
+
+    def simular_varios(self, escenarios):
+        """Evalúa varios escenarios sobre la misma instantánea."""
+        return [self.simular(e) for e in escenarios]
+
+def _diferencias(codigos, actual, escenario):
+    diferencia = escenario - actual
+    cambiados = np.flatnonzero(np.abs(diferencia) > EPSILON)
+    filas = []
+    for i in cambiados:
+        filas.append({
+            "codigo": codigos[i],
+            "total_actual": float(actual[i]),
+            "total_escenario": float(escenario[i]),
+            "diferencia": float(diferencia[i]),
+            "variacion": float(diferencia[i] / actual[i] * 100) if actual[i] else None,
+        })
+    return filas
+
+def imprimir_reporte(reporte, limite=20):
+    print(f"Escenario '{reporte['escenario']}': {reporte['recursos_afectados']} recursos afectados, "
+          f"{len(reporte['analisis'])} análisis y {len(reporte['presupuestos'])} presupuestos cambian.")
+    for p in reporte["presupuestos"][:limite]:
+        variacion = f"{p['variacion']:+.2f}%" if p["variacion"] is not None else "n/a"
+        print(f"  {p['codigo']}: {p['total_actual']:,.2f} -> {p['total_escenario']:,.2f} ({variacion})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simula un escenario de precios sin modificar la base de datos.")
+    parser.add_argument("--nombre", default="escenario")
+    parser.add_argument("--prefijo", nargs=2, action="append", default=[], metavar=("PREFIJO", "FACTOR"))
+    parser.add_argument("--unidad", nargs=2, action="append", default=[], metavar=("UNIDAD", "FACTOR"))
+    parser.add_argument("--codigos", nargs=2, action="append", default=[], metavar=("COD1,COD2", "FACTOR"))
+    args = parser.parse_args(argv)
+
+    escenario = Escenario(args.nombre)
+    for prefijo, factor in args.prefijo:
+        escenario.por_prefijo(prefijo, factor)
+    for unidad, factor in args.unidad:
+        escenario.por_unidad(unidad, factor)
+    for codigos, factor in args.codigos:
+        escenario.por_codigos(codigos.split(","), factor)
+
+    from .database import SessionLocal
+    session = SessionLocal()
+    try:
+        simulador = SimuladorEscenarios.cargar(session)
+    except Exception as e:
+        print("Error al cargar el grafo de costos:", e)
+        return None
+    finally:
+        session.close()
+
+    reporte = simulador.simular(escenario)
+    imprimir_reporte(reporte)
+    return reporte
+
+if __name__ == "__main__":
+    main()
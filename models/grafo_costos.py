@@ -0,0 +1,202 @@
+# models/grafo_costos.py
+"""
+Grafo de costos en memoria.
+
+Carga recursos, composiciones de análisis e ítems de presupuesto en arreglos
+NumPy indexados por enteros (la posición de cada código) y recalcula todos
+los vr_parcial, totales de análisis y totales de presupuesto con operaciones
+vectorizadas, sin consultas por fila ni lectura de widgets:
+
+    vr_parcial        = cantidad_efectiva * precio[recurso]
+    total_analisis    = bincount(analisis, vr_parcial)
+    vr_total (ítem)   = cantidad_item * total_analisis[analisis_item]
+    total_presupuesto = bincount(presupuesto, vr_total)
+
+La cantidad efectiva de cada relación (cantidad con desperdicio) se deriva de
+los valores guardados, vr_parcial / vr_unitario, igual que en
+models/propagacion.py; si vr_unitario es 0 se usa cantidad * (1 + desperdicio).
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.grafo_costos
+"""
+import time
+import numpy as np
+from sqlalchemy import select
+from .analisis_unitario import AnalisisUnitario
+from .analisis_unitario_recurso import AnalisisUnitarioRecurso
+from .presupuesto import Presupuesto
+from .presupuesto_analisis_unitario import PresupuestoAnalisisUnitario
+from .recurso import Recurso
+
+def _indices(codigos, indice):
+    """Convierte una secuencia de códigos en posiciones; -1 si el código no existe."""
+    return np.fromiter((indice.get(c, -1) for c in codigos), dtype=np.int64, count=len(codigos))
+
+def _cantidad_efectiva(cantidad, desper, vr_unitario, vr_parcial):
+    """Cantidad con desperdicio de cada relación, tal como quedó guardada."""
+    con_precio = vr_unitario != 0
+    return np.where(
+        con_precio,
+        vr_parcial / np.where(con_precio, vr_unitario, 1.0),
+        cantidad * (1.0 + desper),
+    )
+
+class GrafoCostos:
+    """
+    Instantánea de la estructura de costos. Se carga una vez con cargar() y
+    se puede recalcular tantas veces como se quiera con precios distintos.
+    """
+
+    def __init__(self, recursos, precios, analisis, relaciones, presupuestos, items, unidades=None):
+        # Nodos: listas de códigos (la posición es el id entero) y su índice inverso
+        self.codigos_recurso = list(recursos)
+        self.unidades_recurso = list(unidades) if unidades is not None else [""] * len(self.codigos_recurso)
+        self.codigos_analisis = list(analisis)
+        self.codigos_presupuesto = list(presupuestos)
+        self.indice_recurso = {c: i for i, c in enumerate(self.codigos_recurso)}
+        self.indice_analisis = {c: i for i, c in enumerate(self.codigos_analisis)}
+        self.indice_presupuesto = {c: i for i, c in enumerate(self.codigos_presupuesto)}
+        self.precios = np.asarray(precios, dtype=np.float64)
+
+        # Aristas análisis -> recurso (relaciones cuyo análisis y recurso existen)
+        rel_analisis = _indices([r[0] for r in relaciones], self.indice_analisis)
+        rel_recurso = _indices([r[1] for r in relaciones], self.indice_recurso)
+        valores = np.array([r[2:] for r in relaciones], dtype=np.float64).reshape(-1, 4)
+        validas = (rel_analisis >= 0) & (rel_recurso >= 0)
+        self.rel_analisis = rel_analisis[validas]
+        self.rel_recurso = rel_recurso[validas]
+        self.rel_cantidad = _cantidad_efectiva(*valores[validas].T)
+
+        # Aristas presupuesto -> análisis
+        item_presupuesto = _indices([i[0] for i in items], self.indice_presupuesto)
+        item_analisis = _indices([i[1] for i in items], self.indice_analisis)
+        cantidades = np.array([i[2] for i in items], dtype=np.float64)
+        validos = (item_presupuesto >= 0) & (item_analisis >= 0)
+        self.item_presupuesto = item_presupuesto[validos]
+        self.item_analisis = item_analisis[validos]
+        self.item_cantidad = cantidades[validos]
+
+    @classmethod
+    def cargar(cls, session):
+        """Construye el grafo con cinco consultas de columnas (sin objetos ORM)."""
+        recursos = session.execute(select(Recurso.codigo, Recurso.valor_unitario, Recurso.unidad)).all()
+        analisis = session.execute(select(AnalisisUnitario.codigo)).scalars().all()
+        relaciones = session.execute(select(
+            AnalisisUnitarioRecurso.codigo_analisis,
+            AnalisisUnitarioRecurso.codigo_recurso,
+            AnalisisUnitarioRecurso.cantidad_recurso,
+            AnalisisUnitarioRecurso.desper,
+            AnalisisUnitarioRecurso.vr_unitario,
+            AnalisisUnitarioRecurso.vr_parcial,
+        )).all()
+        presupuestos = session.execute(select(Presupuesto.codigo)).scalars().all()
+        items = session.execute(select(
+            PresupuestoAnalisisUnitario.codigo_presupuesto,
+            PresupuestoAnalisisUnitario.codigo_analisis,
+            PresupuestoAnalisisUnitario.cantidad_analisis,
+        )).all()
+        return cls(
+            [r[0] for r in recursos], [r[1] for r in recursos],
+            analisis, relaciones, presupuestos, items,
+            unidades=[r[2] for r in recursos]
+        )
+
+    def calcular(self, precios=None):
+        """
+        Recalcula toda la estructura con el vector de precios dado (alineado con
+        codigos_recurso; por defecto los precios cargados). Retorna un diccionario
+        de arreglos: vr_parcial, total_analisis, vr_total_items y total_presupuesto.
+        """
+        precios = self.precios if precios is None else np.asarray(precios, dtype=np.float64)
+        vr_parcial = self.rel_cantidad * precios[self.rel_recurso]
+        total_analisis = np.bincount(
+            self.rel_analisis, weights=vr_parcial, minlength=len(self.codigos_analisis)
+        )
+        vr_total_items = self.item_cantidad * total_analisis[self.item_analisis]
+        total_presupuesto = np.bincount(
+            self.item_presupuesto, weights=vr_total_items, minlength=len(self.codigos_presupuesto)
+        )
+        return {
+            "vr_parcial": vr_parcial,
+            "total_analisis": total_analisis,
+            "vr_total_items": vr_total_items,
+            "total_presupuesto": total_presupuesto,
+        }
+
+    def total_analisis(self, codigo, resultado=None):
+        """Total de un análisis según el resultado dado (o los precios cargados)."""
+        resultado = resultado or self.calcular()
+        return float(resultado["total_analisis"][self.indice_analisis[codigo]])
+
+    def total_presupuesto(self, codigo, resultado=None):
+        """Total de un presupuesto guardado según el resultado dado (o los precios cargados)."""
+        resultado = resultado or self.calcular()
+        return float(resultado["total_presupuesto"][self.indice_presupuesto[codigo]])
+
+class LineasPresupuesto:
+    """
+    Líneas de un presupuesto en edición (código, cantidad y costo unitario por
+    fila, en el mismo orden que la tabla). La vista guarda aquí los números y
+    solo escribe en las celdas el resultado, en lugar de volver a leer y
+    convertir el texto de cada QTableWidgetItem en cada cambio.
+    """
+
+    def __init__(self):
+        self.codigos = []
+        self.cantidades = []
+        self.costos_unitarios = []
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def agregar(self, codigo, cantidad, costo_unitario):
+        self.codigos.append(codigo)
+        self.cantidades.append(float(cantidad))
+        self.costos_unitarios.append(float(costo_unitario))
+
+    def eliminar(self, fila):
+        del self.codigos[fila]
+        del self.cantidades[fila]
+        del self.costos_unitarios[fila]
+
+    def fijar_cantidad(self, fila, cantidad):
+        self.cantidades[fila] = float(cantidad)
+
+    def limpiar(self):
+        self.codigos.clear()
+        self.cantidades.clear()
+        self.costos_unitarios.clear()
+
+    def costo_total(self, fila):
+        return self.cantidades[fila] * self.costos_unitarios[fila]
+
+    def costos_totales(self):
+        """Costo total de cada línea (cantidad * costo unitario), vectorizado."""
+        return np.asarray(self.cantidades, dtype=np.float64) * np.asarray(self.costos_unitarios, dtype=np.float64)
+
+    def total(self):
+        return float(self.costos_totales().sum())
+
+def main():
+    from .database import SessionLocal
+    session = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        grafo = GrafoCostos.cargar(session)
+        carga = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resultado = grafo.calcular()
+        calculo = time.perf_counter() - inicio
+
+        print(f"{len(grafo.codigos_recurso)} recursos, {len(grafo.codigos_analisis)} análisis, "
+              f"{len(grafo.rel_analisis)} relaciones, {len(grafo.item_presupuesto)} ítems de presupuesto")
+        print(f"Carga: {carga * 1000:.1f} ms - Recálculo completo: {calculo * 1000:.2f} ms")
+        return resultado
+    except Exception as e:
+        print("Error al construir el grafo de costos:", e)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
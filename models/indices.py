@@ -0,0 +1,131 @@
+# models/indices.py
+"""
+Índices de las rutas de consulta más usadas por los controladores.
+
+Los índices se declaran en los modelos (__table_args__ e index=True) y
+create_all() los crea en una base nueva. Para una base existente,
+asegurar_indices() crea solo los que faltan, sin tocar los datos.
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.indices            # planes antes, crea los índices, planes después
+    python -m models.indices --solo-planes
+"""
+import argparse
+import time
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from .database import Base, engine
+
+# Consultas calientes de los controladores; los parámetros se toman de una
+# fila real de cada tabla para que el plan sea representativo
+CONSULTAS = [
+    (
+        "Recursos de un análisis",
+        "SELECT * FROM analisis_unitarios_recursos WHERE codigo_analisis = :codigo_analisis",
+    ),
+    (
+        "Relación (análisis, recurso)",
+        "SELECT * FROM analisis_unitarios_recursos "
+        "WHERE codigo_analisis = :codigo_analisis AND codigo_recurso = :codigo_recurso",
+    ),
+    (
+        "Uso de un recurso",
+        "SELECT count(*) FROM analisis_unitarios_recursos WHERE codigo_recurso = :codigo_recurso",
+    ),
+    (
+        "Ítems de un presupuesto",
+        "SELECT * FROM presupuestos_analisis_unitarios WHERE codigo_presupuesto = :codigo_presupuesto",
+    ),
+    (
+        "Presupuestos que usan un análisis",
+        "SELECT DISTINCT codigo_presupuesto FROM presupuestos_analisis_unitarios "
+        "WHERE codigo_analisis = :codigo_analisis",
+    ),
+]
+
+def indices_faltantes(bind=engine):
+    """Lista de (tabla, índice) declarados en los modelos que no existen en la base."""
+    inspector = inspect(bind)
+    tablas = set(inspector.get_table_names())
+    faltantes = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tablas:
+            continue
+        existentes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        faltantes.extend((table.name, index) for index in table.indexes if index.name not in existentes)
+    return faltantes
+
+def asegurar_indices(bind=engine):
+    """
+    Crea los índices declarados que faltan y actualiza las estadísticas.
+    'bind' puede ser el engine o una conexión con una transacción en curso
+    (por ejemplo, dentro de una migración). Retorna los nombres creados.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return asegurar_indices(conn)
+
+    creados = []
+    tablas = set()
+    for tabla, index in indices_faltantes(bind):
+        index.create(bind=bind, checkfirst=True)
+        creados.append(index.name)
+        tablas.add(tabla)
+        print(f"Índice {index.name} creado en {tabla}.")
+    # Estadísticas frescas para que el planificador considere los índices nuevos
+    if bind.dialect.name == "postgresql":
+        for tabla in sorted(tablas):
+            bind.execute(text(f"ANALYZE {tabla};"))
+    return creados
+
+def _parametros_de_ejemplo(conn):
+    """Toma códigos reales de las tablas para usarlos como parámetros de las consultas."""
+    relacion = conn.execute(text(
+        "SELECT codigo_analisis, codigo_recurso FROM analisis_unitarios_recursos LIMIT 1"
+    )).first()
+    item = conn.execute(text(
+        "SELECT codigo_presupuesto FROM presupuestos_analisis_unitarios LIMIT 1"
+    )).first()
+    return {
+        "codigo_analisis": relacion[0] if relacion else "",
+        "codigo_recurso": relacion[1] if relacion else "",
+        "codigo_presupuesto": item[0] if item else "",
+    }
+
+def planes(bind=engine):
+    """Ejecuta EXPLAIN ANALYZE de cada consulta caliente y retorna {nombre: (plan, ms)}."""
+    resultado = {}
+    with bind.connect() as conn:
+        parametros = _parametros_de_ejemplo(conn)
+        for nombre, sql in CONSULTAS:
+            inicio = time.perf_counter()
+            filas = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), parametros).scalars().all()
+            resultado[nombre] = ("\n".join(filas), (time.perf_counter() - inicio) * 1000)
+    return resultado
+
+def imprimir_planes(titulo, resultado):
+    print(f"===== {titulo} =====")
+    for nombre, (plan, ms) in resultado.items():
+        print(f"--- {nombre} ({ms:.2f} ms)")
+        print(plan)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crea los índices faltantes y compara los planes de consulta.")
+    parser.add_argument("--solo-planes", action="store_true",
+                        help="Solo muestra los planes actuales, sin crear índices.")
+    args = parser.parse_args(argv)
+
+    try:
+        imprimir_planes("Planes actuales", planes())
+        if args.solo_planes:
+            return
+        creados = asegurar_indices()
+        if not creados:
+            print("Todos los índices ya existían.")
+            return
+        imprimir_planes("Planes con índices", planes())
+    except Exception as e:
+        print("Error al revisar los índices:", e)
+
+if __name__ == "__main__":
+    main()
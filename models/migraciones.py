@@ -0,0 +1,242 @@
+# models/migraciones.py
+"""
+Migraciones versionadas del esquema.
+
+En lugar de borrar y recrear las tablas (create_tables.py --recrear), cada
+cambio de esquema se agrega como una migración numerada que se aplica en el
+lugar sobre la base existente, sin tocar los datos. La versión aplicada se
+guarda en la tabla schema_version y cada migración corre en su propia
+transacción: si falla, la base queda en la versión anterior.
+
+Para agregar un cambio: escribir una función que reciba la conexión y
+añadirla al final de MIGRACIONES con el número siguiente. Las migraciones
+deben ser aditivas y tolerar que el cambio ya exista (por ejemplo, en una
+base creada con create_all()). Tampoco deben leer los modelos (Base.metadata):
+los modelos describen el esquema de hoy, y una migración ya publicada tiene
+que hacer siempre lo mismo; por eso cada una lleva su SQL congelado.
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.migraciones             # aplica las pendientes
+    python -m models.migraciones --estado    # muestra la versión actual y las pendientes
+    python -m models.migraciones --hasta 2   # aplica hasta la versión indicada
+"""
+import argparse
+import time
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, func, inspect, select, text
+)
+from .database import engine
+
+_metadata_versiones = MetaData()
+schema_version = Table(
+    "schema_version", _metadata_versiones,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String, nullable=False),
+    Column("aplicada_en", DateTime, nullable=False, server_default=func.now()),
+)
+
+# ---------------------------
+# Esquema congelado de la versión 1 (tablas tal como estaban antes de migrar)
+# ---------------------------
+_esquema_v1 = MetaData()
+Table(
+    "recursos", _esquema_v1,
+    Column("id", Integer, primary_key=True),
+    Column("codigo", String, unique=True, nullable=False),
+    Column("descripcion", String, nullable=False),
+    Column("unidad", String, nullable=False),
+    Column("valor_unitario", Float, nullable=False),
+)
+Table(
+    "analisis_unitarios", _esquema_v1,
+    Column("id", Integer, primary_key=True),
+    Column("codigo", String, unique=True, nullable=False),
+    Column("descripcion", String, nullable=False),
+    Column("unidad", String, nullable=False),
+    Column("total", Float, nullable=False),
+)
+Table(
+    "analisis_unitarios_recursos", _esquema_v1,
+    Column("id", Integer, primary_key=True),
+    Column("codigo_analisis", String, ForeignKey("analisis_unitarios.codigo", ondelete="CASCADE"), nullable=False),
+    Column("codigo_recurso", String, ForeignKey("recursos.codigo"), nullable=False),
+    Column("descripcion_recurso", String, nullable=False),
+    Column("unidad_recurso", String, nullable=False),
+    Column("cantidad_recurso", Float, nullable=False),
+    Column("desper", Float, nullable=False),
+    Column("vr_unitario", Float, nullable=False),
+    Column("vr_parcial", Float, nullable=False),
+)
+Table(
+    "presupuestos", _esquema_v1,
+    Column("id", Integer, primary_key=True),
+    Column("codigo", String, unique=True, nullable=False),
+    Column("descripcion", String, nullable=False),
+    Column("total", Float, nullable=False),
+)
+Table(
+    "presupuestos_analisis_unitarios", _esquema_v1,
+    Column("id", Integer, primary_key=True),
+    Column("codigo_presupuesto", String, ForeignKey("presupuestos.codigo"), nullable=False),
+    Column("codigo_analisis", String, ForeignKey("analisis_unitarios.codigo"), nullable=False),
+    Column("descripcion_analisis", String, nullable=False),
+    Column("unidad_analisis", String, nullable=False),
+    Column("cantidad_analisis", Float, nullable=False),
+    Column("vr_unitario", Float, nullable=False),
+    Column("vr_total", Float, nullable=False),
+)
+
+# Índices de la versión 3: (nombre, tabla, columnas)
+_INDICES_V3 = [
+    ("ix_aur_analisis_recurso", "analisis_unitarios_recursos", ("codigo_analisis", "codigo_recurso")),
+    ("ix_aur_codigo_recurso", "analisis_unitarios_recursos", ("codigo_recurso",)),
+    ("ix_pau_presupuesto_analisis", "presupuestos_analisis_unitarios", ("codigo_presupuesto", "codigo_analisis")),
+    ("ix_pau_codigo_analisis", "presupuestos_analisis_unitarios", ("codigo_analisis",)),
+    ("ix_analisis_unitarios_total", "analisis_unitarios", ("total",)),
+]
+
+# ---------------------------
+# Migraciones
+# ---------------------------
+def _esquema_inicial(conn):
+    """Crea las tablas que no existan (no modifica las existentes)."""
+    _esquema_v1.create_all(bind=conn, checkfirst=True)
+
+def _total_materializado(conn):
+    """Columna analisis_unitarios.total con valor por defecto y recalculada desde los recursos."""
+    columnas = {c["name"] for c in inspect(conn).get_columns("analisis_unitarios")}
+    if "total" not in columnas:
+        conn.execute(text(
+            "ALTER TABLE analisis_unitarios ADD COLUMN total DOUBLE PRECISION NOT NULL DEFAULT 0"
+        ))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE analisis_unitarios ALTER COLUMN total SET DEFAULT 0"))
+    conn.execute(text("""
+        UPDATE analisis_unitarios SET total = COALESCE((
+            SELECT sum(r.vr_parcial) FROM analisis_unitarios_recursos r
+            WHERE r.codigo_analisis = analisis_unitarios.codigo
+        ), 0)
+    """))
+
+def _indices_consultas(conn):
+    """Índices de las relaciones y del total materializado."""
+    for nombre, tabla, columnas in _INDICES_V3:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({', '.join(columnas)})"))
+    # Estadísticas frescas para que el planificador considere los índices nuevos
+    if conn.dialect.name == "postgresql":
+        for tabla in sorted({tabla for _, tabla, _ in _INDICES_V3}):
+            conn.execute(text(f"ANALYZE {tabla}"))
+
+def _intentar(conn, sql):
+    """Ejecuta 'sql' en un punto de guardado; si falla (p. ej. sin permisos) la migración sigue."""
+    try:
+        with conn.begin_nested():
+            conn.execute(text(sql))
+        return True
+    except Exception as e:
+        print(f"Aviso: no se pudo ejecutar '{sql.strip()}': {e}")
+        return False
+
+def _existe_configuracion(conn, nombre):
+    return conn.execute(
+        text("SELECT 1 FROM pg_ts_config WHERE cfgname = :nombre"), {"nombre": nombre}
+    ).first() is not None
+
+def _busqueda_texto(conn):
+    """Extensiones, configuración en español e índices de búsqueda (solo PostgreSQL)."""
+    if conn.dialect.name != "postgresql":
+        return
+    trigramas = _intentar(conn, "CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    if _intentar(conn, "CREATE EXTENSION IF NOT EXISTS unaccent") and not _existe_configuracion(conn, "espanol_sin_tildes"):
+        _intentar(conn, """
+            CREATE TEXT SEARCH CONFIGURATION espanol_sin_tildes (COPY = spanish);
+            ALTER TEXT SEARCH CONFIGURATION espanol_sin_tildes
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        """)
+    configuracion = "espanol_sin_tildes" if _existe_configuracion(conn, "espanol_sin_tildes") else "spanish"
+    for tabla in ("recursos", "analisis_unitarios"):
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{tabla}_descripcion_fts ON {tabla} "
+            f"USING gin (to_tsvector('{configuracion}'::regconfig, descripcion))"
+        ))
+        if trigramas:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{tabla}_codigo_trgm ON {tabla} "
+                f"USING gin (codigo gin_trgm_ops)"
+            ))
+        conn.execute(text(f"ANALYZE {tabla}"))
+
+def _busqueda_sin_separador_miles(conn):
+    """Índices de texto completo sobre la descripción sin separadores de miles ("3.000" -> "3000")."""
+    if conn.dialect.name != "postgresql":
+        return
+    configuracion = "espanol_sin_tildes" if _existe_configuracion(conn, "espanol_sin_tildes") else "spanish"
+    for tabla in ("recursos", "analisis_unitarios"):
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{tabla}_descripcion_fts"))
+        conn.execute(text(
+            f"CREATE INDEX ix_{tabla}_descripcion_fts ON {tabla} "
+            f"USING gin (to_tsvector('{configuracion}'::regconfig, "
+            r"regexp_replace(descripcion, '(?<=\d)[.,](?=\d{3})', '', 'g')))"
+        ))
+        conn.execute(text(f"ANALYZE {tabla}"))
+
+MIGRACIONES = [
+    (1, "Esquema inicial", _esquema_inicial),
+    (2, "Total materializado de análisis unitarios", _total_materializado),
+    (3, "Índices de relaciones y totales", _indices_consultas),
+    (4, "Búsqueda de texto completo en recursos y análisis", _busqueda_texto),
+    (5, "Búsqueda sin separadores de miles", _busqueda_sin_separador_miles),
+]
+
+# ---------------------------
+# Motor de migraciones
+# ---------------------------
+def version_actual(bind=engine):
+    """Última versión aplicada (0 si la base nunca se migró)."""
+    with bind.begin() as conn:
+        schema_version.create(bind=conn, checkfirst=True)
+        return conn.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar()
+
+def pendientes(bind=engine, hasta=None):
+    actual = version_actual(bind)
+    return [
+        m for m in MIGRACIONES
+        if m[0] > actual and (hasta is None or m[0] <= hasta)
+    ]
+
+def migrar(bind=engine, hasta=None):
+    """Aplica en orden las migraciones pendientes. Retorna las versiones aplicadas."""
+    aplicadas = []
+    for version, descripcion, funcion in pendientes(bind, hasta):
+        inicio = time.perf_counter()
+        with bind.begin() as conn:
+            funcion(conn)
+            conn.execute(schema_version.insert().values(version=version, descripcion=descripcion))
+        aplicadas.append(version)
+        print(f"Migración {version} aplicada: {descripcion} ({time.perf_counter() - inicio:.2f} s)")
+    return aplicadas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes del esquema.")
+    parser.add_argument("--estado", action="store_true", help="Solo muestra la versión actual y las pendientes.")
+    parser.add_argument("--hasta", type=int, default=None, help="Última versión a aplicar.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.estado:
+            print(f"Versión actual del esquema: {version_actual()}")
+            for version, descripcion, _ in pendientes(hasta=args.hasta):
+                print(f"  pendiente {version}: {descripcion}")
+            return 0
+
+        aplicadas = migrar(hasta=args.hasta)
+        if not aplicadas:
+            print("El esquema ya está al día.")
+        print(f"Versión actual del esquema: {version_actual()}")
+        return 0
+    except Exception as e:
+        print("Error al aplicar las migraciones:", e)
+        return 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
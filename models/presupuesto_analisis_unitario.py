@@ -1,10 +1,16 @@
 from .database import Base
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.schema import UniqueConstraint
 
 class PresupuestoAnalisisUnitario(Base):
     __tablename__ = "presupuestos_analisis_unitarios"
+    __table_args__ = (
+        # Ítems de un presupuesto (filter_by(codigo_presupuesto=...))
+        Index("ix_pau_presupuesto_analisis", "codigo_presupuesto", "codigo_analisis"),
+        # Índice inverso análisis -> presupuestos (propagar precios)
+        Index("ix_pau_codigo_analisis", "codigo_analisis"),
+    )
 
     id = Column(Integer, primary_key=True)
     codigo_presupuesto = Column(String, ForeignKey("presupuestos.codigo"), nullable=False)
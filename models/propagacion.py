@@ -0,0 +1,125 @@
+# models/propagacion.py
+"""
+Propagación de cambios de precio de recursos.
+
+Cuando cambia Recurso.valor_unitario, las copias del precio quedan
+desactualizadas en cascada:
+    recursos -> analisis_unitarios_recursos (vr_unitario, vr_parcial)
+             -> analisis_unitarios (total)
+             -> presupuestos_analisis_unitarios (vr_unitario, vr_total)
+             -> presupuestos (total)
+
+propagar_precios() recorre ese índice inverso (recurso -> análisis ->
+presupuestos) y actualiza solo las filas afectadas, con una sentencia UPDATE
+por tabla, dentro de la transacción de la sesión recibida. El commit queda a
+cargo de quien la llama, de modo que el cambio de precio y su propagación se
+guardan juntos o no se guarda nada.
+"""
+from sqlalchemy import case, select, update
+from .analisis_unitario import AnalisisUnitario
+from .analisis_unitario_recurso import AnalisisUnitarioRecurso
+from .presupuesto import Presupuesto
+from .presupuesto_analisis_unitario import PresupuestoAnalisisUnitario
+from .recurso import Recurso
+from .servicio_presupuestos import recalcular_totales_presupuesto
+from .totales import recalcular_totales
+
+_recursos = Recurso.__table__
+_relaciones = AnalisisUnitarioRecurso.__table__
+_analisis = AnalisisUnitario.__table__
+_items_presupuesto = PresupuestoAnalisisUnitario.__table__
+
+def _precio_actual():
+    """Subconsulta correlacionada con el valor_unitario vigente del recurso de cada relación."""
+    return (
+        select(_recursos.c.valor_unitario)
+        .where(_recursos.c.codigo == _relaciones.c.codigo_recurso)
+        .scalar_subquery()
+    )
+
+def analisis_afectados(connection, codigos_recurso):
+    """
+    Primer nivel del índice inverso: códigos de los análisis con al menos una
+    relación cuyo vr_unitario difiere del precio vigente de su recurso.
+    """
+    precio = _precio_actual()
+    return set(connection.execute(
+        select(_relaciones.c.codigo_analisis).distinct()
+        .where(_relaciones.c.codigo_recurso.in_(codigos_recurso))
+        .where(_relaciones.c.vr_unitario != precio)
+    ).scalars())
+
+def presupuestos_afectados(connection, codigos_analisis):
+    """Segundo nivel del índice inverso: presupuestos que usan alguno de los análisis."""
+    return set(connection.execute(
+        select(_items_presupuesto.c.codigo_presupuesto).distinct()
+        .where(_items_presupuesto.c.codigo_analisis.in_(codigos_analisis))
+    ).scalars())
+
+def propagar_precios(session, codigos_recurso):
+    """
+    Propaga el valor_unitario vigente de los recursos indicados a todos los
+    análisis y presupuestos que dependen de ellos. Los cambios pendientes de
+    la sesión (por ejemplo el nuevo precio) se envían antes con flush().
+
+    vr_parcial se escala en la misma proporción que el precio, lo que respeta
+    la cantidad y el desperdicio ya cargados sin importar cómo se expresó el
+    desperdicio en el decreto; si el precio anterior era 0 se usa
+    cantidad * (1 + desperdicio) * precio, como al editar el análisis.
+
+    Retorna un resumen con el número de filas actualizadas por tabla.
+    """
+    resumen = {'relaciones': 0, 'analisis': 0, 'items_presupuesto': 0, 'presupuestos': 0}
+    codigos_recurso = {c for c in codigos_recurso if c}
+    if not codigos_recurso:
+        return resumen
+
+    session.flush()
+    conn = session.connection()
+
+    codigos_analisis = analisis_afectados(conn, codigos_recurso)
+    if not codigos_analisis:
+        return resumen
+    codigos_presupuesto = presupuestos_afectados(conn, codigos_analisis)
+
+    # 1. Relaciones análisis-recurso con el precio desactualizado
+    precio = _precio_actual()
+    resumen['relaciones'] = conn.execute(
+        update(_relaciones)
+        .where(_relaciones.c.codigo_recurso.in_(codigos_recurso))
+        .where(_relaciones.c.vr_unitario != precio)
+        .values(
+            vr_unitario=precio,
+            vr_parcial=case(
+                (_relaciones.c.vr_unitario != 0, _relaciones.c.vr_parcial * precio / _relaciones.c.vr_unitario),
+                else_=_relaciones.c.cantidad_recurso * (1 + _relaciones.c.desper) * precio,
+            ),
+        )
+    ).rowcount
+
+    # 2. Total materializado de los análisis
+    resumen['analisis'] = recalcular_totales(session, codigos_analisis)
+
+    # 3. Ítems de presupuesto: el valor unitario es el total del análisis
+    total_analisis = (
+        select(_analisis.c.total)
+        .where(_analisis.c.codigo == _items_presupuesto.c.codigo_analisis)
+        .scalar_subquery()
+    )
+    resumen['items_presupuesto'] = conn.execute(
+        update(_items_presupuesto)
+        .where(_items_presupuesto.c.codigo_analisis.in_(codigos_analisis))
+        .values(
+            vr_unitario=total_analisis,
+            vr_total=_items_presupuesto.c.cantidad_analisis * total_analisis,
+        )
+    ).rowcount
+
+    # 4. Total de cada presupuesto
+    resumen['presupuestos'] = recalcular_totales_presupuesto(session, codigos_presupuesto)
+
+    # Los objetos ya cargados en la sesión deben releer los valores nuevos
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, (AnalisisUnitarioRecurso, PresupuestoAnalisisUnitario, Presupuesto)):
+            session.expire(obj)
+    return resumen
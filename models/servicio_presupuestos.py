@@ -0,0 +1,91 @@
+# models/servicio_presupuestos.py
+"""
+Persistencia de los ítems de un presupuesto.
+
+guardar_items() compara los ítems de la vista con la instantánea cargada y
+escribe solo las diferencias (ver models/diferencias.py); en la misma
+transacción recalcula presupuestos.total como la suma de sus vr_total. La
+fila del presupuesto se bloquea (SELECT ... FOR UPDATE) mientras se guarda,
+así dos ventanas que guardan el mismo presupuesto no se pisan el total.
+"""
+from sqlalchemy import func, select, update
+from .diferencias import aplicar_diferencias, diferenciar, instantanea, nueva_instantanea
+from .presupuesto import Presupuesto
+from .presupuesto_analisis_unitario import PresupuestoAnalisisUnitario
+
+# Columnas de presupuestos_analisis_unitarios que se editan en la tabla, en orden de columna
+CAMPOS_ITEM = (
+    "codigo_analisis", "descripcion_analisis", "unidad_analisis",
+    "cantidad_analisis", "vr_unitario", "vr_total"
+)
+
+_presupuestos = Presupuesto.__table__
+_items = PresupuestoAnalisisUnitario.__table__
+
+def cargar_items(uow, codigo_presupuesto):
+    """Ítems del presupuesto (releídos de la base) y su instantánea para el guardado por diferencias."""
+    items = uow.listar(
+        PresupuestoAnalisisUnitario,
+        PresupuestoAnalisisUnitario.codigo_presupuesto == codigo_presupuesto,
+        refrescar=True
+    )
+    return items, instantanea(items, CAMPOS_ITEM)
+
+def recalcular_totales_presupuesto(session, codigos):
+    """Iguala presupuestos.total a la suma de vr_total de sus ítems. Retorna las filas actualizadas."""
+    codigos = {c for c in codigos if c}
+    if not codigos:
+        return 0
+    suma_items = (
+        select(func.coalesce(func.sum(_items.c.vr_total), 0.0))
+        .where(_items.c.codigo_presupuesto == _presupuestos.c.codigo)
+        .scalar_subquery()
+    )
+    actualizados = session.connection().execute(
+        update(_presupuestos)
+        .where(_presupuestos.c.codigo.in_(codigos))
+        .values(total=suma_items)
+    ).rowcount
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Presupuesto) and obj.codigo in codigos:
+            session.expire(obj, ["total"])
+    return actualizados
+
+def guardar_items(uow, codigo_presupuesto, filas, snapshot):
+    """
+    Guarda las diferencias entre 'filas' (diccionarios con 'id' y CAMPOS_ITEM)
+    y 'snapshot' en una transacción, junto con el nuevo total del presupuesto.
+    Retorna un resumen con los conteos, los ids asignados a las filas nuevas
+    (en el orden de 'nuevas'), el total y la nueva instantánea. Si no hay
+    cambios no escribe nada. Lanza LookupError si el presupuesto no existe.
+    """
+    diferencias = diferenciar(snapshot, filas, CAMPOS_ITEM)
+    nuevas, modificadas, eliminadas = diferencias
+    resumen = {
+        "nuevas": nuevas, "modificadas": len(modificadas), "eliminadas": len(eliminadas),
+        "ids": [], "total": sum(f["vr_total"] for f in filas), "snapshot": snapshot,
+    }
+    if not (nuevas or modificadas or eliminadas):
+        return resumen
+
+    with uow.transaccion() as session:
+        bloqueado = session.execute(
+            select(_presupuestos.c.id)
+            .where(_presupuestos.c.codigo == codigo_presupuesto)
+            .with_for_update()
+        ).first()
+        if bloqueado is None:
+            raise LookupError(f"No existe el presupuesto {codigo_presupuesto}.")
+
+        ids = aplicar_diferencias(
+            session, PresupuestoAnalisisUnitario, filas, CAMPOS_ITEM,
+            {"codigo_presupuesto": codigo_presupuesto}, diferencias
+        )
+        recalcular_totales_presupuesto(session, [codigo_presupuesto])
+        resumen["total"] = session.execute(
+            select(_presupuestos.c.total).where(_presupuestos.c.codigo == codigo_presupuesto)
+        ).scalar()
+
+    resumen["ids"] = ids
+    resumen["snapshot"] = nueva_instantanea(filas, CAMPOS_ITEM, ids, nuevas)
+    return resumen
@@ -0,0 +1,157 @@
+# models/totales.py
+"""
+Mantenimiento de la columna materializada analisis_unitarios.total.
+
+El total de un análisis es la suma de los vr_parcial de sus filas en
+analisis_unitarios_recursos. En lugar de sumarlo cada vez (total_calculado),
+se guarda en la columna 'total' (indexada) y se mantiene al día:
+  - automáticamente, al hacer flush de una sesión que inserta, modifica o
+    elimina objetos AnalisisUnitarioRecurso (ver registrar_eventos)
+  - explícitamente, con recalcular_totales(), después de operaciones masivas
+    (query.delete(), UPDATE en bloque, cargas desde CSV)
+
+Uso por consola (desde la raíz del proyecto):
+    python -m models.totales             # reporta las diferencias
+    python -m models.totales --corregir  # además las corrige
+"""
+import argparse
+from sqlalchemy import event, func, inspect, select, update
+from .database import SessionLocal, engine
+from .analisis_unitario import AnalisisUnitario
+from .analisis_unitario_recurso import AnalisisUnitarioRecurso
+
+# Diferencia máxima aceptada entre la columna y la suma de recursos
+TOLERANCIA = 0.01
+
+_tabla_analisis = AnalisisUnitario.__table__
+_tabla_recursos = AnalisisUnitarioRecurso.__table__
+
+def _suma_recursos():
+    """Subconsulta correlacionada con la suma de vr_parcial de cada análisis."""
+    return (
+        select(func.coalesce(func.sum(_tabla_recursos.c.vr_parcial), 0.0))
+        .where(_tabla_recursos.c.codigo_analisis == _tabla_analisis.c.codigo)
+        .scalar_subquery()
+    )
+
+def sentencia_recalculo(codigos=None):
+    """UPDATE que iguala el total a la suma de recursos (de 'codigos', o de todos)."""
+    stmt = update(_tabla_analisis).values(total=_suma_recursos())
+    if codigos is not None:
+        stmt = stmt.where(_tabla_analisis.c.codigo.in_(codigos))
+    return stmt
+
+def recalcular_totales(session, codigos=None):
+    """
+    Recalcula en una sola sentencia UPDATE el total de los análisis indicados
+    (o de todos si codigos es None) y expira ese atributo en los objetos
+    cargados en la sesión. Retorna el número de análisis actualizados.
+    """
+    if codigos is not None:
+        codigos = {c for c in codigos if c}
+        if not codigos:
+            return 0
+
+    actualizados = session.connection().execute(sentencia_recalculo(codigos)).rowcount
+
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, AnalisisUnitario) and (codigos is None or obj.codigo in codigos):
+            session.expire(obj, ["total"])
+    return actualizados
+
+def verificar_totales(session, tolerancia=TOLERANCIA):
+    """
+    Compara la columna total con la suma real de sus recursos y retorna la
+    lista de análisis con diferencias (codigo, total, total_calculado).
+    """
+    suma = func.coalesce(func.sum(AnalisisUnitarioRecurso.vr_parcial), 0.0)
+    rows = (
+        session.query(AnalisisUnitario.codigo, AnalisisUnitario.total, suma.label("total_calculado"))
+        .outerjoin(
+            AnalisisUnitarioRecurso,
+            AnalisisUnitarioRecurso.codigo_analisis == AnalisisUnitario.codigo
+        )
+        .group_by(AnalisisUnitario.id)
+        .having(func.abs(AnalisisUnitario.total - suma) > tolerancia)
+        .order_by(AnalisisUnitario.codigo)
+        .all()
+    )
+    return [
+        {"codigo": r.codigo, "total": r.total, "total_calculado": r.total_calculado}
+        for r in rows
+    ]
+
+# ---------------------------
+# Mantenimiento automático en cada flush
+# ---------------------------
+def _codigos_afectados(session):
+    """Códigos de análisis cuyos recursos cambian en el flush en curso."""
+    codigos = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, AnalisisUnitarioRecurso):
+            continue
+        codigos.add(obj.codigo_analisis)
+        # Si la fila se movió de análisis, el anterior también cambia
+        historial = inspect(obj).attrs.codigo_analisis.history
+        codigos.update(c for c in historial.deleted if c)
+        if historial.added and not historial.deleted and obj.id is not None:
+            # El valor anterior no estaba cargado (objeto expirado): se lee
+            # de la base, que aún no ha recibido el UPDATE de este flush
+            anterior = session.connection().execute(
+                select(_tabla_recursos.c.codigo_analisis)
+                .where(_tabla_recursos.c.id == obj.id)
+            ).scalar()
+            codigos.add(anterior)
+    codigos.discard(None)
+    return codigos
+
+def _antes_del_flush(session, flush_context, instances):
+    pendientes = session.info.setdefault("totales_pendientes", set())
+    pendientes.update(_codigos_afectados(session))
+
+def _despues_del_flush(session, flush_context):
+    pendientes = session.info.pop("totales_pendientes", None)
+    if pendientes:
+        recalcular_totales(session, pendientes)
+
+def registrar_eventos(target=SessionLocal):
+    """Registra el mantenimiento automático de totales en las sesiones de 'target'."""
+    if not event.contains(target, "before_flush", _antes_del_flush):
+        event.listen(target, "before_flush", _antes_del_flush)
+        event.listen(target, "after_flush_postexec", _despues_del_flush)
+
+registrar_eventos()
+
+def asegurar_indice():
+    """Crea el índice de analisis_unitarios.total si la base de datos aún no lo tiene."""
+    for index in _tabla_analisis.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica los totales materializados de los análisis unitarios.")
+    parser.add_argument("--corregir", action="store_true",
+                        help="Recalcula todos los totales después de reportar las diferencias.")
+    args = parser.parse_args(argv)
+
+    session = SessionLocal()
+    try:
+        diferencias = verificar_totales(session)
+        for d in diferencias:
+            print(f"{d['codigo']}: total={d['total']:.2f} suma de recursos={d['total_calculado']:.2f}")
+        print(f"{len(diferencias)} análisis con diferencias.")
+
+        if args.corregir:
+            asegurar_indice()
+            actualizados = recalcular_totales(session)
+            session.commit()
+            print(f"Totales recalculados para {actualizados} análisis.")
+        return len(diferencias)
+    except Exception as e:
+        session.rollback()
+        print("Error al verificar los totales:", e)
+        return -1
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# models/unidad_trabajo.py
+"""
+Unidad de trabajo por pantalla.
+
+Cada vista o diálogo crea una UnidadDeTrabajo y la usa durante toda su vida,
+en lugar de abrir y cerrar un SessionLocal() en cada clic. La sesión conserva
+su mapa de identidad entre interacciones y, además, un caché por código
+(recursos, análisis y presupuestos se buscan por 'codigo', que no es la clave
+primaria), así que consultar dos veces el mismo objeto no vuelve a la base.
+
+Los cambios se acumulan en la sesión hasta un punto de guardado explícito
+(guardar() o el bloque 'with uow.transaccion():'). Después de cada lectura o
+guardado la transacción se cierra, para no retener una conexión del pool
+mientras la pantalla está abierta; con expire_on_commit=False los objetos
+siguen disponibles en memoria sin volver a consultarlos.
+"""
+from contextlib import contextmanager
+from .database import SessionLocal
+
+class UnidadDeTrabajo:
+    def __init__(self, session_factory=SessionLocal):
+        self.session = session_factory(expire_on_commit=False)
+        # (modelo, codigo) -> objeto persistente
+        self._por_codigo = {}
+        # True si flush() envió cambios que aún no se guardan ni descartan
+        self._escrito = False
+
+    # ---------------------------
+    # Lecturas con caché
+    # ---------------------------
+    def obtener(self, modelo, codigo, refrescar=False):
+        """
+        Objeto de 'modelo' con ese código (o None). Solo consulta la base la
+        primera vez; con refrescar=True vuelve a consultarla y sobrescribe los
+        valores que ya estaban en memoria (p. ej. un total que cambió desde
+        otra pantalla).
+        """
+        clave = (modelo, codigo)
+        obj = self._por_codigo.get(clave)
+        if obj is not None and obj in self.session and not refrescar:
+            return obj
+        query = self.session.query(modelo).filter(modelo.codigo == codigo)
+        if refrescar:
+            query = query.populate_existing()
+        obj = query.first()
+        if obj is not None:
+            self._por_codigo[clave] = obj
+        else:
+            self._por_codigo.pop(clave, None)
+        self.liberar_conexion()
+        return obj
+
+    def listar(self, modelo, *criterios, refrescar=False):
+        """
+        Todos los objetos de 'modelo' que cumplen los criterios; quedan en el
+        caché por código. Con refrescar=True se sobrescriben los valores que ya
+        estaban en memoria con los de la base.
+        """
+        query = self.session.query(modelo)
+        if criterios:
+            query = query.filter(*criterios)
+        if refrescar:
+            query = query.populate_existing()
+        objetos = query.all()
+        if hasattr(modelo, "codigo"):
+            for obj in objetos:
+                self._por_codigo[(modelo, obj.codigo)] = obj
+        self.liberar_conexion()
+        return objetos
+
+    # ---------------------------
+    # Cambios
+    # ---------------------------
+    def agregar(self, obj):
+        self.session.add(obj)
+        if hasattr(obj, "codigo"):
+            self._por_codigo[(type(obj), obj.codigo)] = obj
+        return obj
+
+    def eliminar(self, obj):
+        self.session.delete(obj)
+        if hasattr(obj, "codigo"):
+            self._por_codigo.pop((type(obj), obj.codigo), None)
+
+    def tiene_cambios(self):
+        return bool(self.session.new or self.session.dirty or self.session.deleted)
+
+    def flush(self):
+        """Envía los cambios pendientes a la base sin terminar la transacción."""
+        self.session.flush()
+        self._escrito = True
+
+    def guardar(self):
+        """Punto de guardado: confirma todos los cambios pendientes."""
+        self.session.commit()
+        self._escrito = False
+
+    def descartar(self):
+        """Deshace los cambios pendientes y olvida los objetos que no llegaron a guardarse."""
+        self.session.rollback()
+        self._escrito = False
+        self._por_codigo = {k: v for k, v in self._por_codigo.items() if v in self.session}
+
+    @contextmanager
+    def transaccion(self):
+        """Bloque con guardado al final, o descarte si ocurre una excepción."""
+        try:
+            yield self.session
+            self.guardar()
+        except Exception:
+            self.descartar()
+            raise
+
+    # ---------------------------
+    # Ciclo de vida
+    # ---------------------------
+    def liberar_conexion(self):
+        """
+        Cierra la transacción de lectura en curso (devuelve la conexión al pool)
+        si no hay cambios sin guardar, ni pendientes en la sesión ni ya enviados
+        con flush(). Los objetos cargados siguen en memoria.
+        """
+        if self.session.in_transaction() and not self._escrito and not self.tiene_cambios():
+            self.session.commit()
+
+    def refrescar(self):
+        """Marca todo lo cargado como vencido; el siguiente acceso lo relee de la base."""
+        self.session.expire_all()
+
+    def cerrar(self):
+        self.session.close()
+        self._por_codigo.clear()
@@ -1,7 +1,14 @@
+import io
+import os
+import argparse
 import psycopg2
 import pandas as pd
 from database import get_db_connection
 
+# Filas por bloque al leer los CSV: los registros se insertan a medida que se leen
+# en lugar de cargar el archivo completo en memoria
+CHUNK_SIZE = 5000
+
 # Cargar datos desde un archivo CSV
 def cargar_datos_recursos_desde_csv(csv_file):
     conn = get_db_connection()
@@ -16,22 +23,22 @@ def cargar_datos_recursos_desde_csv(csv_file):
                 print("La tabla ya contiene datos. No se cargará el CSV.")
                 return
             
-            # Cargar el CSV con pandas
-            df = pd.read_csv(csv_file)
-            
-            # Eliminar filas duplicadas basadas en el código
-            df = df.drop_duplicates(subset=['Codigo'])
-            
-            # Iterar sobre las filas del DataFrame e insertar los datos
-            for _, row in df.iterrows():
-                try:
-                    cursor.execute("""
-                    INSERT INTO recursos (codigo, descripcion, unidad, valor_unitario)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (codigo) DO NOTHING;
-                    """, (row['Codigo'], row['Descripcion'], row['Unidad'], row['Valor Unitario']))
-                except Exception as e:
-                    print(f"Error al insertar el código {row['Codigo']}: {e}")
+            # Cargar el CSV con pandas por bloques
+            for df in pd.read_csv(csv_file, chunksize=CHUNK_SIZE):
+                # Eliminar filas duplicadas basadas en el código
+                # (entre bloques los duplicados los descarta ON CONFLICT)
+                df = df.drop_duplicates(subset=['Codigo'])
+                
+                # Iterar sobre las filas del DataFrame e insertar los datos
+                for _, row in df.iterrows():
+                    try:
+                        cursor.execute("""
+                        INSERT INTO recursos (codigo, descripcion, unidad, valor_unitario)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (codigo) DO NOTHING;
+                        """, (row['Codigo'], row['Descripcion'], row['Unidad'], row['Valor Unitario']))
+                    except Exception as e:
+                        print(f"Error al insertar el código {row['Codigo']}: {e}")
             
             conn.commit()
             print("Datos cargados correctamente.")
@@ -48,25 +55,25 @@ def cargar_analisis_unitarios(csv_file):
         return
     
     try:
-        df = pd.read_csv(csv_file)
-        # Opcional: eliminar duplicados
-        df.drop_duplicates(subset=['codigo'], inplace=True)
-
         with conn.cursor() as cursor:
-            for _, row in df.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT INTO analisis_unitarios (codigo, descripcion, unidad, total)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (codigo) DO NOTHING;
-                    """, (
-                        row['codigo'], 
-                        row['descripcion'], 
-                        row['unidad'], 
-                        row['total']
-                    ))
-                except Exception as e:
-                    print(f"Error al insertar {row['codigo']}: {e}")
+            for df in pd.read_csv(csv_file, chunksize=CHUNK_SIZE):
+                # Opcional: eliminar duplicados
+                df.drop_duplicates(subset=['codigo'], inplace=True)
+
+                for _, row in df.iterrows():
+                    try:
+                        cursor.execute("""
+                            INSERT INTO analisis_unitarios (codigo, descripcion, unidad, total)
+                            VALUES (%s, %s, %s, %s)
+                            ON CONFLICT (codigo) DO NOTHING;
+                        """, (
+                            row['codigo'], 
+                            row['descripcion'], 
+                            row['unidad'], 
+                            row['total']
+                        ))
+                    except Exception as e:
+                        print(f"Error al insertar {row['codigo']}: {e}")
 
         conn.commit()
         print("Datos de análisis unitarios cargados correctamente.")
@@ -91,31 +98,30 @@ def cargar_relacion_analisis_unitarios_recursos(csv_file):
         return
     
     try:
-        df = pd.read_csv(csv_file)
-
         with conn.cursor() as cursor:
-            for _, row in df.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT INTO analisis_unitarios_recursos 
-                        (codigo_recurso, descripcion_recurso, unidad_recurso, cantidad_recurso, desper, vr_unitario, vr_parcial, codigo_analisis)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-                    """, (
-                        str(row['codigo_recurso']),
-                        str(row['descripcion_recurso']),
-                        str(row['unidad_recurso']),
-                        row['cantidad_recurso'],
-                        row['desper'],
-                        row['vr_unitario'],
-                        row['vr_parcial'],
-                        str(row['codigo_analisis'])
-                    ))
-                except psycopg2.Error as e:
-                    # Se realiza rollback para limpiar el estado de la transacción
-                    conn.rollback()
-                    print(f"Error al insertar {row['codigo_recurso']} - {row['codigo_analisis']}: {e.pgerror}")
-                    print("SQL:", cursor.query)
-                    # Opcionalmente, continuar o detener la ejecución según convenga
+            for df in pd.read_csv(csv_file, chunksize=CHUNK_SIZE):
+                for _, row in df.iterrows():
+                    try:
+                        cursor.execute("""
+                            INSERT INTO analisis_unitarios_recursos 
+                            (codigo_recurso, descripcion_recurso, unidad_recurso, cantidad_recurso, desper, vr_unitario, vr_parcial, codigo_analisis)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+                        """, (
+                            str(row['codigo_recurso']),
+                            str(row['descripcion_recurso']),
+                            str(row['unidad_recurso']),
+                            row['cantidad_recurso'],
+                            row['desper'],
+                            row['vr_unitario'],
+                            row['vr_parcial'],
+                            str(row['codigo_analisis'])
+                        ))
+                    except psycopg2.Error as e:
+                        # Se realiza rollback para limpiar el estado de la transacción
+                        conn.rollback()
+                        print(f"Error al insertar {row['codigo_recurso']} - {row['codigo_analisis']}: {e.pgerror}")
+                        print("SQL:", cursor.query)
+                        # Opcionalmente, continuar o detener la ejecución según convenga
         conn.commit()
         print("Datos de relación entre análisis unitarios y recursos cargados correctamente.")
     except Exception as e:
@@ -123,8 +129,442 @@ def cargar_relacion_analisis_unitarios_recursos(csv_file):
     finally:
         conn.close()
 
-# Ejecutar funciones
-cargar_datos_recursos_desde_csv('../data_gobernacion/recursos_unicos.csv')
-cargar_analisis_unitarios('../data_gobernacion/analisis_unitarios.csv')
-cargar_relacion_analisis_unitarios_recursos('../data_gobernacion/recursos_analisis.csv')
+# ---------------------------
+# Carga masiva (COPY FROM STDIN + INSERT ... ON CONFLICT)
+# ---------------------------
+
+# Expresión para validar en SQL que un texto del CSV es un número
+NUMERIC_REGEX = r'^\s*[-+]?([0-9]+([.][0-9]*)?|[.][0-9]+)([eE][-+]?[0-9]+)?\s*$'
+
+def sin_limite_de_tiempo(conn):
+    """
+    Desactiva DB_STATEMENT_TIMEOUT_MS solo para la transacción en curso: la
+    conexión viene del pool compartido con la aplicación, pero una carga
+    completa tarda más que cualquier consulta interactiva.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL statement_timeout = 0;")
+
+def copiar_csv_a_staging(cursor, csv_file, staging_table, column_map):
+    """
+    Crea una tabla temporal 'staging_table' (columnas de texto + 'fila' y 'motivo')
+    y envía el CSV por bloques con COPY FROM STDIN.
+    'column_map' es una lista de pares (columna_csv, columna_staging).
+    'fila' es el número de línea en el CSV (la cabecera es la línea 1).
+    Retorna el número de filas leídas.
+    """
+    staging_columns = [dst for _, dst in column_map]
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging_table} ("
+        "fila integer, "
+        + ", ".join(f"{col} text" for col in staging_columns)
+        + ", motivo text) ON COMMIT DROP;"
+    )
+    copy_sql = (
+        f"COPY {staging_table} (fila, {', '.join(staging_columns)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    leidas = 0
+    # dtype=str conserva los ceros a la izquierda de los códigos (p.ej. 003282)
+    for df in pd.read_csv(csv_file, chunksize=CHUNK_SIZE, dtype=str, keep_default_na=False):
+        chunk = df[[src for src, _ in column_map]]
+        chunk.insert(0, 'fila', range(leidas + 2, leidas + 2 + len(chunk)))
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        leidas += len(chunk)
+    return leidas
+
+def reportar_rechazos(cursor, staging_table, report_path):
+    """
+    Escribe en 'report_path' (CSV) las filas de staging marcadas con 'motivo'
+    y retorna cuántas son. Si no hay rechazos no crea el archivo y borra el
+    de una ejecución anterior, para que no se confunda con el de esta.
+    """
+    cursor.execute(f"SELECT count(*) FROM {staging_table} WHERE motivo IS NOT NULL;")
+    rechazadas = cursor.fetchone()[0]
+    if not rechazadas:
+        if os.path.exists(report_path):
+            os.remove(report_path)
+    else:
+        with open(report_path, 'w', encoding='utf-8', newline='') as f:
+            cursor.copy_expert(
+                f"COPY (SELECT * FROM {staging_table} WHERE motivo IS NOT NULL ORDER BY fila) "
+                "TO STDOUT WITH (FORMAT csv, HEADER true)",
+                f
+            )
+    return rechazadas
+
+def staging_recursos(cursor, csv_file):
+    """Copia recursos_unicos.csv a stg_recursos y marca las filas inválidas. Retorna las filas leídas."""
+    leidas = copiar_csv_a_staging(cursor, csv_file, "stg_recursos", [
+        ('Codigo', 'codigo'), ('Descripcion', 'descripcion'),
+        ('Unidad', 'unidad'), ('Valor Unitario', 'valor_unitario'),
+    ])
+    cursor.execute("""
+        UPDATE stg_recursos SET motivo = CASE
+            WHEN trim(codigo) = '' THEN 'código vacío'
+            WHEN valor_unitario !~ %(num)s THEN 'valor unitario no numérico'
+        END;
+    """, {'num': NUMERIC_REGEX})
+    return leidas
+
+def staging_analisis(cursor, csv_file):
+    """Copia analisis_unitarios.csv a stg_analisis y marca las filas inválidas. Retorna las filas leídas."""
+    leidas = copiar_csv_a_staging(cursor, csv_file, "stg_analisis", [
+        ('codigo', 'codigo'), ('descripcion', 'descripcion'),
+        ('unidad', 'unidad'), ('total', 'total'),
+    ])
+    cursor.execute("""
+        UPDATE stg_analisis SET motivo = CASE
+            WHEN trim(codigo) = '' THEN 'código vacío'
+            WHEN total !~ %(num)s THEN 'total no numérico'
+        END;
+    """, {'num': NUMERIC_REGEX})
+    return leidas
+
+def staging_relaciones(cursor, csv_file):
+    """
+    Copia recursos_analisis.csv a stg_relaciones y marca las filas con valores
+    no numéricos o que apuntan a un análisis o recurso inexistente.
+    Retorna las filas leídas.
+    """
+    leidas = copiar_csv_a_staging(cursor, csv_file, "stg_relaciones", [
+        ('codigo_analisis', 'codigo_analisis'), ('codigo_recurso', 'codigo_recurso'),
+        ('descripcion_recurso', 'descripcion_recurso'), ('unidad_recurso', 'unidad_recurso'),
+        ('cantidad_recurso', 'cantidad_recurso'), ('desper', 'desper'),
+        ('vr_unitario', 'vr_unitario'), ('vr_parcial', 'vr_parcial'),
+    ])
+    cursor.execute("""
+        UPDATE stg_relaciones s SET motivo = CASE
+            WHEN trim(s.codigo_analisis) = '' OR trim(s.codigo_recurso) = '' THEN 'código vacío'
+            WHEN s.cantidad_recurso !~ %(num)s OR s.desper !~ %(num)s
+              OR s.vr_unitario !~ %(num)s OR s.vr_parcial !~ %(num)s THEN 'valor numérico inválido'
+            WHEN NOT EXISTS (SELECT 1 FROM analisis_unitarios a WHERE a.codigo = trim(s.codigo_analisis))
+                THEN 'análisis inexistente'
+            WHEN NOT EXISTS (SELECT 1 FROM recursos r WHERE r.codigo = trim(s.codigo_recurso))
+                THEN 'recurso inexistente'
+        END;
+    """, {'num': NUMERIC_REGEX})
+    return leidas
+
+def cargar_recursos_bulk(conn, csv_file, report_dir):
+    """Carga recursos_unicos.csv en 'recursos' por COPY + INSERT ... ON CONFLICT."""
+    with conn.cursor() as cursor:
+        leidas = staging_recursos(cursor, csv_file)
+        # DISTINCT ON conserva la primera aparición de cada código (como drop_duplicates)
+        cursor.execute("""
+            INSERT INTO recursos (codigo, descripcion, unidad, valor_unitario)
+            SELECT DISTINCT ON (trim(codigo)) trim(codigo), descripcion, unidad, valor_unitario::double precision
+            FROM stg_recursos
+            WHERE motivo IS NULL
+            ORDER BY trim(codigo), fila
+            ON CONFLICT (codigo) DO NOTHING;
+        """)
+        insertadas = cursor.rowcount
+        rechazadas = reportar_rechazos(cursor, "stg_recursos", os.path.join(report_dir, "rechazos_recursos.csv"))
+    return {'tabla': 'recursos', 'leidas': leidas, 'insertadas': insertadas, 'rechazadas': rechazadas}
+
+def cargar_analisis_unitarios_bulk(conn, csv_file, report_dir):
+    """Carga analisis_unitarios.csv en 'analisis_unitarios' por COPY + INSERT ... ON CONFLICT."""
+    with conn.cursor() as cursor:
+        leidas = staging_analisis(cursor, csv_file)
+        cursor.execute("""
+            INSERT INTO analisis_unitarios (codigo, descripcion, unidad, total)
+            SELECT DISTINCT ON (trim(codigo)) trim(codigo), descripcion, unidad, total::double precision
+            FROM stg_analisis
+            WHERE motivo IS NULL
+            ORDER BY trim(codigo), fila
+            ON CONFLICT (codigo) DO NOTHING;
+        """)
+        insertadas = cursor.rowcount
+        rechazadas = reportar_rechazos(cursor, "stg_analisis", os.path.join(report_dir, "rechazos_analisis.csv"))
+    return {'tabla': 'analisis_unitarios', 'leidas': leidas, 'insertadas': insertadas, 'rechazadas': rechazadas}
+
+def cargar_relaciones_bulk(conn, csv_file, report_dir):
+    """
+    Carga recursos_analisis.csv en 'analisis_unitarios_recursos'.
+    Las filas con valores no numéricos o que apuntan a un análisis o recurso
+    inexistente se envían al reporte en lugar de abortar la transacción.
+    La tabla no tiene restricción única sobre (codigo_analisis, codigo_recurso),
+    así que los duplicados se descartan con DISTINCT ON (primera aparición en
+    el CSV) y un anti-join contra las relaciones ya cargadas, como en
+    sincronizar_relaciones(); volver a ejecutar la carga no duplica filas.
+    """
+    with conn.cursor() as cursor:
+        leidas = staging_relaciones(cursor, csv_file)
+        cursor.execute("""
+            INSERT INTO analisis_unitarios_recursos
+            (codigo_recurso, descripcion_recurso, unidad_recurso, cantidad_recurso, desper, vr_unitario, vr_parcial, codigo_analisis)
+            SELECT n.codigo_recurso, n.descripcion_recurso, n.unidad_recurso, n.cantidad_recurso,
+                   n.desper, n.vr_unitario, n.vr_parcial, n.codigo_analisis
+            FROM (
+                SELECT DISTINCT ON (trim(codigo_analisis), trim(codigo_recurso))
+                       trim(codigo_recurso) AS codigo_recurso, descripcion_recurso, unidad_recurso,
+                       cantidad_recurso::double precision AS cantidad_recurso, desper::double precision AS desper,
+                       vr_unitario::double precision AS vr_unitario, vr_parcial::double precision AS vr_parcial,
+                       trim(codigo_analisis) AS codigo_analisis, fila
+                FROM stg_relaciones
+                WHERE motivo IS NULL
+                ORDER BY trim(codigo_analisis), trim(codigo_recurso), fila
+            ) n
+            WHERE NOT EXISTS (
+                SELECT 1 FROM analisis_unitarios_recursos t
+                WHERE t.codigo_analisis = n.codigo_analisis AND t.codigo_recurso = n.codigo_recurso
+            )
+            ORDER BY n.fila;
+        """)
+        insertadas = cursor.rowcount
+        rechazadas = reportar_rechazos(cursor, "stg_relaciones", os.path.join(report_dir, "rechazos_relaciones.csv"))
+    return {'tabla': 'analisis_unitarios_recursos', 'leidas': leidas, 'insertadas': insertadas, 'rechazadas': rechazadas}
+
+def recalcular_totales_cargados(cursor):
+    """
+    Recalcula analisis_unitarios.total (suma de vr_parcial de sus recursos) para
+    los análisis que aparecen en stg_analisis o stg_relaciones. Retorna el
+    número de análisis actualizados.
+    """
+    cursor.execute("""
+        UPDATE analisis_unitarios a
+        SET total = COALESCE((
+            SELECT sum(r.vr_parcial) FROM analisis_unitarios_recursos r
+            WHERE r.codigo_analisis = a.codigo
+        ), 0.0)
+        WHERE a.codigo IN (
+            SELECT trim(codigo) FROM stg_analisis WHERE motivo IS NULL
+            UNION
+            SELECT trim(codigo_analisis) FROM stg_relaciones WHERE motivo IS NULL
+        );
+    """)
+    return cursor.rowcount
+
+def cargar_todo_bulk(recursos_csv, analisis_csv, relaciones_csv, report_dir=None):
+    """
+    Carga masiva de recursos, análisis y relaciones en una sola transacción.
+    Los rechazos de cada tabla se escriben en rechazos_<tabla>.csv dentro de
+    'report_dir' (por defecto, la carpeta de los CSV).
+    Retorna la lista de resúmenes por tabla, o None si no hubo conexión.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    report_dir = report_dir or os.path.dirname(os.path.abspath(relaciones_csv))
+    try:
+        sin_limite_de_tiempo(conn)
+        resumen = [
+            cargar_recursos_bulk(conn, recursos_csv, report_dir),
+            cargar_analisis_unitarios_bulk(conn, analisis_csv, report_dir),
+            cargar_relaciones_bulk(conn, relaciones_csv, report_dir),
+        ]
+        # El total materializado es la suma de los recursos cargados
+        with conn.cursor() as cursor:
+            recalcular_totales_cargados(cursor)
+        conn.commit()
+        for r in resumen:
+            print(f"{r['tabla']}: {r['leidas']} leídas, {r['insertadas']} insertadas, {r['rechazadas']} rechazadas")
+        if any(r['rechazadas'] for r in resumen):
+            print(f"Reporte de filas rechazadas en: {report_dir}")
+        return resumen
+    except Exception as e:
+        conn.rollback()
+        print("Error en la carga masiva:", e)
+        return None
+    finally:
+        conn.close()
+
+# ---------------------------
+# Sincronización incremental (nueva edición del decreto)
+# ---------------------------
+def sincronizar_catalogo(cursor, staging_table, tabla, columnas, solo_al_insertar=()):
+    """
+    Sincroniza 'tabla' (recursos o analisis_unitarios) con las filas válidas de
+    'staging_table' comparando por 'codigo': inserta los códigos nuevos,
+    actualiza los que cambiaron en alguna de 'columnas' (pares
+    (columna, tipo_sql)) y no toca los que siguen iguales. Las columnas de
+    'solo_al_insertar' se copian en los códigos nuevos pero no se comparan ni
+    se actualizan (p. ej. el total materializado, que se recalcula aparte).
+    Los códigos que ya no aparecen en el CSV se cuentan como 'ausentes' pero
+    no se eliminan (pueden estar referenciados por análisis o presupuestos).
+    """
+    nuevos_table = f"{staging_table}_dedup"
+    select_cols = ", ".join(f"{col}::{tipo} AS {col}" for col, tipo in [*columnas, *solo_al_insertar])
+    cursor.execute(f"""
+        CREATE TEMP TABLE {nuevos_table} ON COMMIT DROP AS
+        SELECT DISTINCT ON (trim(codigo)) trim(codigo) AS codigo, {select_cols}
+        FROM {staging_table}
+        WHERE motivo IS NULL
+        ORDER BY trim(codigo), fila;
+    """)
+    nombres = [col for col, _ in columnas]
+    insertadas = nombres + [col for col, _ in solo_al_insertar]
+    cursor.execute(f"""
+        UPDATE {tabla} t SET {", ".join(f"{col} = n.{col}" for col in nombres)}
+        FROM {nuevos_table} n
+        WHERE t.codigo = n.codigo
+          AND ({", ".join(f"t.{col}" for col in nombres)}) IS DISTINCT FROM ({", ".join(f"n.{col}" for col in nombres)});
+    """)
+    actualizados = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO {tabla} (codigo, {", ".join(insertadas)})
+        SELECT codigo, {", ".join(insertadas)} FROM {nuevos_table}
+        ON CONFLICT (codigo) DO NOTHING;
+    """)
+    nuevos = cursor.rowcount
+    cursor.execute(f"SELECT count(*) FROM {nuevos_table};")
+    total = cursor.fetchone()[0]
+    cursor.execute(f"""
+        SELECT count(*) FROM {tabla} t
+        WHERE NOT EXISTS (SELECT 1 FROM {nuevos_table} n WHERE n.codigo = t.codigo);
+    """)
+    ausentes = cursor.fetchone()[0]
+    return {
+        'tabla': tabla, 'nuevos': nuevos, 'actualizados': actualizados,
+        'sin_cambios': total - nuevos - actualizados, 'eliminados': 0, 'ausentes': ausentes
+    }
+
+def sincronizar_relaciones(cursor):
+    """
+    Sincroniza 'analisis_unitarios_recursos' con stg_relaciones por la clave
+    (codigo_analisis, codigo_recurso), solo para los análisis presentes en el
+    CSV: inserta las relaciones nuevas, actualiza las que cambiaron y elimina
+    las que ya no forman parte del análisis. Las relaciones de análisis que no
+    vienen en el CSV no se tocan.
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE stg_relaciones_dedup ON COMMIT DROP AS
+        SELECT DISTINCT ON (trim(codigo_analisis), trim(codigo_recurso))
+               trim(codigo_analisis) AS codigo_analisis, trim(codigo_recurso) AS codigo_recurso,
+               descripcion_recurso, unidad_recurso,
+               cantidad_recurso::double precision AS cantidad_recurso, desper::double precision AS desper,
+               vr_unitario::double precision AS vr_unitario, vr_parcial::double precision AS vr_parcial
+        FROM stg_relaciones
+        WHERE motivo IS NULL
+        ORDER BY trim(codigo_analisis), trim(codigo_recurso), fila;
+    """)
+    cursor.execute("""
+        DELETE FROM analisis_unitarios_recursos t
+        WHERE t.codigo_analisis IN (SELECT DISTINCT codigo_analisis FROM stg_relaciones_dedup)
+          AND NOT EXISTS (
+              SELECT 1 FROM stg_relaciones_dedup n
+              WHERE n.codigo_analisis = t.codigo_analisis AND n.codigo_recurso = t.codigo_recurso
+          );
+    """)
+    eliminados = cursor.rowcount
+    cursor.execute("""
+        UPDATE analisis_unitarios_recursos t
+        SET descripcion_recurso = n.descripcion_recurso, unidad_recurso = n.unidad_recurso,
+            cantidad_recurso = n.cantidad_recurso, desper = n.desper,
+            vr_unitario = n.vr_unitario, vr_parcial = n.vr_parcial
+        FROM stg_relaciones_dedup n
+        WHERE t.codigo_analisis = n.codigo_analisis AND t.codigo_recurso = n.codigo_recurso
+          AND (t.descripcion_recurso, t.unidad_recurso, t.cantidad_recurso, t.desper, t.vr_unitario, t.vr_parcial)
+              IS DISTINCT FROM
+              (n.descripcion_recurso, n.unidad_recurso, n.cantidad_recurso, n.desper, n.vr_unitario, n.vr_parcial);
+    """)
+    actualizados = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO analisis_unitarios_recursos
+        (codigo_recurso, descripcion_recurso, unidad_recurso, cantidad_recurso, desper, vr_unitario, vr_parcial, codigo_analisis)
+        SELECT n.codigo_recurso, n.descripcion_recurso, n.unidad_recurso, n.cantidad_recurso,
+               n.desper, n.vr_unitario, n.vr_parcial, n.codigo_analisis
+        FROM stg_relaciones_dedup n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM analisis_unitarios_recursos t
+            WHERE t.codigo_analisis = n.codigo_analisis AND t.codigo_recurso = n.codigo_recurso
+        );
+    """)
+    nuevos = cursor.rowcount
+    cursor.execute("SELECT count(*) FROM stg_relaciones_dedup;")
+    total = cursor.fetchone()[0]
+    return {
+        'tabla': 'analisis_unitarios_recursos', 'nuevos': nuevos, 'actualizados': actualizados,
+        'sin_cambios': total - nuevos - actualizados, 'eliminados': eliminados, 'ausentes': 0
+    }
+
+def sincronizar_desde_csv(recursos_csv, analisis_csv, relaciones_csv, report_dir=None, dry_run=False):
+    """
+    Sincroniza de forma incremental las tablas con los CSV de una nueva edición
+    del decreto, en una sola transacción y sin recargar todo:
+      - recursos y analisis_unitarios se comparan por 'codigo'
+      - analisis_unitarios_recursos se compara por (codigo_analisis, codigo_recurso)
+    Las filas inválidas van a rechazos_<tabla>.csv como en la carga masiva.
+    Con dry_run=True se calcula el resumen y se deshace la transacción.
+    Retorna la lista de resúmenes de cambios por tabla, o None si falla.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+
+    report_dir = report_dir or os.path.dirname(os.path.abspath(relaciones_csv))
+    try:
+        sin_limite_de_tiempo(conn)
+        resumen = []
+        with conn.cursor() as cursor:
+            staging_recursos(cursor, recursos_csv)
+            cambios = sincronizar_catalogo(cursor, "stg_recursos", "recursos", [
+                ('descripcion', 'text'), ('unidad', 'text'), ('valor_unitario', 'double precision'),
+            ])
+            cambios['rechazados'] = reportar_rechazos(cursor, "stg_recursos", os.path.join(report_dir, "rechazos_recursos.csv"))
+            resumen.append(cambios)
+
+            staging_analisis(cursor, analisis_csv)
+            # El total no se compara: lo fija recalcular_totales_cargados() con los recursos
+            cambios = sincronizar_catalogo(cursor, "stg_analisis", "analisis_unitarios", [
+                ('descripcion', 'text'), ('unidad', 'text'),
+            ], solo_al_insertar=[('total', 'double precision')])
+            cambios['rechazados'] = reportar_rechazos(cursor, "stg_analisis", os.path.join(report_dir, "rechazos_analisis.csv"))
+            resumen.append(cambios)
+
+            # Las relaciones se validan después de insertar los recursos y análisis nuevos
+            staging_relaciones(cursor, relaciones_csv)
+            cambios = sincronizar_relaciones(cursor)
+            cambios['rechazados'] = reportar_rechazos(cursor, "stg_relaciones", os.path.join(report_dir, "rechazos_relaciones.csv"))
+            resumen.append(cambios)
+
+            # Ajusta el total materializado de los análisis tocados por la sincronización
+            recalcular_totales_cargados(cursor)
+
+        if dry_run:
+            conn.rollback()
+            print("Simulación: no se guardó ningún cambio.")
+        else:
+            conn.commit()
+
+        print("Resumen de cambios:")
+        for r in resumen:
+            print(f"  {r['tabla']}: {r['nuevos']} nuevos, {r['actualizados']} actualizados, "
+                  f"{r['sin_cambios']} sin cambios, {r['eliminados']} eliminados, "
+                  f"{r['ausentes']} ausentes en el CSV, {r['rechazados']} rechazados")
+        return resumen
+    except Exception as e:
+        conn.rollback()
+        print("Error en la sincronización incremental:", e)
+        return None
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga los CSV extraídos del PDF en PostgreSQL.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Usa COPY FROM STDIN + INSERT ... ON CONFLICT en lugar de un INSERT por fila.")
+    parser.add_argument("--sync", action="store_true",
+                        help="Sincroniza incrementalmente con una nueva edición (inserta, actualiza y deja igual).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Con --sync, muestra el resumen de cambios sin guardarlos.")
+    args = parser.parse_args()
+
+    recursos_csv = '../data_gobernacion/recursos_unicos.csv'
+    analisis_csv = '../data_gobernacion/analisis_unitarios.csv'
+    relaciones_csv = '../data_gobernacion/recursos_analisis.csv'
 
+    # Ejecutar funciones
+    if args.sync:
+        sincronizar_desde_csv(recursos_csv, analisis_csv, relaciones_csv, dry_run=args.dry_run)
+    elif args.bulk:
+        cargar_todo_bulk(recursos_csv, analisis_csv, relaciones_csv)
+    else:
+        cargar_datos_recursos_desde_csv(recursos_csv)
+        cargar_analisis_unitarios(analisis_csv)
+        cargar_relacion_analisis_unitarios_recursos(relaciones_csv)
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from models.database import Base
+from models.totales import registrar_eventos
+
+
+@pytest.fixture
+def engine():
+    """Base SQLite en memoria con las tablas de los modelos."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def fabrica_sesiones(engine):
+    """sessionmaker sobre la base de prueba, con el mantenimiento de totales registrado."""
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    registrar_eventos(fabrica)
+    return fabrica
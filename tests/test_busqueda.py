@@ -0,0 +1,49 @@
+from models.busqueda import IndiceBusqueda, VocabularioDifuso, tokens
+
+CODIGOS = ["01-01-01", "01-01-02", "02-01-01"]
+DESCRIPCIONES = ["CONCRETO DE 3.000 PSI", "EXCAVACIÓN MANUAL", "TUBERÍA PVC 1,5 PULG"]
+
+
+def indice():
+    return IndiceBusqueda(CODIGOS, DESCRIPCIONES)
+
+
+def test_tokens_une_separadores_de_miles():
+    assert tokens("CONCRETO DE 3.000 PSI") == ["concreto", "de", "3000", "psi"]
+    assert tokens("1.500,25") == ["1500", "25"]
+    assert tokens("Tubería 1,5") == ["tuberia", "1", "5"]
+
+
+def test_buscar_por_prefijos_sin_tildes():
+    assert indice().buscar("concreto 3000") == {"01-01-01"}
+    assert indice().buscar("3.000") == {"01-01-01"}
+    assert indice().buscar("excavacion man") == {"01-01-02"}
+    assert indice().buscar("tuberia") == {"02-01-01"}
+
+
+def test_buscar_subcadena_si_no_hay_prefijo():
+    assert indice().buscar("creto") == {"01-01-01"}
+    assert indice().buscar("cavac") == {"01-01-02"}
+    assert indice().buscar("zzz") == set()
+
+
+def test_filtrar_por_codigo_y_descripcion():
+    idx = indice()
+    assert idx.filtrar() is None
+    assert idx.filtrar(codigo="01-01") == {"01-01-01", "01-01-02", "02-01-01"}
+    assert idx.filtrar(codigo="01-01-0", descripcion="manual") == {"01-01-02"}
+
+
+def test_agregar_y_quitar():
+    idx = indice()
+    idx.agregar("03-01-01", "RELLENO COMPACTADO")
+    assert idx.buscar("compac") == {"03-01-01"}
+    idx.quitar("03-01-01")
+    assert idx.buscar("compac") == set()
+    assert len(idx) == 3
+
+
+def test_vocabulario_difuso():
+    vocabulario = VocabularioDifuso(DESCRIPCIONES + ["MEZCLADORA"])
+    assert vocabulario.candidatos("mescladora")[0][0] == "mezcladora"
+    assert vocabulario.candidatos("excav") == [("excav", 1.0)]
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import text
+
+from models.busqueda_sql import buscar_recursos, cargar_vocabulario
+
+
+@pytest.fixture
+def session(engine, fabrica_sesiones):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO recursos (codigo, descripcion, unidad, valor_unitario) VALUES "
+            "('001001', 'EXCAVACIÓN MANUAL', 'M3', 1.0), "
+            "('002001', 'CONCRETO DE 3.000 PSI', 'M3', 2.0), "
+            "('003001', 'MEZCLADORA', 'UND', 3.0)"
+        ))
+    session = fabrica_sesiones()
+    yield session
+    session.close()
+
+
+def codigos(filas):
+    return [fila[0] for fila in filas]
+
+
+@pytest.mark.parametrize("texto", ["excavación", "excavacion", "EXCAVACION", "Excavación manual"])
+def test_tildes_y_mayusculas_en_sqlite(session, texto):
+    assert codigos(buscar_recursos(session, texto)) == ["001001"]
+
+
+def test_separador_de_miles(session):
+    assert codigos(buscar_recursos(session, "concreto 3000")) == ["002001"]
+
+
+def test_errores_de_digitacion_con_vocabulario(session):
+    assert buscar_recursos(session, "mescladora") == []
+    vocabulario = cargar_vocabulario(session, "recursos")
+    assert codigos(buscar_recursos(session, "mescladora", vocabulario=vocabulario)) == ["003001"]
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from models.diferencias import diferenciar, instantanea
+
+CAMPOS = ["codigo_recurso", "descripcion_recurso", "unidad_recurso", "vr_parcial"]
+
+
+def fila_bd(id, descripcion, unidad="GLB", vr_parcial=1600.0):
+    return SimpleNamespace(id=id, codigo_recurso="MOAG01", descripcion_recurso=descripcion,
+                           unidad_recurso=unidad, vr_parcial=vr_parcial)
+
+
+def fila_vista(id, descripcion, unidad="GLB", vr_parcial=1600.0):
+    # Como las lee read_rows(): textos con strip() y números con float()
+    return {"id": id, "codigo_recurso": "MOAG01", "descripcion_recurso": descripcion.strip(),
+            "unidad_recurso": unidad.strip(), "vr_parcial": float(str(vr_parcial))}
+
+
+def test_filas_sin_tocar_con_espacios_en_la_base_no_son_modificadas():
+    objetos = [fila_bd(1, "HERRAMIENTA MENOR  "), fila_bd(2, " GASOLINA", unidad="GLN ")]
+    snapshot = instantanea(objetos, CAMPOS)
+    filas = [fila_vista(o.id, o.descripcion_recurso, o.unidad_recurso, o.vr_parcial) for o in objetos]
+    assert diferenciar(snapshot, filas, CAMPOS) == ([], [], [])
+
+
+def test_detecta_nuevas_modificadas_y_eliminadas():
+    snapshot = instantanea([fila_bd(1, "A"), fila_bd(2, "B"), fila_bd(3, "C")], CAMPOS)
+    filas = [fila_vista(1, "A"), fila_vista(2, "B", vr_parcial=3200.0), fila_vista(None, "D")]
+    nuevas, modificadas, eliminadas = diferenciar(snapshot, filas, CAMPOS)
+    assert nuevas == [2]
+    assert [m["id"] for m in modificadas] == [2]
+    assert modificadas[0]["vr_parcial"] == 3200.0
+    assert eliminadas == [3]
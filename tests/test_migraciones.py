@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+import models
+from models.database import Base
+from models.migraciones import MIGRACIONES, migrar, pendientes, version_actual
+
+
+@pytest.fixture
+def base_vacia():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+def esquema(engine):
+    inspector = inspect(engine)
+    return {
+        tabla: (
+            {c["name"] for c in inspector.get_columns(tabla)},
+            {ix["name"] for ix in inspector.get_indexes(tabla)},
+        )
+        for tabla in inspector.get_table_names()
+    }
+
+
+def test_migrar_base_vacia_llega_al_esquema_de_los_modelos(base_vacia):
+    assert migrar(base_vacia) == [m[0] for m in MIGRACIONES]
+    assert version_actual(base_vacia) == MIGRACIONES[-1][0]
+    assert pendientes(base_vacia) == []
+
+    migrado = esquema(base_vacia)
+    for table in Base.metadata.sorted_tables:
+        columnas, indices = migrado[table.name]
+        assert {c.name for c in table.columns} <= columnas, table.name
+        assert {ix.name for ix in table.indexes} <= indices, table.name
+
+
+def test_migrar_base_creada_con_create_all(base_vacia):
+    Base.metadata.create_all(base_vacia)
+    antes = esquema(base_vacia)
+    assert migrar(base_vacia) == [m[0] for m in MIGRACIONES]
+    despues = esquema(base_vacia)
+    del despues["schema_version"]
+    assert despues == antes
+
+
+def test_migrar_por_partes(base_vacia):
+    assert migrar(base_vacia, hasta=1) == [1]
+    assert "ix_aur_codigo_recurso" not in esquema(base_vacia)["analisis_unitarios_recursos"][1]
+    assert migrar(base_vacia) == [m[0] for m in MIGRACIONES[1:]]
+    assert migrar(base_vacia) == []
@@ -0,0 +1,74 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from db_extraction_analisis_unitarios import iter_table_lines, normalize_table
+
+
+def lineas_iterrows(tbl):
+    """Recorrido fila por fila que normalize_table reemplazó."""
+    tbl = tbl.fillna('')
+    lineas = []
+    for _, row in tbl.iterrows():
+        row_text = ' '.join(str(val).strip() for val in row if val != '')
+        row_text = re.sub(r'\s+', ' ', row_text).strip()
+        if row_text:
+            lineas.append(row_text)
+    return lineas
+
+
+# Tablas como las que entrega tabula: texto con espacios, celdas vacías,
+# NaN, columnas numéricas puras y columnas mezcladas
+TABLAS = {
+    'enteros_y_decimales': pd.DataFrame({'a': [1], 'b': [1.5]}),
+    'solo_enteros': pd.DataFrame({'a': [1, 2], 'b': [3, 4]}),
+    'decimales_con_nan': pd.DataFrame({'a': [1.0, np.nan], 'b': [2, 3]}),
+    'texto_y_numeros': pd.DataFrame({
+        'codigo': ['01-01-01-EXCAVACION', '  MOAG01-HERRAMIENTA ', None, '   '],
+        'unidad': ['M3', 'GLB', None, ''],
+        'cant': [1.0, 4.0, np.nan, np.nan],
+        'vr': [12500, 1600, 0, 7],
+    }),
+    'filas_vacias': pd.DataFrame({'a': ['', None, 'x\ty'], 'b': [None, ' ', 'z  w']}),
+    'una_columna': pd.DataFrame({'a': ['  $1.234.567 ', None, '']}),
+}
+
+
+@pytest.mark.parametrize('nombre', sorted(TABLAS))
+def test_normalize_table_igual_que_iterrows(nombre):
+    tbl = TABLAS[nombre]
+    assert normalize_table(tbl).tolist() == lineas_iterrows(tbl)
+
+
+def test_enteros_pasan_a_float_en_filas_numericas():
+    assert list(iter_table_lines(pd.DataFrame({'a': [1], 'b': [1.5]}))) == ['1.0 1.5']
+
+
+def test_tablas_aleatorias_igual_que_iterrows():
+    rng = np.random.default_rng(1276)
+    textos = np.array(['', ' ', 'CONCRETO', ' 3.000 PSI ', 'M3', 'a  b', '$1.600'], dtype=object)
+    for _ in range(200):
+        filas, columnas = rng.integers(0, 6), rng.integers(1, 5)
+        datos = {}
+        for c in range(columnas):
+            tipo = rng.integers(4)
+            if tipo == 0:
+                col = rng.integers(-5, 5000, filas)
+            elif tipo == 1:
+                col = rng.normal(0, 1000, filas).round(rng.integers(0, 3))
+                col[rng.random(filas) < 0.3] = np.nan
+            elif tipo == 2:
+                col = rng.choice(textos, filas)
+                col[rng.random(filas) < 0.3] = None
+            else:
+                col = np.where(rng.random(filas) < 0.5, rng.choice(textos, filas), rng.integers(0, 9, filas)).astype(object)
+            datos[f'c{c}'] = col
+        tbl = pd.DataFrame(datos)
+        assert normalize_table(tbl).tolist() == lineas_iterrows(tbl)
+
+
+def test_tabla_vacia():
+    assert normalize_table(pd.DataFrame()).tolist() == []
+    assert normalize_table(pd.DataFrame({'a': []})).tolist() == []
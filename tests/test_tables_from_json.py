@@ -0,0 +1,38 @@
+import pandas as pd
+
+from db_extraction_analisis_unitarios import iter_table_lines, tables_from_json
+
+
+def celda(texto):
+    return {'top': 0.0, 'left': 0.0, 'width': 0.0, 'height': 0.0, 'text': texto}
+
+
+def tabla(pagina, filas):
+    return {'extraction_method': 'stream', 'page_number': pagina,
+            'data': [[celda(t) for t in fila] for fila in filas]}
+
+
+def test_encabezado_celdas_vacias_y_columnas_numericas():
+    raw = [tabla(3, [
+        ['CODIGO', 'UNIDAD', 'CANT'],
+        ['01-01-01-EXCAVACION', 'M3', '2'],
+        ['', '', '1.5'],
+    ])]
+    (pagina, tbl), = tables_from_json(raw)
+    assert pagina == 3
+    assert list(tbl.columns) == ['CODIGO', 'UNIDAD', 'CANT']
+    assert tbl['CANT'].dtype == 'float64'
+    assert pd.isna(tbl.iloc[1, 0])
+    assert list(iter_table_lines(tbl)) == ['01-01-01-EXCAVACION M3 2.0', '1.5']
+
+
+def test_separa_las_tablas_por_pagina():
+    raw = [tabla(1, [['A'], ['x']]), tabla(1, [['B'], ['y']]), tabla(2, [['C'], ['z']])]
+    paginas = [(p, list(iter_table_lines(t))) for p, t in tables_from_json(raw)]
+    assert paginas == [(1, ['x']), (1, ['y']), (2, ['z'])]
+
+
+def test_tabla_sin_filas():
+    (pagina, tbl), = tables_from_json([tabla(5, [])])
+    assert pagina == 5
+    assert list(iter_table_lines(tbl)) == []
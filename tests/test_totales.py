@@ -0,0 +1,193 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import AnalisisUnitario, AnalisisUnitarioRecurso, Recurso
+from models.database import Base
+from models.totales import recalcular_totales, verificar_totales
+
+
+def total(session, codigo):
+    return session.query(AnalisisUnitario.total).filter_by(codigo=codigo).scalar()
+
+
+@pytest.fixture
+def session(fabrica_sesiones):
+    session = fabrica_sesiones()
+    session.add_all([
+        Recurso(codigo='003282', descripcion='GASOLINA', unidad='GLN', valor_unitario=15000.0),
+        Recurso(codigo='MOAG01', descripcion='HERRAMIENTA MENOR', unidad='GLB', valor_unitario=1600.0),
+        AnalisisUnitario(codigo='01-01-01', descripcion='EXCAVACION MANUAL', unidad='M3'),
+        AnalisisUnitario(codigo='01-01-02', descripcion='RELLENO', unidad='M3'),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def relacion(codigo_analisis, codigo_recurso, vr_parcial):
+    return AnalisisUnitarioRecurso(
+        codigo_analisis=codigo_analisis, codigo_recurso=codigo_recurso,
+        descripcion_recurso=codigo_recurso, unidad_recurso='UND',
+        cantidad_recurso=1.0, desper=0.0, vr_unitario=vr_parcial, vr_parcial=vr_parcial,
+    )
+
+
+def test_insertar_recurso_actualiza_total(session):
+    session.add_all([relacion('01-01-01', '003282', 15000.0), relacion('01-01-01', 'MOAG01', 1600.0)])
+    session.commit()
+    assert total(session, '01-01-01') == pytest.approx(16600.0)
+    assert verificar_totales(session) == []
+
+
+def test_modificar_recurso_actualiza_total(session):
+    fila = relacion('01-01-01', '003282', 15000.0)
+    session.add(fila)
+    session.commit()
+
+    fila.vr_parcial = 7500.0
+    session.commit()
+    assert total(session, '01-01-01') == pytest.approx(7500.0)
+    assert verificar_totales(session) == []
+
+
+def test_mover_recurso_actualiza_ambos_analisis(session):
+    fila = relacion('01-01-01', '003282', 15000.0)
+    session.add(fila)
+    session.commit()
+    session.expire(fila)
+
+    fila.codigo_analisis = '01-01-02'
+    session.commit()
+    assert total(session, '01-01-01') == pytest.approx(0.0)
+    assert total(session, '01-01-02') == pytest.approx(15000.0)
+    assert verificar_totales(session) == []
+
+
+def test_eliminar_recurso_actualiza_total(session):
+    fila = relacion('01-01-01', '003282', 15000.0)
+    session.add_all([fila, relacion('01-01-01', 'MOAG01', 1600.0)])
+    session.commit()
+
+    session.delete(fila)
+    session.commit()
+    assert total(session, '01-01-01') == pytest.approx(1600.0)
+    assert verificar_totales(session) == []
+
+
+def test_objeto_cargado_ve_el_total_nuevo(session):
+    analisis = session.query(AnalisisUnitario).filter_by(codigo='01-01-01').one()
+    assert analisis.total == 0.0
+    session.add(relacion('01-01-01', 'MOAG01', 1600.0))
+    session.flush()
+    assert analisis.total == pytest.approx(1600.0)
+
+
+def test_borrado_masivo_requiere_recalcular(session):
+    session.add_all([relacion('01-01-01', '003282', 15000.0), relacion('01-01-01', 'MOAG01', 1600.0)])
+    session.commit()
+
+    # query.delete() no pasa por el flush: el total queda desfasado hasta recalcular
+    session.query(AnalisisUnitarioRecurso).filter_by(codigo_recurso='003282').delete()
+    assert [d['codigo'] for d in verificar_totales(session)] == ['01-01-01']
+    assert recalcular_totales(session, ['01-01-01']) == 1
+    session.commit()
+    assert verificar_totales(session) == []
+    assert total(session, '01-01-01') == pytest.approx(1600.0)
+
+
+# ---------------------------
+# Cargas masivas de update_db (COPY, DISTINCT ON): solo en PostgreSQL
+# ---------------------------
+URL_POSTGRES = os.environ.get("PRESUPUESTOS_TEST_DB_URL")
+
+
+@pytest.fixture
+def update_db(monkeypatch):
+    if not URL_POSTGRES:
+        pytest.skip("PRESUPUESTOS_TEST_DB_URL no apunta a una base PostgreSQL de prueba")
+    engine = create_engine(URL_POSTGRES)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # update_db se ejecuta como script desde models/ (from database import ...)
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), "models"))
+    import update_db
+    monkeypatch.setattr(update_db, "get_db_connection", engine.raw_connection)
+    yield update_db, engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def escribir_csv(tmp_path, recursos, analisis, relaciones):
+    rutas = {}
+    for nombre, cabecera, filas in [
+        ("recursos_unicos.csv", "Codigo,Descripcion,Unidad,Valor Unitario", recursos),
+        ("analisis_unitarios.csv", "codigo,descripcion,unidad,total", analisis),
+        ("recursos_analisis.csv",
+         "codigo_recurso,descripcion_recurso,unidad_recurso,cantidad_recurso,desper,vr_unitario,vr_parcial,codigo_analisis",
+         relaciones),
+    ]:
+        ruta = tmp_path / nombre
+        ruta.write_text("\n".join([cabecera, *filas]) + "\n", encoding="utf-8")
+        rutas[nombre] = str(ruta)
+    return rutas["recursos_unicos.csv"], rutas["analisis_unitarios.csv"], rutas["recursos_analisis.csv"]
+
+
+RECURSOS = ["003282,GASOLINA,GLN,15000", "MOAG01,HERRAMIENTA MENOR,GLB,1600"]
+# El total impreso en el decreto no coincide con la suma de sus recursos
+ANALISIS = ["01-01-01,EXCAVACION MANUAL,M3,99999", "01-01-02,RELLENO,M3,0"]
+RELACIONES = [
+    "003282,GASOLINA,GLN,1,0,15000,15000,01-01-01",
+    "MOAG01,HERRAMIENTA MENOR,GLB,1,0,1600,1600,01-01-01",
+    "MOAG01,HERRAMIENTA MENOR,GLB,2,0,1600,3200,01-01-02",
+]
+
+
+def test_carga_masiva_deja_totales_consistentes(update_db, fabrica_postgres, tmp_path):
+    modulo, _ = update_db
+    csvs = escribir_csv(tmp_path, RECURSOS, ANALISIS, RELACIONES)
+    assert modulo.cargar_todo_bulk(*csvs, report_dir=str(tmp_path)) is not None
+    # Volver a cargar no duplica relaciones ni desfasa los totales
+    assert modulo.cargar_todo_bulk(*csvs, report_dir=str(tmp_path)) is not None
+
+    session = fabrica_postgres()
+    assert verificar_totales(session) == []
+    assert total(session, '01-01-01') == pytest.approx(16600.0)
+    assert session.query(AnalisisUnitarioRecurso).count() == len(RELACIONES)
+    session.close()
+
+
+def test_sincronizacion_deja_totales_consistentes(update_db, fabrica_postgres, tmp_path):
+    modulo, _ = update_db
+    modulo.cargar_todo_bulk(*escribir_csv(tmp_path, RECURSOS, ANALISIS, RELACIONES), report_dir=str(tmp_path))
+
+    nueva_edicion = escribir_csv(
+        tmp_path,
+        RECURSOS + ["SC0201,ELABORACION,UND,500"],
+        ANALISIS + ["01-01-03,DEMOLICION,M2,1"],
+        [
+            "003282,GASOLINA,GLN,1,0,15000,15000,01-01-01",
+            "MOAG01,HERRAMIENTA MENOR,GLB,3,0,1600,4800,01-01-02",
+            "SC0201,ELABORACION,UND,2,0,500,1000,01-01-03",
+        ],
+    )
+    resumen = modulo.sincronizar_desde_csv(*nueva_edicion, report_dir=str(tmp_path))
+    assert resumen is not None
+    # Los totales impresos en el CSV no cuentan como cambios de los análisis
+    analisis = next(r for r in resumen if r['tabla'] == 'analisis_unitarios')
+    assert (analisis['nuevos'], analisis['actualizados']) == (1, 0)
+
+    session = fabrica_postgres()
+    assert verificar_totales(session) == []
+    assert total(session, '01-01-01') == pytest.approx(15000.0)
+    assert total(session, '01-01-02') == pytest.approx(4800.0)
+    assert total(session, '01-01-03') == pytest.approx(1000.0)
+    session.close()
+
+
+@pytest.fixture
+def fabrica_postgres(update_db):
+    _, engine = update_db
+    return sessionmaker(bind=engine)
@@ -0,0 +1,53 @@
+from sqlalchemy import text
+
+from models import AnalisisUnitario
+from models.unidad_trabajo import UnidadDeTrabajo
+
+
+def test_obtener_usa_el_cache_salvo_con_refrescar(engine, fabrica_sesiones):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO analisis_unitarios (codigo, descripcion, unidad, total) "
+            "VALUES ('01-01-01', 'EXCAVACION', 'M3', 100.0)"
+        ))
+    uow = UnidadDeTrabajo(fabrica_sesiones)
+    analisis = uow.obtener(AnalisisUnitario, '01-01-01')
+    assert analisis.total == 100.0
+
+    # Otra pantalla cambia el total
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE analisis_unitarios SET total = 250.0 WHERE codigo = '01-01-01'"))
+
+    assert uow.obtener(AnalisisUnitario, '01-01-01').total == 100.0
+    refrescado = uow.obtener(AnalisisUnitario, '01-01-01', refrescar=True)
+    assert refrescado is analisis
+    assert refrescado.total == 250.0
+    uow.cerrar()
+
+
+def test_obtener_refrescar_olvida_codigos_eliminados(engine, fabrica_sesiones):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO analisis_unitarios (codigo, descripcion, unidad, total) "
+            "VALUES ('01-01-02', 'RELLENO', 'M3', 0.0)"
+        ))
+    uow = UnidadDeTrabajo(fabrica_sesiones)
+    assert uow.obtener(AnalisisUnitario, '01-01-02') is not None
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM analisis_unitarios WHERE codigo = '01-01-02'"))
+    assert uow.obtener(AnalisisUnitario, '01-01-02', refrescar=True) is None
+    uow.cerrar()
+
+
+def test_lectura_despues_de_flush_no_confirma_los_cambios(engine, fabrica_sesiones):
+    uow = UnidadDeTrabajo(fabrica_sesiones)
+    uow.agregar(AnalisisUnitario(codigo='01-01-03', descripcion='BASE', unidad='M3', total=0.0))
+    uow.flush()
+    # La lectura no debe cerrar la transacción con el INSERT ya enviado
+    assert len(uow.listar(AnalisisUnitario)) == 1
+    uow.descartar()
+    with engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT count(*) FROM analisis_unitarios WHERE codigo = '01-01-03'"
+        )).scalar() == 0
+    uow.cerrar()
@@ -6,6 +6,10 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from PyQt6.QtCore import Qt, pyqtSignal
 
+# Rol donde se guarda, en la celda del código, el id del ítem en la base
+# (None para los ítems agregados que aún no se han guardado)
+ROW_ID_ROLE = Qt.ItemDataRole.UserRole + 1
+
 class AnalisisPorPresupuestoView(QWidget):
     # Señal para notificar cuando se selecciona un análisis (por ejemplo, desde el selector)
     analisis_selected_por_presupuesto = pyqtSignal(str)
@@ -139,4 +143,5 @@ class AnalisisPorPresupuestoView(QWidget):
                 QStandardItem(str(analisis.get("vr_unitario", 0))),
                 QStandardItem(str(analisis.get("vr_total", 0))),
             ]
+            row[0].setData(analisis.get("id"), ROW_ID_ROLE)
             self.model.appendRow(row)
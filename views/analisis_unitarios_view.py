@@ -1,9 +1,225 @@
 # views/analisis_unitarios_view.py
+from array import array
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QAbstractItemView,
     QHeaderView, QPushButton, QLineEdit, QLabel, QMessageBox, QApplication
 )
-from PyQt6.QtCore import pyqtSignal, Qt
+from PyQt6.QtCore import (
+    pyqtSignal, Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QTimer
+)
+from models.busqueda import IndiceBusqueda
+
+# Milisegundos sin escribir antes de aplicar la búsqueda
+SEARCH_DELAY_MS = 150
+
+class AnalisisUnitariosModel(QAbstractTableModel):
+    """
+    Modelo de la tabla de análisis unitarios guardado por columnas: una lista
+    por columna de texto y un array de floats para el total, en lugar de un
+    QTableWidgetItem por celda. Las celdas se generan en data() solo cuando la
+    vista las pinta, así que cargar o desplazar 20.000 análisis no crea objetos
+    por celda. El índice de búsqueda (models/busqueda.py) se mantiene al día
+    con cada cambio; 'version' aumenta cada vez que cambia.
+    """
+    COLUMNAS = ("codigo", "descripcion", "unidad", "total")
+    ENCABEZADOS = ("Código", "Descripción", "Unidad", "Total")
+    # Columnas que se pueden editar en la tabla (el total es la suma de los recursos)
+    EDITABLES = (1, 2)
+
+    # Se emite con la fila (del modelo) cuando el usuario edita una celda
+    fila_editada = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.codigos = []
+        self.descripciones = []
+        self.unidades = []
+        self.totales = array("d")
+        # codigo -> fila, para actualizar una sola fila sin recorrer la tabla
+        self._filas = {}
+        self.indice = IndiceBusqueda()
+        self.version = 0
+
+    def cargar(self, codigos, descripciones, unidades, totales):
+        """Reemplaza todo el contenido con las columnas recibidas."""
+        self.beginResetModel()
+        self.codigos = list(codigos)
+        self.descripciones = [d or "" for d in descripciones]
+        self.unidades = [u or "" for u in unidades]
+        self.totales = array("d", (t or 0.0 for t in totales))
+        self._reindexar()
+        self.indice.cargar(self.codigos, self.descripciones)
+        self.version += 1
+        self.endResetModel()
+
+    def _reindexar(self):
+        self._filas = {codigo: fila for fila, codigo in enumerate(self.codigos)}
+
+    def fila_de(self, codigo):
+        return self._filas.get(codigo)
+
+    def fila(self, fila):
+        """Diccionario con los valores de una fila."""
+        return {
+            "codigo": self.codigos[fila],
+            "descripcion": self.descripciones[fila],
+            "unidad": self.unidades[fila],
+            "total": self.totales[fila],
+        }
+
+    # ---------------------------
+    # Interfaz de QAbstractTableModel
+    # ---------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.codigos)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNAS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        fila, columna = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if columna == 3:
+                return f"{self.totales[fila]:.2f}"
+            return self._columna(columna)[fila]
+        if role == Qt.ItemDataRole.EditRole:
+            return self._columna(columna)[fila]
+        if role == Qt.ItemDataRole.TextAlignmentRole and columna == 3:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.ENCABEZADOS[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in self.EDITABLES:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid() or index.column() not in self.EDITABLES:
+            return False
+        valor = str(value).strip()
+        columna = self._columna(index.column())
+        if columna[index.row()] == valor:
+            return False
+        columna[index.row()] = valor
+        self._indexar_fila(index.row())
+        self.dataChanged.emit(index, index)
+        self.fila_editada.emit(index.row())
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Ordena las columnas en Python (una sola pasada) en lugar de comparar celda por celda."""
+        valores = self._columna(column)
+        if column != 3:
+            valores = [v.lower() for v in valores]
+        orden = sorted(
+            range(len(self.codigos)), key=valores.__getitem__,
+            reverse=order == Qt.SortOrder.DescendingOrder
+        )
+        self.layoutAboutToBeChanged.emit()
+        anteriores = self.persistentIndexList()
+        posicion = {anterior: nueva for nueva, anterior in enumerate(orden)}
+        self.codigos = [self.codigos[i] for i in orden]
+        self.descripciones = [self.descripciones[i] for i in orden]
+        self.unidades = [self.unidades[i] for i in orden]
+        self.totales = array("d", (self.totales[i] for i in orden))
+        self._reindexar()
+        self.changePersistentIndexList(anteriores, [
+            self.index(posicion[i.row()], i.column()) for i in anteriores
+        ])
+        self.layoutChanged.emit()
+
+    def _columna(self, columna):
+        return (self.codigos, self.descripciones, self.unidades, self.totales)[columna]
+
+    def _indexar_fila(self, fila):
+        self.indice.agregar(self.codigos[fila], self.descripciones[fila])
+        self.version += 1
+
+    # ---------------------------
+    # Cambios de una sola fila
+    # ---------------------------
+    def agregar(self, datos):
+        fila = len(self.codigos)
+        self.beginInsertRows(QModelIndex(), fila, fila)
+        self.codigos.append(datos["codigo"])
+        self.descripciones.append(datos.get("descripcion") or "")
+        self.unidades.append(datos.get("unidad") or "")
+        self.totales.append(datos.get("total") or 0.0)
+        self._filas[datos["codigo"]] = fila
+        self._indexar_fila(fila)
+        self.endInsertRows()
+        return fila
+
+    def eliminar(self, codigo):
+        fila = self._filas.get(codigo)
+        if fila is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), fila, fila)
+        for columna in (self.codigos, self.descripciones, self.unidades, self.totales):
+            del columna[fila]
+        self._reindexar()
+        self.indice.quitar(codigo)
+        self.version += 1
+        self.endRemoveRows()
+        return True
+
+    def actualizar(self, codigo, **valores):
+        """Actualiza los valores de un análisis y notifica solo su fila."""
+        fila = self._filas.get(codigo)
+        if fila is None:
+            return False
+        for campo, valor in valores.items():
+            columna = self._columna(self.COLUMNAS.index(campo))
+            columna[fila] = (valor or 0.0) if campo == "total" else (valor or "")
+        if "descripcion" in valores:
+            self._indexar_fila(fila)
+        self.dataChanged.emit(self.index(fila, 0), self.index(fila, len(self.COLUMNAS) - 1))
+        return True
+
+class FiltroAnalisisProxy(QSortFilterProxyModel):
+    """
+    Muestra solo los análisis encontrados por el índice de búsqueda del modelo.
+    El conjunto de códigos visibles se calcula una vez por búsqueda (y cuando
+    cambia el índice); filterAcceptsRow solo consulta ese conjunto.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filtro_codigo = ""
+        self.filtro_descripcion = ""
+        self._visibles = None
+        self._version = None
+
+    def fijar_filtros(self, codigo, descripcion):
+        self.filtro_codigo = codigo
+        self.filtro_descripcion = descripcion
+        self._version = None
+        self.invalidateFilter()
+
+    def visibles(self):
+        """Códigos que cumplen los filtros, o None si no hay filtros."""
+        modelo = self.sourceModel()
+        if self._version != modelo.version:
+            self._visibles = modelo.indice.filtrar(self.filtro_codigo, self.filtro_descripcion)
+            self._version = modelo.version
+        return self._visibles
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        visibles = self.visibles()
+        return visibles is None or self.sourceModel().codigos[source_row] in visibles
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # El orden lo aplica el modelo sobre sus columnas; el proxy conserva ese orden
+        self.sourceModel().sort(column, order)
 
 class AnalisisUnitariosView(QWidget):
     # Señal que se emite cuando se hace doble clic en una fila (para seleccionar un análisis)
@@ -14,9 +230,14 @@ class AnalisisUnitariosView(QWidget):
     add_analysis = pyqtSignal(dict)
     # Señal que se emite cuando se solicita eliminar un análisis unitario (por código)
     analysis_delete_requested = pyqtSignal(str)
+    # Búsqueda en el servidor (código, descripción), cuando busqueda_remota es True
+    search_requested = pyqtSignal(str, str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        # Si es True la tabla no filtra en memoria: cada búsqueda se pide al
+        # controlador (search_requested) y la tabla muestra solo los resultados
+        self.busqueda_remota = False
         self.setWindowTitle("Análisis Unitarios")
         self.resize(800, 600)
         self.layout = QVBoxLayout(self)
@@ -28,7 +249,7 @@ class AnalisisUnitariosView(QWidget):
         
         self.setLayout(self.layout)
         self.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #f9f9f9;
                 gridline-color: #cccccc;
                 font-size: 14px;
@@ -117,8 +338,13 @@ class AnalisisUnitariosView(QWidget):
         self.search_desc_input = QLineEdit()
         self.search_desc_input.setPlaceholderText("Buscar por Descripción")
 
-        self.search_code_input.textChanged.connect(self.apply_filters)
-        self.search_desc_input.textChanged.connect(self.apply_filters)
+        # La búsqueda espera a que se deje de escribir (un solo filtrado por ráfaga de teclas)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_code_input.textChanged.connect(lambda *_: self.search_timer.start())
+        self.search_desc_input.textChanged.connect(lambda *_: self.search_timer.start())
 
         search_layout.addWidget(QLabel("Código:"))
         search_layout.addWidget(self.search_code_input)
@@ -129,35 +355,51 @@ class AnalisisUnitariosView(QWidget):
         self.layout.addWidget(search_container)
 
     def create_table(self):
-        """Crea la tabla para mostrar los análisis unitarios."""
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Código", "Descripción", "Unidad", "Total"])
+        """Crea la tabla para mostrar los análisis unitarios (modelo por columnas + proxy de filtro)."""
+        self.model = AnalisisUnitariosModel(self)
+        self.proxy = FiltroAnalisisProxy(self)
+        self.proxy.setSourceModel(self.model)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         # Habilitar el ordenamiento al hacer clic en los encabezados
         self.table.setSortingEnabled(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        # Doble clic selecciona el análisis; descripción y unidad se editan con F2
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.EditKeyPressed)
         self.table.setAlternatingRowColors(True)
+        # Todas las filas tienen la misma altura: la vista no necesita medirlas una por una
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         
         # Conectar el doble clic para emitir la señal de selección
-        self.table.cellDoubleClicked.connect(self.on_cell_double_clicked)
+        self.table.doubleClicked.connect(self.on_cell_double_clicked)
         
-        # Nueva conexión: conectar la señal cellClicked (clic simple) a la función on_cell_clicked
-        self.table.cellClicked.connect(self.on_cell_clicked)
+        # Nueva conexión: conectar la señal clicked (clic simple) a la función on_cell_clicked
+        self.table.clicked.connect(self.on_cell_clicked)
         
         # Añadir la tabla al layout principal
         self.layout.addWidget(self.table)
 
     def load_data(self, data):
-        self.table.blockSignals(True)
-        self.table.setRowCount(len(data))
-        for row, item in enumerate(data):
-            self.table.setItem(row, 0, QTableWidgetItem(item.get("codigo", "")))
-            self.table.setItem(row, 1, QTableWidgetItem(item.get("descripcion", "")))
-            self.table.setItem(row, 2, QTableWidgetItem(item.get("unidad", "")))
-            self.table.setItem(row, 3, QTableWidgetItem(f"{item.get('total', 0):.2f}"))
-        self.table.blockSignals(False)
+        """Carga una lista de diccionarios (codigo, descripcion, unidad, total)."""
+        self.load_columns(
+            [item.get("codigo", "") for item in data],
+            [item.get("descripcion", "") for item in data],
+            [item.get("unidad", "") for item in data],
+            [item.get("total", 0) for item in data],
+        )
+
+    def load_columns(self, codigos, descripciones, unidades, totales):
+        """Carga los análisis directamente como columnas, sin armar un diccionario por fila."""
+        self.model.cargar(codigos, descripciones, unidades, totales)
+
+    def codigo_en(self, index):
+        """Código del análisis en un índice de la tabla (del proxy)."""
+        if not index.isValid():
+            return None
+        return self.model.codigos[self.proxy.mapToSource(index).row()]
 
     def on_add_clicked(self):
         data = self.get_data_from_form()
@@ -173,20 +415,16 @@ class AnalisisUnitariosView(QWidget):
         Obtiene la fila seleccionada, pide confirmación y emite la señal si procede.
         """
         # Verificar si hay al menos una fila seleccionada
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        selected_rows = self.table.selectionModel().selectedRows()
+        if not selected_rows:
             QMessageBox.warning(self, "Sin selección", "Por favor, selecciona un análisis en la tabla.")
             return
 
-        # Asumimos que la primera columna (código) está en la misma fila
-        row = selected_items[0].row()
-        codigo_item = self.table.item(row, 0)
-        if not codigo_item:
+        codigo = self.codigo_en(selected_rows[0])
+        if not codigo:
             QMessageBox.warning(self, "Error", "No se pudo obtener el código del análisis seleccionado.")
             return
 
-        codigo = codigo_item.text()
-
         # Confirmación
         reply = QMessageBox.question(
             self,
@@ -220,32 +458,27 @@ class AnalisisUnitariosView(QWidget):
         Si se proporcionan filtros, se establecen en los campos de búsqueda.
         """
         # Solo establecer los filtros si se proporcionan explícitamente
-        if codigo_filter:
-            self.search_code_input.setText(codigo_filter)
-        if descripcion_filter:
-            self.search_desc_input.setText(descripcion_filter)
-        
-        # Obtener los valores actuales de los campos de búsqueda
-        code_filter = self.search_code_input.text().strip().lower()
-        desc_filter = self.search_desc_input.text().strip().lower()
-        
-        for row in range(self.table.rowCount()):
-            # Columna 0: Código, Columna 1: Descripción
-            code_item = self.table.item(row, 0)
-            desc_item = self.table.item(row, 1)
-            
-            # Obtener los textos de las celdas
-            code = code_item.text().lower() if code_item else ""
-            desc = desc_item.text().lower() if desc_item else ""
-            
-            # Aplicar los filtros de manera independiente
-            code_match = True if not code_filter else code_filter in code
-            desc_match = True if not desc_filter else desc_filter in desc
-            
-            # La fila es visible si cumple con ambos filtros
-            self.table.setRowHidden(row, not (code_match and desc_match))
-
-    def on_cell_clicked(self, row, column):
+        if codigo_filter or descripcion_filter:
+            self.set_search_text(codigo_filter, descripcion_filter)
+            return
+        self.search_timer.stop()
+        codigo = self.search_code_input.text().strip()
+        descripcion = self.search_desc_input.text().strip()
+        if self.busqueda_remota:
+            self.search_requested.emit(codigo, descripcion)
+            return
+        # El índice del modelo resuelve la búsqueda; el proxy solo muestra esas filas
+        self.proxy.fijar_filtros(codigo, descripcion)
+
+    def set_search_text(self, codigo="", descripcion=""):
+        """Llena los campos de búsqueda y filtra de inmediato, sin esperar el temporizador."""
+        for campo, texto in ((self.search_code_input, codigo), (self.search_desc_input, descripcion)):
+            campo.blockSignals(True)
+            campo.setText(texto)
+            campo.blockSignals(False)
+        self.apply_filters()
+
+    def on_cell_clicked(self, index):
         """
         Maneja el evento de clic en una celda de la tabla.
         Si Shift está presionado, emite la señal para editar el análisis.
@@ -253,15 +486,13 @@ class AnalisisUnitariosView(QWidget):
         # Verificar si la tecla Shift está presionada
         modifiers = QApplication.keyboardModifiers()
         if modifiers & Qt.KeyboardModifier.ShiftModifier:
-            codigo_item = self.table.item(row, 0)
-            if codigo_item:
-                codigo = codigo_item.text()
+            codigo = self.codigo_en(index)
+            if codigo:
                 print(f"Shift+Click en análisis: {codigo} - Abrir editor de recursos")
                 self.analysis_edit_requested.emit(codigo)
 
-    def on_cell_double_clicked(self, row, column):
+    def on_cell_double_clicked(self, index):
         """Emite la señal con el código del análisis cuando se hace doble clic."""
-        codigo_item = self.table.item(row, 0)
-        if codigo_item:
-            codigo = codigo_item.text()
+        codigo = self.codigo_en(index)
+        if codigo:
             self.analysis_selected.emit(codigo)
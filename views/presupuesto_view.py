@@ -4,8 +4,16 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from controllers.analisis_unitarios_controller import AnalisisUnitariosController
+from models.grafo_costos import LineasPresupuesto
 import csv
 
+def _a_numero(texto, defecto):
+    """Convierte el texto de una celda importada a float (admite separadores de miles)."""
+    try:
+        return float(texto.replace(",", "").strip())
+    except ValueError:
+        return defecto
+
 class PresupuestoView(QWidget):
     analisis_selected = pyqtSignal(str)
     
@@ -14,6 +22,8 @@ class PresupuestoView(QWidget):
         self.setWindowTitle("Presupuesto")
         self.resize(1000, 600)
         self.layout = QVBoxLayout(self)
+        # Valores numéricos de cada fila; la tabla solo muestra el resultado
+        self.lineas = LineasPresupuesto()
         
         # Crear el buscador de análisis
         self.create_search_bar()
@@ -83,7 +93,8 @@ class PresupuestoView(QWidget):
     def show_analisis_search(self):
         """Muestra la ventana de búsqueda de análisis unitarios."""
         if not self.analisis_controller:
-            self.analisis_controller = AnalisisUnitariosController()
+            # La búsqueda se resuelve en la base: no hace falta cargar todo el catálogo
+            self.analisis_controller = AnalisisUnitariosController(busqueda_remota=True)
             # Conectar la señal de selección de análisis
             self.analisis_controller.view.analysis_selected.connect(self.on_analisis_selected_from_search)
         
@@ -91,30 +102,8 @@ class PresupuestoView(QWidget):
         codigo = self.codigo_search.text().strip()
         descripcion = self.descripcion_search.text().strip()
         
-        # Desconectar temporalmente los eventos de cambio de texto para evitar interferencias
-        try:
-            self.analisis_controller.view.search_code_input.textChanged.disconnect()
-            self.analisis_controller.view.search_desc_input.textChanged.disconnect()
-        except:
-            pass  # Si no estaban conectadas, ignorar el error
-        
-        # Limpiar y establecer los valores en campos separados
-        self.analisis_controller.view.search_code_input.clear()
-        self.analisis_controller.view.search_desc_input.clear()
-        
-        if codigo:
-            self.analisis_controller.view.search_code_input.setText(codigo)
-        if descripcion:
-            self.analisis_controller.view.search_desc_input.setText(descripcion)
-        
-        # Reconectar los eventos
-        self.analisis_controller.view.search_code_input.textChanged.connect(
-            self.analisis_controller.view.apply_filters)
-        self.analisis_controller.view.search_desc_input.textChanged.connect(
-            self.analisis_controller.view.apply_filters)
-        
-        # Aplicar filtros manualmente
-        self.analisis_controller.view.apply_filters()
+        # Llenar los campos de búsqueda y filtrar una sola vez (sin la espera del temporizador)
+        self.analisis_controller.view.set_search_text(codigo, descripcion)
         
         # Mostrar la ventana
         self.analisis_controller.view.show()
@@ -171,6 +160,7 @@ class PresupuestoView(QWidget):
             
             if confirmacion == QMessageBox.StandardButton.Yes:
                 self.table.removeRow(row)
+                self.lineas.eliminar(row)
                 self.update_total_presupuesto()
                 QMessageBox.information(self, "Eliminado", "La fila ha sido eliminada correctamente.")
 
@@ -208,6 +198,8 @@ class PresupuestoView(QWidget):
         """Agrega un análisis unitario a la tabla."""
         row = self.table.rowCount()
         self.table.insertRow(row)
+        # Registrar la línea antes de escribir las celdas (setText dispara on_cell_changed)
+        self.lineas.agregar(analisis_data['codigo'], 1, analisis_data['costo_unitario'])
         
         # Crear y configurar todos los QTableWidgetItem primero
         items = []
@@ -245,6 +237,7 @@ class PresupuestoView(QWidget):
                 cantidad = float(text)
                 if cantidad < 0:
                     raise ValueError("La cantidad no puede ser negativa")
+            self.lineas.fijar_cantidad(item.row(), cantidad)
             
             # Bloquear señales para evitar recursión
             self.table.blockSignals(True)
@@ -255,6 +248,7 @@ class PresupuestoView(QWidget):
         except ValueError:
             self.table.blockSignals(True)
             item.setText('1')
+            self.lineas.fijar_cantidad(item.row(), 1)
             self.update_row_total(item.row())
             self.update_total_presupuesto()
             self.table.blockSignals(False)
@@ -262,42 +256,23 @@ class PresupuestoView(QWidget):
 
     def update_row_total(self, row):
         """Actualiza el costo total de una fila."""
-        try:
-            # Asegurarnos de que todos los items existan
-            cantidad_item = self.table.item(row, 4)
-            costo_item = self.table.item(row, 5)
+        total_item = self.table.item(row, 6)
+        if total_item is None or row >= len(self.lineas):
+            return
+        total_item.setText(f"{self.lineas.costo_total(row):.2f}")
+
+    def update_all_row_totals(self):
+        """Actualiza el costo total de todas las filas con un solo cálculo vectorizado."""
+        self.table.blockSignals(True)
+        for row, total in enumerate(self.lineas.costos_totales()):
             total_item = self.table.item(row, 6)
-            
-            if not all([cantidad_item, costo_item, total_item]):
-                return
-            
-            # Obtener los valores
-            cantidad_text = cantidad_item.text().strip()
-            costo_text = costo_item.text().strip()
-            
-            # Convertir a números
-            cantidad = float(cantidad_text) if cantidad_text else 1.0
-            costo_unitario = float(costo_text) if costo_text else 0.0
-            
-            # Calcular y establecer el total
-            total = cantidad * costo_unitario
-            total_item.setText(f"{total:.2f}")
-            
-        except (ValueError, AttributeError):
-            # Si hay algún error, establecer valores por defecto
-            if self.table.item(row, 4):
-                self.table.item(row, 4).setText('1')
-            if self.table.item(row, 6):
-                self.table.item(row, 6).setText('0.00')
+            if total_item:
+                total_item.setText(f"{total:.2f}")
+        self.table.blockSignals(False)
 
     def update_total_presupuesto(self):
         """Actualiza el total del presupuesto."""
-        total = 0.0
-        for row in range(self.table.rowCount()):
-            try:
-                total += float(self.table.item(row, 6).text())
-            except (ValueError, AttributeError):
-                continue
+        total = self.lineas.total()
         self.total_label.setText(f"Total del Presupuesto: ${total:,.2f}")
 
     def export_csv(self):
@@ -340,6 +315,7 @@ class PresupuestoView(QWidget):
                     
                     # Limpiar tabla actual
                     self.table.setRowCount(0)
+                    self.lineas.limpiar()
                     
                     # Leer datos
                     for row_data in reader:
@@ -348,6 +324,11 @@ class PresupuestoView(QWidget):
                             
                         row = self.table.rowCount()
                         self.table.insertRow(row)
+                        self.lineas.agregar(
+                            row_data[0],
+                            _a_numero(row_data[4] if len(row_data) > 4 else "", 1.0),
+                            _a_numero(row_data[5] if len(row_data) > 5 else "", 0.0)
+                        )
                         
                         for col, value in enumerate(row_data):
                             item = QTableWidgetItem(value)
@@ -355,6 +336,7 @@ class PresupuestoView(QWidget):
                                 item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
                             self.table.setItem(row, col, item)
                     
+                    self.update_all_row_totals()
                     self.update_total_presupuesto()
                     
             except Exception as e:
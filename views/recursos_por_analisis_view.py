@@ -6,6 +6,10 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from PyQt6.QtCore import Qt, pyqtSignal
 
+# Rol donde se guarda, en la celda del código, el id de la fila en la base
+# (None para las filas agregadas que aún no se han guardado)
+ROW_ID_ROLE = Qt.ItemDataRole.UserRole + 1
+
 class RecursosPorAnalisisView(QWidget):
     # Señal para notificar cuando se selecciona un recurso (por ejemplo, desde el selector)
     resource_selected_por_analisis = pyqtSignal(str)
@@ -171,6 +175,7 @@ class RecursosPorAnalisisView(QWidget):
                     QStandardItem(str(res.get("valor_unitario", 0))),
                     QStandardItem(str(res.get("valor_parcial", 0))),
                 ]
+                row_items[0].setData(res.get("id"), ROW_ID_ROLE)
                 # Suponiendo que la columna de "Valor Parcial" es la última (índice 6),
                 # deshabilitamos la edición SOLO en esa columna para las filas normales:
                 row_items[6].setFlags(row_items[6].flags() & ~Qt.ItemFlag.ItemIsEditable)
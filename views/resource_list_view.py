@@ -1,31 +1,253 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView,
-    QPushButton, QLineEdit, QLabel, QMessageBox
+    QPushButton, QLineEdit, QLabel, QMessageBox, QApplication
 )
-from PyQt6.QtGui import QStandardItemModel, QStandardItem
-from PyQt6.QtCore import Qt, pyqtSignal, QSortFilterProxyModel
+from PyQt6.QtGui import QColor, QBrush, QKeySequence, QShortcut
+from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QModelIndex, QTimer
+from models.catalogo_recursos import PAGINA
+
+# Milisegundos sin escribir antes de consultar la búsqueda en la base
+SEARCH_DELAY_MS = 250
+
+# Color de fondo de las filas con cambios sin guardar
+DIRTY_BRUSH = QBrush(QColor("#fff3c4"))
+
+class RecursosModel(QAbstractTableModel):
+    """
+    Modelo del catálogo de recursos que se llena por páginas a medida que la
+    tabla se desplaza (canFetchMore/fetchMore). Las páginas las entrega la
+    función 'fuente' (ver models/catalogo_recursos.py) en orden de código, así
+    que abrir el catálogo cuesta una página sin importar el tamaño de la tabla.
+    Con una búsqueda por descripción la fuente entrega las coincidencias por
+    relevancia (models/busqueda_sql.py), con el rango como quinta columna.
+
+    En memoria se mantiene a lo sumo MAX_FILAS filas: al bajar se descartan las
+    primeras y al volver arriba (cargar_anteriores) se descartan las últimas.
+    Las ediciones sin guardar se guardan aparte, por código, y se superponen a
+    las filas leídas de la base, así no se pierden al descartar una página.
+    Antes de la primera edición de una fila se guardan sus valores leídos de la
+    base (original()), para que el controlador no tenga que volver a consultarlos.
+    """
+    COLUMNAS = ("codigo", "descripcion", "unidad", "valor_unitario")
+    ENCABEZADOS = ("Código", "Descripción", "Unidad", "Valor Unitario")
+    # Máximo de filas en memoria
+    MAX_FILAS = 2000
 
-class MultiColumnFilterProxyModel(QSortFilterProxyModel):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.code_filter = ""
-        self.desc_filter = ""
+        # fuente(despues_de=None, antes_de=None, codigo="", descripcion="") -> filas
+        self.fuente = None
+        self.filtro_codigo = ""
+        self.filtro_descripcion = ""
+        # codigo -> valores editados sin guardar
+        self.pendientes = {}
+        # codigo -> valores leídos de la base antes de la primera edición
+        self.originales = {}
+        self._vaciar()
+
+    def _vaciar(self):
+        self.codigos = []
+        self.descripciones = []
+        self.unidades = []
+        self.valores = []
+        # Clave de paginación de cada fila: el código, o (rango, codigo) en una búsqueda
+        self.claves = []
+        self._filas = {}
+        self._hay_anteriores = False
+        self._hay_siguientes = self.fuente is not None
+
+    def _reindexar(self):
+        self._filas = {codigo: fila for fila, codigo in enumerate(self.codigos)}
+
+    def _columnas(self, filas):
+        """Convierte filas de la base en columnas, con las ediciones pendientes superpuestas."""
+        columnas = ([], [], [], [], [])
+        for fila in filas:
+            codigo, descripcion, unidad, valor = fila[:4]
+            clave = (fila[4], codigo) if len(fila) > 4 else codigo
+            pendiente = self.pendientes.get(codigo)
+            if pendiente:
+                descripcion, unidad, valor = (
+                    pendiente["descripcion"], pendiente["unidad"], pendiente["valor_unitario"]
+                )
+            for columna, dato in zip(columnas, (codigo, descripcion or "", unidad or "", valor, clave)):
+                columna.append(dato)
+        return columnas
+
+    def _leer(self, **limites):
+        return self.fuente(
+            codigo=self.filtro_codigo, descripcion=self.filtro_descripcion, **limites
+        )
+
+    # ---------------------------
+    # Carga
+    # ---------------------------
+    def set_fuente(self, fuente):
+        self.fuente = fuente
+        self.recargar()
+
+    def recargar(self):
+        """Descarta las filas en memoria y vuelve a la primera página."""
+        self.beginResetModel()
+        self._vaciar()
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def fijar_filtros(self, codigo, descripcion):
+        """Los filtros se aplican en la consulta: la tabla vuelve a la primera página filtrada."""
+        self.filtro_codigo = codigo.strip()
+        self.filtro_descripcion = descripcion.strip()
+        self.recargar()
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._hay_siguientes
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        filas = self._leer(despues_de=self.claves[-1] if self.claves else None, limite=PAGINA)
+        self._hay_siguientes = len(filas) == PAGINA
+        if not filas:
+            return
+        inicio = len(self.codigos)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(filas) - 1)
+        for columna, nuevos in zip(self._listas(), self._columnas(filas)):
+            columna.extend(nuevos)
+        self._reindexar()
+        self.endInsertRows()
+
+        # Mantener la ventana acotada descartando las primeras filas
+        sobrantes = len(self.codigos) - self.MAX_FILAS
+        if sobrantes > 0:
+            self.beginRemoveRows(QModelIndex(), 0, sobrantes - 1)
+            for columna in self._listas():
+                del columna[:sobrantes]
+            self._reindexar()
+            self._hay_anteriores = True
+            self.endRemoveRows()
+
+    def cargar_anteriores(self):
+        """
+        Carga la página que precede a la primera fila en memoria (cuando la
+        tabla llega arriba después de haber descartado filas). Retorna el
+        número de filas agregadas al principio.
+        """
+        if not self._hay_anteriores or not self.codigos:
+            return 0
+        filas = self._leer(antes_de=self.claves[0], limite=PAGINA)
+        self._hay_anteriores = len(filas) == PAGINA
+        if not filas:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(filas) - 1)
+        for columna, nuevos in zip(self._listas(), self._columnas(filas)):
+            columna[:0] = nuevos
+        self._reindexar()
+        self.endInsertRows()
 
-    def setCodeFilter(self, code_filter):
-        self.code_filter = code_filter.lower()
-        self.invalidateFilter()
+        # Mantener la ventana acotada descartando las últimas filas
+        if len(self.codigos) > self.MAX_FILAS:
+            self.beginRemoveRows(QModelIndex(), self.MAX_FILAS, len(self.codigos) - 1)
+            for columna in self._listas():
+                del columna[self.MAX_FILAS:]
+            self._reindexar()
+            self._hay_siguientes = True
+            self.endRemoveRows()
+        return len(filas)
 
-    def setDescFilter(self, desc_filter):
-        self.desc_filter = desc_filter.lower()
-        self.invalidateFilter()
+    def _listas(self):
+        return (self.codigos, self.descripciones, self.unidades, self.valores, self.claves)
 
-    def filterAcceptsRow(self, source_row, source_parent):
-        model = self.sourceModel()
-        index_code = model.index(source_row, 0, source_parent)
-        index_desc = model.index(source_row, 1, source_parent)
-        code = (model.data(index_code, Qt.ItemDataRole.DisplayRole) or "").lower()
-        desc = (model.data(index_desc, Qt.ItemDataRole.DisplayRole) or "").lower()
-        return (self.code_filter in code) and (self.desc_filter in desc)
+    # ---------------------------
+    # Interfaz de QAbstractTableModel
+    # ---------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.codigos)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNAS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        fila, columna = index.row(), index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return str(self._listas()[columna][fila])
+        if role == Qt.ItemDataRole.BackgroundRole and self.codigos[fila] in self.pendientes:
+            return DIRTY_BRUSH
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.ENCABEZADOS[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        # El código identifica el recurso; las demás columnas se editan en la tabla
+        if index.isValid() and index.column() > 0:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid() or index.column() == 0:
+            return False
+        codigo = self.codigos[index.row()]
+        if codigo not in self.pendientes and codigo not in self.originales:
+            fila = self.fila(index.row())
+            self.originales[codigo] = {campo: fila[campo] for campo in self.COLUMNAS[1:]}
+        self._listas()[index.column()][index.row()] = str(value)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+
+    # ---------------------------
+    # Acceso por fila y por código
+    # ---------------------------
+    def fila_de(self, codigo):
+        """Fila actual del recurso, o None si no está en la ventana cargada."""
+        return self._filas.get(codigo)
+
+    def fila(self, fila):
+        return {campo: columna[fila] for campo, columna in zip(self.COLUMNAS, self._listas())}
+
+    def original(self, codigo):
+        """Valores de la base de un recurso antes de editarlo, o None si no se capturaron."""
+        return self.originales.get(codigo)
+
+    def escribir(self, fila, valores):
+        """Escribe valores en una fila sin emitir dataChanged (no cuenta como edición)."""
+        for campo, valor in valores.items():
+            self._listas()[self.COLUMNAS.index(campo)][fila] = valor
+
+    def marcar_pendiente(self, codigo, valores):
+        """Registra (o con None, olvida) las ediciones sin guardar de un recurso."""
+        if valores:
+            self.pendientes[codigo] = dict(valores)
+        else:
+            # Guardada, deshecha o de vuelta a sus valores: la próxima edición parte de cero
+            self.pendientes.pop(codigo, None)
+            self.originales.pop(codigo, None)
+        fila = self._filas.get(codigo)
+        if fila is not None:
+            self.dataChanged.emit(
+                self.index(fila, 0), self.index(fila, len(self.COLUMNAS) - 1),
+                [Qt.ItemDataRole.BackgroundRole]
+            )
+
+    def quitar(self, codigo):
+        fila = self._filas.get(codigo)
+        self.pendientes.pop(codigo, None)
+        self.originales.pop(codigo, None)
+        if fila is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), fila, fila)
+        for columna in self._listas():
+            del columna[fila]
+        self._reindexar()
+        self.endRemoveRows()
+        return True
 
 class ResourceListView(QWidget):
     resource_delete_requested = pyqtSignal(str)
@@ -35,10 +257,18 @@ class ResourceListView(QWidget):
     resource_deleted = pyqtSignal(str)
     # Señal que se emite cuando se agrega un recurso (opcional, para que el controlador lo capture)
     resource_added = pyqtSignal(dict)
+    # Señales del buffer de ediciones: guardar ya, deshacer la última fila editada
+    # y foco fuera de la vista (momento para guardar lo pendiente)
+    save_requested = pyqtSignal()
+    undo_requested = pyqtSignal()
+    focus_left = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.init_ui()
+        app = QApplication.instance()
+        if app is not None:
+            app.focusChanged.connect(self.on_focus_changed)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -90,9 +320,17 @@ class ResourceListView(QWidget):
         self.add_button.setMinimumWidth(140)
         self.delete_button = QPushButton("Eliminar Recurso")
         self.delete_button.setMinimumWidth(140)
+        self.save_button = QPushButton("Guardar Cambios")
+        self.save_button.setMinimumWidth(140)
+        self.undo_button = QPushButton("Deshacer")
+        self.undo_button.setMinimumWidth(140)
+        self.pending_label = QLabel("")
         
         buttons_layout.addWidget(self.add_button)
         buttons_layout.addWidget(self.delete_button)
+        buttons_layout.addWidget(self.save_button)
+        buttons_layout.addWidget(self.undo_button)
+        buttons_layout.addWidget(self.pending_label)
         buttons_layout.addStretch(1)  # Espacio a la derecha para centrar
         
         # Agregar los layouts al contenedor del formulario
@@ -101,28 +339,37 @@ class ResourceListView(QWidget):
         
         layout.addWidget(form_container)
         
-        # Crear el QTableView y el modelo asociado
+        # Crear el QTableView y el modelo paginado (las filas se leen al desplazarse)
         self.table_view = QTableView(self)
-        self.model = QStandardItemModel(self)
-        self.model.setHorizontalHeaderLabels(["Código", "Descripción", "Unidad", "Valor Unitario"])
-        
-        # Configurar el proxy para filtrar en múltiples columnas
-        self.proxy_model = MultiColumnFilterProxyModel(self)
-        self.proxy_model.setSourceModel(self.model)
-        self.table_view.setModel(self.proxy_model)
+        self.model = RecursosModel(self)
+        self.table_view.setModel(self.model)
         self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Filas de altura fija: la vista no necesita medirlas una por una
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(24)
+        # Al llegar arriba se recuperan las filas descartadas de la ventana
+        self.table_view.verticalScrollBar().valueChanged.connect(self.on_scroll)
         layout.addWidget(self.table_view)
         
         # Conectar la señal de doble clic para seleccionar un recurso
         self.table_view.doubleClicked.connect(lambda index: self.on_cell_double_clicked(index.row(), index.column()))
         
-        # Conectar señales de los inputs de búsqueda
-        self.search_code_input.textChanged.connect(self.proxy_model.setCodeFilter)
-        self.search_desc_input.textChanged.connect(self.proxy_model.setDescFilter)
+        # Conectar señales de los inputs de búsqueda (el filtro se aplica en la consulta,
+        # una sola vez cuando se deja de escribir)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_code_input.textChanged.connect(lambda *_: self.search_timer.start())
+        self.search_desc_input.textChanged.connect(lambda *_: self.search_timer.start())
         
         # Conectar botones a sus funciones respectivas
         self.add_button.clicked.connect(self.on_add_button_clicked)
         self.delete_button.clicked.connect(self.on_delete_button_clicked)
+        self.save_button.clicked.connect(self.save_requested)
+        self.undo_button.clicked.connect(self.undo_requested)
+        QShortcut(QKeySequence.StandardKey.Save, self, activated=self.save_requested.emit)
+        QShortcut(QKeySequence.StandardKey.Undo, self, activated=self.undo_requested.emit)
         
         # Estilo para botones y tabla
         self.setStyleSheet("""
@@ -153,29 +400,38 @@ class ResourceListView(QWidget):
         
         self.setLayout(layout)
 
-    def load_data(self, data):
-        """
-        Carga los datos en el modelo.
-        'data' es una lista de diccionarios con las claves:
-          'codigo', 'descripcion', 'unidad' y 'valor_unitario'
-        """
-        self.model.removeRows(0, self.model.rowCount())
-        for resource in data:
-            row = [
-                QStandardItem(str(resource.get("codigo", ""))),
-                QStandardItem(resource.get("descripcion", "")),
-                QStandardItem(resource.get("unidad", "")),
-                QStandardItem(str(resource.get("valor_unitario", 0)))
-            ]
-            self.model.appendRow(row)
+    def apply_filters(self, *_):
+        self.search_timer.stop()
+        self.model.fijar_filtros(self.search_code_input.text(), self.search_desc_input.text())
+
+    def on_scroll(self, value):
+        if value == self.table_view.verticalScrollBar().minimum():
+            agregadas = self.model.cargar_anteriores()
+            if agregadas:
+                # Conservar en pantalla la fila que se estaba viendo
+                self.table_view.scrollTo(
+                    self.model.index(agregadas, 0), QTableView.ScrollHint.PositionAtTop
+                )
+
+    def set_pending_count(self, count):
+        self.pending_label.setText(f"{count} fila(s) sin guardar" if count else "")
+
+    def on_focus_changed(self, old, now):
+        """Emite focus_left cuando el foco pasa de un widget de esta vista a otro externo."""
+        if old is not None and self.isAncestorOf(old) and (now is None or not self.isAncestorOf(now)):
+            self.focus_left.emit()
+
+    def hideEvent(self, event):
+        # Al cerrar u ocultar la vista también se guardan las ediciones pendientes
+        self.focus_left.emit()
+        super().hideEvent(event)
 
     def on_cell_double_clicked(self, row, column):
         """
         Cuando se hace doble clic en una celda, se emite la señal con el código
         del recurso y se muestra un mensaje.
         """
-        index = self.proxy_model.index(row, 0)
-        codigo = self.proxy_model.data(index)
+        codigo = self.model.codigos[row]
         if codigo:
             self.resource_selected.emit(codigo)
             QMessageBox.information(self, "Recurso Seleccionado", f"Se seleccionó: {codigo}")
@@ -195,13 +451,7 @@ class ResourceListView(QWidget):
             return
         
         # Tomamos la primera fila seleccionada (puedes ampliar la funcionalidad para múltiples selecciones)
-        proxy_index = selected_indexes[0]
-        # Obtenemos el índice en el modelo fuente
-        source_index = self.proxy_model.mapToSource(proxy_index)
-        codigo_item = self.model.item(source_index.row(), 0)
-        if not codigo_item:
-            return
-        codigo = codigo_item.text()
+        codigo = self.model.codigos[selected_indexes[0].row()]
         
         # Confirmar la eliminación
         reply = QMessageBox.question(
@@ -251,7 +501,8 @@ if __name__ == "__main__":
         {"codigo": "MQ0207", "descripcion": "VOLQUETA 5 M3", "unidad": "VJE", "valor_unitario": 46500.0},
         {"codigo": "MQ0301", "descripcion": "HERRAMIENTA MENOR", "unidad": "GLB", "valor_unitario": 1600.0}
     ]
-    view.load_data(sample_data)
+    filas = [tuple(r.values()) for r in sample_data]
+    view.model.set_fuente(lambda despues_de=None, **_: [] if despues_de else filas)
     view.setWindowTitle("Lista de Recursos con Filtro y Eliminación")
     view.resize(800, 400)
     view.show()